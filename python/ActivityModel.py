@@ -1,19 +1,30 @@
 from enum import IntEnum, unique, auto
-from typing import List, Tuple
+from typing import List, Tuple, Union, Dict, TYPE_CHECKING
 from copy import copy
 import numpy as np
-import tensorflow as tf
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.colors as colors
-from matplotlib import rcParams
 import re
+import json
 import glob
+import time
 from os import listdir, remove
 from os.path import isfile, join
-from sklearn.model_selection import train_test_split
-from TFLiteGenerator import TFLiteGenerator
+from LookBackWindows import LookBackWindows
+from RecordingLoader import RecordingLoader
+from RecordingCache import RecordingCache
+from RecordingStore import RecordingStore
 from Conf import Conf
+from ExecutionProfile import ExecutionProfile
+from WindowAugmenter import WindowAugmenter
+from NumpyInferenceBackend import NumpyInferenceBackend
+
+if TYPE_CHECKING:
+    # TensorFlow, pandas & matplotlib are slow to import, so they are only imported by the methods that use them.
+    import tensorflow as tf
+    from LookBackSequence import LookBackSequence
+    from CheckpointManager import CheckpointManager
+    from InferenceBackend import InferenceBackend
+    from StreamingInferenceBackend import StreamingInferenceBackend
+    import pandas as pd
 
 
 class ActivityModel:
@@ -57,7 +68,7 @@ class ActivityModel:
     _n_features: int
     _n_classes: int
     _look_back_window_size: int
-    _activity_model: tf.keras.Model
+    _activity_model: 'tf.keras.Model'
     _activity_model_type: ModelType
     _activity_model_input_shape: Tuple
     _activity_model_trained: bool
@@ -66,14 +77,38 @@ class ActivityModel:
     _checkpoint_filepath: str
     _export_filepath: str
     _generate_tflite: bool
-    _check_point_file_name_format: str
     _check_point_file_pattern: re.Pattern
+    _checkpoint_config: dict
+    _resume_training: bool
+    _keep_best_checkpoints: int
+    _data_fingerprint: str
+    _training_log_name: str
     _activity_classes: List[Tuple[re.Pattern, np.array, str]]
-    _x_train: np.array
-    _y_train: np.array
-    _x_test: np.array
-    _y_test: np.array
+    _windows: LookBackWindows
+    _train_index: np.ndarray
+    _test_index: np.ndarray
     _test_on_load: bool
+    _stream_training_data: bool
+    _dtype: np.dtype
+    _plot_training: bool
+    _adaptive_training: bool
+    _adaptive_training_conf: dict
+    _headless: bool
+    _verbose: bool
+    _recording_loader: Union[RecordingLoader, RecordingCache]
+    _execution_profile: ExecutionProfile
+    _mixed_precision: str
+    _augmenter: WindowAugmenter
+    _quantization: str
+    _inference_backend_name: str
+    _inference_threads: int
+    _inference_backend: 'InferenceBackend'
+    _predict_buffer: np.ndarray
+    _class_name_by_index: List[str]
+
+    NUMPY_PARITY_TOLERANCE = 1e-4
+    QUANTIZATION_MODES = ['none', 'dynamic', 'float16', 'int8']
+    NUM_REPRESENTATIVE_WINDOWS = 500
 
     _CIRCLE = 0
     _STATIONARY = 1
@@ -89,10 +124,25 @@ class ActivityModel:
                  export_filepath: str,
                  model_type: ModelType = ModelType.CNN,
                  generate_tflite: bool = False,
-                 test_on_load: bool = True):
-        rcParams.update({'figure.autolayout': True})  # graph plotting.
-        physical_devices = tf.config.list_physical_devices('GPU')
-        tf.config.experimental.set_memory_growth(physical_devices[0], True)
+                 test_on_load: bool = True,
+                 num_loader_workers: int = None,
+                 cache_path: str = None,
+                 stream_training_data: bool = False,
+                 mixed_precision: str = None,
+                 plot_training: bool = True,
+                 adaptive_training: bool = False,
+                 headless: bool = False,
+                 verbose: bool = False,
+                 execution_profile: ExecutionProfile = None,
+                 resume_training: bool = False,
+                 keep_best_checkpoints: int = 3,
+                 inference_backend: str = 'keras',
+                 inference_threads: int = None,
+                 quantization: str = 'none'):
+        self._execution_profile = execution_profile if execution_profile is not None else \
+            ExecutionProfile.from_conf(conf)
+        self._dtype = conf.dtype
+        self._mixed_precision = mixed_precision if mixed_precision is not None else conf.mixed_precision
         self._activity_model_type = model_type
         model_name = model_type.name.lower()
         self._n_features = conf.config[model_name]['num_features']  # x,y,z Accelerometer readings
@@ -104,8 +154,18 @@ class ActivityModel:
         self._checkpoint_filepath = checkpoint_filepath
         self._export_filepath = export_filepath
         self._generate_tflite = generate_tflite
-        self._check_point_file_name_format = 'cp-' + model_name + '-{epoch:04d}.ckpt'
+        self._stream_training_data = stream_training_data
+        self._plot_training = plot_training
+        self._headless = headless
+        self._verbose = verbose
+        self._adaptive_training = adaptive_training
+        self._adaptive_training_conf = conf.config[model_name].get('adaptive_training', dict())
+        self._augmenter = WindowAugmenter.from_conf(conf.config[model_name].get('augmentation', dict()))
         self._check_point_file_pattern = re.compile('.*cp.*ckpt.*')
+        self._resume_training = resume_training
+        self._keep_best_checkpoints = keep_best_checkpoints
+        self._data_fingerprint = None  # noqa
+        self._training_log_name = 'training-log-' + model_name + '.jsonl'
         self._activity_classes = list()
         for cls in conf.config['classes']:
             class_name = cls['class_name']
@@ -114,11 +174,39 @@ class ActivityModel:
                                                  np.array(one_hot),
                                                  class_name)))
         self._n_classes = len(self._activity_classes)  # Circle, Up-Down & Stationary
-        self._activity_model, self._activity_model_input_shape = self.create_model(self._activity_model_type)
-        self._x_train = None
-        self._x_test = None
-        self._y_train = None
-        self._y_test = None
+        # The class name of each output of the model, so a prediction is named by its argmax.
+        self._class_name_by_index = ["Unknown"] * self._n_classes
+        for cl in self._activity_classes:
+            self._class_name_by_index[int(np.argmax(cl[self._CLASS_AS_ONE_HOT]))] = cl[self._ACTIVITY_NAME]
+        # The settings that a checkpoint is only valid for, recorded with every checkpoint.
+        self._checkpoint_config = dict(conf.config[model_name],
+                                       model=model_name,
+                                       dtype=self._dtype.name,
+                                       classes=[cl[self._ACTIVITY_NAME] for cl in self._activity_classes])
+        # The Keras model is only built when first needed, so the numpy backend can predict without TensorFlow.
+        self._activity_model = None  # noqa
+        self._activity_model_input_shape = self.model_input_shape(self._activity_model_type)
+        self._recording_loader = RecordingLoader(num_workers=num_loader_workers)
+        if cache_path is not None:
+            # Only parse data files that are new or have changed since the last load.
+            self._recording_loader = RecordingCache(cache_path=cache_path,
+                                                    look_back_window_size=self._look_back_window_size,
+                                                    class_names=[cl[self._ACTIVITY_NAME] for cl in
+                                                                 self._activity_classes],
+                                                    recording_loader=self._recording_loader)
+        self._windows = None
+        self._train_index = None
+        self._test_index = None
+        if quantization not in self.QUANTIZATION_MODES:
+            raise ValueError("[{}] is not a valid quantization".format(quantization))
+        if quantization == 'int8' and model_type == self.ModelType.LSTM:
+            # The recurrent loop of the LSTM cannot be converted with int8 only ops.
+            raise ValueError("int8 quantization is not supported for the LSTM model, use dynamic or float16")
+        self._quantization = quantization
+        self._inference_backend_name = inference_backend
+        self._inference_threads = inference_threads
+        self._inference_backend = None  # noqa
+        self._predict_buffer = np.zeros(self.classification_input_shape(), dtype=self._dtype)
         return
 
     def look_back_window_size(self) -> int:
@@ -131,6 +219,30 @@ class ActivityModel:
         """
         return copy(self._look_back_window_size)
 
+    def dtype(self) -> np.dtype:
+        """
+        Get the dtype that data must be in to be passed to the model without a cast.
+
+        :return: The data dtype as set in the config.
+        """
+        return self._dtype
+
+    def execution_profile(self) -> ExecutionProfile:
+        """
+        Get the execution profile TensorFlow was set up with.
+
+        :return: The execution profile, including the profile (cpu or gpu) that was chosen.
+        """
+        return self._execution_profile
+
+    def num_classes(self) -> int:
+        """
+        Get the number of activity classes the model predicts.
+
+        :return: The number of classes.
+        """
+        return self._n_classes
+
     def classification_input_shape(self) -> Tuple:
         """
         The input dimensions required by the model to perform *single sample* classification.
@@ -145,12 +257,103 @@ class ActivityModel:
         """
         return tuple((1, *self._activity_model_input_shape))
 
-    def _clean(self) -> None:
+    def model_input_shape(self,
+                          model_type: 'ModelType') -> Tuple:
+        """
+        The input shape of a single window for the given model type, as the create_*_network methods build it.
+
+        This is known without building the model so that data can be shaped for it without TensorFlow.
+        :param model_type: The type of model
+        :return: Tuple of integers describing the input shape, without the batch dimension
+        """
+        if model_type == self.ModelType.LSTM:
+            return tuple((self._look_back_window_size, self._n_features))
+        elif model_type == self.ModelType.SIMPLE:
+            return tuple((self._look_back_window_size * self._n_features,))
+        return tuple((self._look_back_window_size, self._n_features, 1))
+
+    def _model(self) -> 'tf.keras.Model':
+        """
+        Get the Keras model, creating it on first use.
+
+        TensorFlow is set up here, so it is only imported when the Keras model is actually needed.
+        :return: The Keras model.
+        """
+        if self._activity_model is None:
+            import tensorflow as tf
+            # Set up the device and threads before any other TensorFlow work; CPU only hosts are a supported profile.
+            self._execution_profile.apply()
+            print("Execution profile [{}]".format(str(self._execution_profile)))
+            if self._mixed_precision != 'none':
+                # Compute in e.g. bfloat16 while keeping the model variables in float32
+                tf.keras.mixed_precision.set_global_policy(self._mixed_precision)
+            self._activity_model, _ = self.create_model(self._activity_model_type)
+        return self._activity_model
+
+    def _numpy_model_file(self) -> str:
+        """
+        :return: The file the weights are exported to for the numpy backend, in the checkpoint path.
+        """
+        return join(self._checkpoint_filepath, 'activity-model-' + self._activity_model_type.name.lower() + '.npz')
+
+    def _best_checkpoint(self) -> Dict:
+        """
+        The checkpoint that inference loads its weights from, read from the checkpoint manifest directly so the
+        numpy backend can check its export is current without TensorFlow (the CheckpointManager is a Keras
+        callback, so importing it imports TensorFlow).
+
+        :return: The file and epoch of the checkpoint with the lowest validation loss, both None if there is no
+                 manifest e.g. for checkpoints saved by Keras before the checkpoint manager was used.
+        """
+        manifest_file = join(self._checkpoint_filepath,
+                             'checkpoint-' + self._activity_model_type.name.lower() + '.json')
+        best = None
+        if isfile(manifest_file):
+            with open(manifest_file, 'r') as f:
+                manifest = json.load(f)
+            best = manifest['best'][0] if len(manifest.get('best', [])) > 0 else None
+        return {'file': best['file'] if best else None, 'epoch': best['epoch'] if best else None}
+
+    def _numpy_model_is_current(self) -> bool:
+        """
+        :return: True if the numpy backend weights are exported and were exported from the best checkpoint
+        """
+        if not isfile(self._numpy_model_file()):
+            return False
+        return NumpyInferenceBackend.exported_from(self._numpy_model_file()) == self._best_checkpoint()
+
+    def _current_numpy_model_file(self) -> str:
+        """
+        :return: The file of the numpy backend weights, exported again first if they are not from the best checkpoint
+        """
+        if not self._numpy_model_is_current():
+            self.export_numpy_model()
+        return self._numpy_model_file()
+
+    def _checkpoint_manager(self) -> 'CheckpointManager':
+        """
+        Create the manager of the resumable checkpoints of this model type in the checkpoint path.
+
+        :return: The checkpoint manager.
+        """
+        from CheckpointManager import CheckpointManager
+        return CheckpointManager(checkpoint_path=self._checkpoint_filepath,
+                                 model_name=self._activity_model_type.name.lower(),
+                                 config=self._checkpoint_config,
+                                 data_fingerprint=self._data_fingerprint,
+                                 keep_best=self._keep_best_checkpoints)
+
+    def _clean(self,
+               checkpoint_manager: 'CheckpointManager') -> None:
         """
         Clean up any persistent training state
+        :param checkpoint_manager: The manager of the checkpoints to delete
         """
 
         # Delete any previous checkpoint files so as not to mix up results from different training runs.
+        checkpoint_manager.clean()
+        if isfile(self._numpy_model_file()):
+            remove(self._numpy_model_file())
         checkpoint_files = glob.glob(join(self._checkpoint_filepath, "*"))
         for f in checkpoint_files:
             if self._check_point_file_pattern.match(f):
@@ -168,46 +371,115 @@ class ActivityModel:
         """
         Train the model on the loaded test data.
         """
-        self._clean()
-        if self._x_train is not None:
-            cpfp = join(self._checkpoint_filepath, self._check_point_file_name_format)
-            model_checkpoint_callback = tf.keras.callbacks.ModelCheckpoint(
-                filepath=cpfp,
-                save_weights_only=True,
-                monitor='val_loss',
-                mode='min',  # Smallest validation loss
-                save_best_only=True)
-
-            history = self._activity_model.fit(self._x_train,
-                                               self._y_train,
-                                               epochs=self._training_steps,
-                                               batch_size=32,
-                                               verbose=2,  # Print training commentary
-                                               validation_data=(self._x_test, self._y_test),
-                                               callbacks=[model_checkpoint_callback])
+        from LookBackDataset import LookBackDataset
+        from TrainingThroughputLogger import TrainingThroughputLogger
+        if self._windows is not None:
+            model = self._model()
+            checkpoint_manager = self._checkpoint_manager()
+            initial_epoch = 0
+            if self._resume_training:
+                # Carry on from the weights and optimizer state of the last completed epoch.
+                initial_epoch = checkpoint_manager.restore(model, last=True, with_optimizer=True)
+                print("Resuming training at epoch [{}] of [{}]".format(initial_epoch, self._training_steps))
+            else:
+                self._clean(checkpoint_manager)
+
+            if self._stream_training_data:
+                # Stream batches through a tf.data pipeline so input preparation overlaps the training steps.
+                training_data = LookBackDataset.create(windows=self._windows,
+                                                       index=self._train_index,
+                                                       shape=self._activity_model_input_shape,
+                                                       shuffle=True,
+                                                       augmenter=self._augmenter)
+                validation_data = LookBackDataset.create(windows=self._windows,
+                                                         index=self._test_index,
+                                                         shape=self._activity_model_input_shape,
+                                                         cache=True)
+            else:
+                training_data = self._batches(self._train_index, shuffle=True, augmenter=self._augmenter)
+                validation_data = self._batches(self._test_index)
+
+            callbacks = [checkpoint_manager,
+                         TrainingThroughputLogger(log_file=join(self._checkpoint_filepath, self._training_log_name),
+                                                  num_samples=len(self._train_index),
+                                                  append=initial_epoch > 0)]
+            if self._adaptive_training:
+                callbacks.extend(self._adaptive_training_callbacks())
+
+            history = model.fit(training_data,
+                                epochs=self._training_steps,
+                                initial_epoch=initial_epoch,
+                                verbose=2,  # Print training commentary
+                                validation_data=validation_data,
+                                callbacks=callbacks)
             self._activity_model_trained = True
-            self._plot_training_results(history)
+            self._inference_backend = None  # Re-create from the newly trained weights on next use
+            if self._plot_training and len(history.history.get('loss', [])) > 0:
+                self._plot_training_results(history.history)
             if self._generate_tflite:
                 self.export_as_tf_lite()
         else:
             raise RuntimeError("Create the model and Load training data before training model")
         return
 
-    @staticmethod
-    def _plot_training_results(history: tf.keras.callbacks.History) -> None:
+    def _adaptive_training_callbacks(self) -> List['tf.keras.callbacks.Callback']:
+        """
+        Create the callbacks that stop training once the validation loss stops improving and (optionally)
+        reduce the learning rate when the validation loss plateaus. The settings are taken from the
+        adaptive_training section of the model config.
+
+        :return: The list of Keras callbacks to add to training.
+        """
+        import tensorflow as tf
+        patience = int(self._adaptive_training_conf.get('patience', 20))
+        callbacks = [tf.keras.callbacks.EarlyStopping(monitor='val_loss',
+                                                      mode='min',
+                                                      patience=patience,
+                                                      min_delta=float(self._adaptive_training_conf.get('min_delta', 0)),
+                                                      restore_best_weights=True,
+                                                      verbose=1)]
+        reduce_lr_patience = int(self._adaptive_training_conf.get('reduce_lr_patience', 0))
+        if reduce_lr_patience > 0:
+            optimizer = self._model().optimizer
+            schedule = tf.keras.optimizers.schedules.LearningRateSchedule
+            if isinstance(optimizer.learning_rate, schedule) or \
+                    isinstance(getattr(optimizer, '_learning_rate', None), schedule):
+                print("Warning, not reducing learning rate on plateau as the model has a learning rate schedule")
+            else:
+                callbacks.append(tf.keras.callbacks.ReduceLROnPlateau(monitor='val_loss',
+                                                                      mode='min',
+                                                                      patience=reduce_lr_patience,
+                                                                      factor=float(self._adaptive_training_conf.get(
+                                                                          'reduce_lr_factor', 0.5)),
+                                                                      min_lr=float(self._adaptive_training_conf.get(
+                                                                          'min_lr', 1e-5)),
+                                                                      verbose=1))
+        return callbacks
+
+    def _plot_training_results(self,
+                               history: dict) -> None:
         """
         Plot the training and validation losses. This is done on a dual axis where the last 80% of the points
         are re-plotted so that there is the effect of a zoom as they will be on a new scale beyond (hopefully)
         the point at which the main training gains have been made.
+
+        If running headless the plot is saved as training-<model>.png in the checkpoint path rather than shown.
         :param: history: The history from the Keras training.
         """
+        import matplotlib
+        if self._headless:
+            matplotlib.use('Agg')  # Render to file only, no display needed.
+        import matplotlib.pyplot as plt
+        import matplotlib.colors as colors
+        matplotlib.rcParams.update({'figure.autolayout': True})
+
         fig = plt.figure()
         ax = fig.add_subplot(111)
         fig.suptitle('Training Loss & validation loss')
         fig.tight_layout()
 
-        loss = history.history['loss']
-        val_loss = history.history['val_loss']
+        loss = history['loss']
+        val_loss = history['val_loss']
 
         idx = range(len(loss))
         idx_zoom = int(len(loss) * .2)
@@ -227,76 +499,187 @@ class ActivityModel:
         ax.set_ylabel('Training')
         ax2.set_ylabel('Zoomed Training')
 
-        plt.show()
+        if self._headless:
+            plot_file = join(self._checkpoint_filepath,
+                             'training-' + self._activity_model_type.name.lower() + '.png')
+            fig.savefig(plot_file)
+            plt.close(fig)
+            print("Training plot saved to [{}]".format(plot_file))
+        else:
+            plt.show()
         return
 
     def load_model_from_checkpoint(self) -> None:
         """
-        Load the model weights from a saved CheckPoint or train the model from scratch
+        Load the model weights from the saved checkpoint with the lowest validation loss.
+
+        For the numpy backend the weights exported after training are loaded instead, without TensorFlow. If
+        they have not been exported from the best checkpoint yet they are exported from it first.
         """
-        if self._activity_model is not None:
-            checkpoint_to_load = tf.train.latest_checkpoint(self._checkpoint_filepath)
-            print("Found [{}] to load weights from".format(checkpoint_to_load))
-            self._activity_model.load_weights(checkpoint_to_load)
-            if self._test_on_load and self._x_test is not None:
-                loss = self._activity_model.evaluate(self._x_test, self._y_test, verbose=2)
-                print("Loss of loaded checkpoint [{}]".format(loss))
-            self._activity_model_trained = True
+        if self._inference_backend_name == 'numpy' and self._numpy_model_is_current():
+            print("Found [{}] to load weights from".format(self._numpy_model_file()))
         else:
-            raise RuntimeError("creat the model before loading saved model weights")
+            import tensorflow as tf
+            model = self._model()
+            checkpoint_manager = self._checkpoint_manager()
+            if len(checkpoint_manager.manifest['best']) > 0:
+                checkpoint_manager.restore(model, last=False, with_optimizer=False)
+            else:
+                # Checkpoints saved by Keras before the checkpoint manager was used.
+                checkpoint_to_load = tf.train.latest_checkpoint(self._checkpoint_filepath)
+                print("Found [{}] to load weights from".format(checkpoint_to_load))
+                model.load_weights(checkpoint_to_load)
+            if self._test_on_load and self._windows is not None:
+                loss = model.evaluate(self._batches(self._test_index), verbose=2)
+                print("Loss of loaded checkpoint [{}]".format(loss))
+            if self._inference_backend_name == 'numpy':
+                self._activity_model_trained = True
+                self.export_numpy_model()
+        self._activity_model_trained = True
+        self._inference_backend = None  # Re-create from the newly loaded weights on next use
         return
 
-    def test(self) -> None:
+    def export_numpy_model(self,
+                           num_parity_windows: int = 256) -> str:
         """
-        Test the trained model on the test data split out when the data was originally loaded.
+        Export the weights of the best checkpoint for the numpy backend, to activity-model-<model>.npz in the
+        checkpoint path, the same weights the other backends load. The export records the checkpoint it is from,
+        so it is exported again if the best checkpoint changes.
+
+        If data is loaded the numpy backend is checked against Keras on the first of the test windows, as
+        predictions on the numpy backend are only of use if they are the same as those of the trained model.
+        :param num_parity_windows: The number of test windows to compare the numpy and Keras outputs on.
+        :return: The name of the exported file.
         """
-        if self._activity_model_trained:
-            # Used the trained model to predict classifications based on the test data
-            predictions = self._activity_model.predict(self._x_test)
+        if not self._activity_model_trained:
+            raise RuntimeError("Train the model or load weights from checkpoint before exporting it")
+        numpy_model_file = self._numpy_model_file()
+        best_checkpoint = self._best_checkpoint()
+        model = self._model()
+        if best_checkpoint['file'] is not None:
+            # The model in memory may hold other weights, e.g. those of the last epoch just after training.
+            model, _ = self.create_model(self._activity_model_type)
+            self._checkpoint_manager().restore(model, last=False, with_optimizer=False)
+        NumpyInferenceBackend.export(model=model, model_file=numpy_model_file, source=best_checkpoint)
+        if self._windows is not None:
+            x, _ = self._windows.gather(self._test_index[:num_parity_windows], self._activity_model_input_shape)
+            keras_probabilities = np.asarray(model.predict_on_batch(x), dtype=np.float32)
+            numpy_probabilities = NumpyInferenceBackend(model_file=numpy_model_file).predict_batch(x)
+            difference = float(np.max(np.abs(keras_probabilities - numpy_probabilities)))
+            # Reduced precision compute in Keras only matches the float32 numpy forward pass to a few places.
+            tolerance = self.NUMPY_PARITY_TOLERANCE if self._mixed_precision == 'none' else 5e-2
+            if difference > tolerance:
+                raise RuntimeError("Numpy model differs from keras by [{}] which is more than [{}]"
+                                   .format(difference, tolerance))
+            print("Numpy model matches keras to within [{:.2e}] on [{}] test windows".format(difference, len(x)))
+        print("Exported numpy model to [{}]".format(numpy_model_file))
+        return numpy_model_file
 
-            # Count how many of the predictions are equal to the expected classifications
-            pred_am = np.argmax(predictions, axis=-1)
-            y_test_am = np.argmax(self._y_test, axis=-1)
-            num_correct = pred_am == y_test_am
-            print("Test accuracy {}%".format(100 * (np.sum(num_correct) / np.shape(self._x_test)[0])))
+    def confusion_matrix(self,
+                         backend: 'InferenceBackend' = None) -> np.ndarray:
+        """
+        Predict the classes of the test data split out when the data was loaded and count each prediction
+        against the expected class. The predictions are made on the inference backend, so for the TF Lite
+        backend this is the accuracy of the model as exported to the device.
 
-            confusion = tf.math.confusion_matrix(
-                labels=tf.constant(y_test_am),
-                predictions=tf.constant(pred_am),
-                num_classes=self._n_classes)
+        :param backend: Optional backend to make the predictions on, rather than the inference backend
+        :return: (classes, classes) counts with the expected class as rows and the predicted class as columns
+        """
+        if not self._activity_model_trained:
+            raise RuntimeError("Train the model or load weights from checkpoint before running test")
+        backend = backend if backend is not None else self.inference_backend()
+        batch_size = 1024
+        predictions = np.concatenate(
+            [backend.predict_batch(self._windows.gather(self._test_index[i:i + batch_size],
+                                                        self._activity_model_input_shape)[0])
+             for i in range(0, len(self._test_index), batch_size)])
+        pred_am = np.argmax(predictions, axis=-1)
+        y_test_am = self._windows.class_index(self._test_index)
+        confusion = np.bincount(y_test_am * self._n_classes + pred_am, minlength=self._n_classes * self._n_classes)
+        return confusion.reshape(self._n_classes, self._n_classes)
 
+    def test(self) -> float:
+        """
+        Test the trained model on the test data split out when the data was originally loaded.
+
+        :return: The test accuracy as 0.0 to 1.0
+        """
+        if self._activity_model_trained:
+            # Count how many of the predictions are equal to the expected classifications
+            confusion = self.confusion_matrix()
+            accuracy = np.trace(confusion) / np.sum(confusion)
+            print("Test accuracy {}%".format(100 * accuracy))
             print("Confusion Matrix \n{}".format(confusion))
         else:
             raise RuntimeError("Train the model or load weights from checkpoint before running test")
-        return
+        return float(accuracy)
 
-    def _reshaspe(self,
-                  x_all: np.ndarray) -> np.ndarray:
+    def measure_inference_latency(self,
+                                  num_windows: int = 100,
+                                  backend: 'InferenceBackend' = None) -> float:
         """
-        Take a full data set and (optionally) reshape it as needed for the model that is the target for the
-        training.
+        Time single window predictions over the first num_windows of the test data.
 
-        :param x_all: A fully loaded set of x values.
+        :param num_windows: The number of single window predictions to time.
+        :param backend: Optional backend to time the raw predictions of, rather than predict on the inference backend
+        :return: The median latency of a single window prediction in seconds.
+        """
+        if not self._activity_model_trained or self._windows is None:
+            raise RuntimeError("Train the model or load weights and load data before measuring inference latency")
+        predict = self.predict if backend is None else backend.predict_window
+        x, _ = self._windows.gather(self._test_index[:num_windows], self._activity_model_input_shape)
+        predict(x[:1])  # Exclude one off set up costs from the timings
+        latency = list()
+        for i in range(len(x)):
+            start = time.perf_counter()
+            predict(x[i:i + 1])
+            latency.append(time.perf_counter() - start)
+        return float(np.median(latency))
 
-        :return: Reshaped set of x values in shape required by currently loaded model.
+    def _batches(self,
+                 index: np.ndarray,
+                 shuffle: bool = False,
+                 batch_size: int = 32,
+                 augmenter: WindowAugmenter = None) -> 'LookBackSequence':
         """
-        if self._activity_model_input_shape != x_all.shape[1:]:
-            x_all = x_all.reshape(tuple((x_all.shape[0], *self._activity_model_input_shape)))
-        return x_all
+        Create a feed of batches of the loaded look back windows in the shape required by the current model.
 
-    def load_training_data(self) -> None:
+        :param index: The windows to feed, e.g. the train or test split.
+        :param shuffle: If True re-shuffle the windows at the end of every epoch.
+        :param batch_size: The number of windows per batch.
+        :param augmenter: Optional augmenter to randomly augment every batch, only for training.
+        :return: Keras Sequence that gathers one batch of windows at a time.
         """
-        Load all the data files that are of known activity class and create x_train,y_train,x_test,y_test split
-        in the given ratio. By default, the data is split into frames that are the size of the defined look back
-        window.
+        from LookBackSequence import LookBackSequence
+        return LookBackSequence(windows=self._windows,
+                                index=index,
+                                shape=self._activity_model_input_shape,
+                                batch_size=batch_size,
+                                shuffle=shuffle,
+                                augmenter=augmenter)
+
+    def _load_recordings(self) -> Tuple[np.ndarray, List[int], List[np.ndarray]]:
+        """
+        Load all the data files in the data path that are of known activity class. These can be either csv
+        files named by activity class e.g. circle-1.csv or binary recording stores (.rec) that record the
+        activity class of each recording they hold.
+
+        If the data path holds just a single recording store then its memory mapped payload is used directly,
+        otherwise all the recordings are copied end to end into a single array.
 
-        Then once the data is loaded it is reshaped (if needed) to match the specific input shape of the target
-        model.
+        :return: The recordings end to end, the number of rows in each recording and the class of each as one hot.
         """
-        x_all = None
-        y_all = None
-        data_files = [f for f in listdir(self._data_file_path) if isfile(join(self._data_file_path, f))]
-        for f in data_files:
+        data_files = list()
+        recording_one_hot = list()
+        stores = list()
+        for f in sorted(listdir(self._data_file_path)):
+            if not isfile(join(self._data_file_path, f)):
+                continue
+            if f.endswith(RecordingStore.FILE_EXTENSION):
+                print("Loading [{}]".format(f))
+                stores.append(RecordingStore(join(self._data_file_path, f)))
+                continue
+
             data_class_as_one_hot = None
             for cl in self._activity_classes:
                 if cl[self._PATTERN].match(f):
@@ -305,31 +688,188 @@ class ActivityModel:
 
             if data_class_as_one_hot is not None:
                 print("Loading [{}]".format(f))
-                # Load csv as DataFrame and remove the first index column.
-                x = np.delete(pd.read_csv(join(self._data_file_path, f)).to_numpy(), 0, 1)
-                x, y = self.data_to_look_back_data_set(x, data_class_as_one_hot)
-                if x_all is None:
-                    x_all = x
-                    y_all = y
-                else:
-                    x_all = np.concatenate((x_all, x))
-                    y_all = np.concatenate((y_all, y))
+                data_files.append(join(self._data_file_path, f))
+                recording_one_hot.append(data_class_as_one_hot)
             else:
                 print("Warning, Skipping data file [{}] as it has un known type".format(f))
 
-        # Ensure the X data is in the correct shape as required by the current target model.
-        x_all = self._reshaspe(x_all=x_all)
+        parts = list()
+        if len(data_files) > 0:
+            # Parse all files (not already cached) in parallel into a single allocation.
+            samples, recording_lengths = self._recording_loader.load(data_files=data_files,
+                                                                     num_features=self._n_features,
+                                                                     dtype=self._dtype)
+            parts.append(tuple((samples, recording_lengths, recording_one_hot)))
+
+        one_hot_by_name = {cl[self._ACTIVITY_NAME]: cl[self._CLASS_AS_ONE_HOT] for cl in self._activity_classes}
+        for store in stores:
+            known = list()
+            for r in store.recordings:
+                if r.class_name in one_hot_by_name:
+                    known.append(r)
+                else:
+                    print("Warning, Skipping recording of un known type [{}] in [{}]".format(r.class_name,
+                                                                                             store.store_file))
+            samples = store.samples(self._dtype)
+            if len(known) != len(store.recordings):
+                samples = np.concatenate([samples[r.row_offset:r.row_offset + r.num_rows] for r in known])
+            parts.append(tuple((samples,
+                                [r.num_rows for r in known],
+                                [one_hot_by_name[r.class_name] for r in known])))
+
+        if len(parts) == 0:
+            return tuple((np.zeros((0, self._n_features), dtype=self._dtype), list(), list()))  # noqa
+        if len(parts) == 1:
+            return parts[0]
+        return tuple((np.concatenate([p[0] for p in parts]),  # noqa
+                      [n for p in parts for n in p[1]],
+                      [o for p in parts for o in p[2]]))
+
+    def load_training_data(self,
+                           num_folds: int = None,
+                           fold: int = 0) -> None:
+        """
+        Load all the data files that are of known activity class and create the train and test split
+        in the given ratio. By default, the data is split into frames that are the size of the defined look back
+        window.
+
+        The frames are read only views on the loaded recordings and the split is made on the index of the
+        frames, so frames are only copied (and reshaped as needed by the target model) one batch at a time.
+
+        For k-fold cross validation the split is instead made by recording, so that the overlapping frames of
+        a single recording are never in both the train and test data.
 
-        if len(x_all) > 0:
-            self._x_train, self._x_test, self._y_train, self._y_test = train_test_split(x_all,
-                                                                                        y_all,
-                                                                                        test_size=0.2,
-                                                                                        random_state=42,
-                                                                                        shuffle=True)
+        :param num_folds: If given, the number of cross validation folds to split the recordings into
+        :param fold: The fold (0 to num_folds - 1) to hold back as test data when num_folds is given
+        """
+        samples, recording_lengths, recording_one_hot = self._load_recordings()
+        if len(recording_lengths) > 0:
+            self._windows = LookBackWindows(samples=samples,
+                                            recording_lengths=recording_lengths,
+                                            recording_one_hot=np.array(recording_one_hot, dtype=self._dtype),
+                                            look_back_window_size=self._look_back_window_size)
+
+        if self._windows is not None and len(self._windows) > 0:
+            if num_folds is None:
+                self._train_index, self._test_index = self._windows.split(test_size=0.2, random_state=42)
+            else:
+                self._train_index, self._test_index = self._windows.k_fold(num_folds=num_folds,
+                                                                           fold=fold,
+                                                                           random_state=42)
+            self._data_fingerprint = self._windows.fingerprint()
         else:
             raise ValueError("No data to train from found in [{}]".format(self._data_file_path))
         return
 
+    def _tflite_input_shape(self) -> Union[Tuple, None]:
+        """
+        The fixed input shape to convert the model to TF Lite with, if it needs one.
+
+        :return: The single window input shape for the LSTM model, as recurrent layers can only be converted with a
+                 fixed shape, otherwise None to convert with a variable batch size.
+        """
+        return self.classification_input_shape() if self._activity_model_type == self.ModelType.LSTM else None
+
+    def _representative_data(self) -> Union[np.ndarray, None]:
+        """
+        A random sample of the training windows to calibrate int8 quantization with.
+
+        :return: The windows in the model input shape, or None if no training data is loaded.
+        """
+        if self._windows is None:
+            return None
+        rng = np.random.default_rng(42)
+        index = rng.choice(self._train_index,
+                           size=min(self.NUM_REPRESENTATIVE_WINDOWS, len(self._train_index)),
+                           replace=False)
+        x, _ = self._windows.gather(np.sort(index), self._activity_model_input_shape)
+        return x
+
+    def _tflite_model(self,
+                      quantization: str) -> bytes:
+        """
+        Convert the trained model to TF Lite.
+
+        :param quantization: The quantization to convert with, one of QUANTIZATION_MODES.
+        :return: The model in TF Lite binary form.
+        """
+        from TFLiteGenerator import TFLiteGenerator
+        return TFLiteGenerator.model_binary_form(model=self._model(),
+                                                 input_shape=self._tflite_input_shape(),
+                                                 quantization=quantization,
+                                                 representative_data=self._representative_data()
+                                                 if quantization == 'int8' else None)
+
+    def inference_backend(self) -> 'InferenceBackend':
+        """
+        Get the backend that predictions are run on, creating it from the trained model on first use.
+
+        :return: The inference backend, Keras, the exported TF Lite model in the TF Lite interpreter or the
+                 exported weights in the numpy forward pass.
+        """
+        if not self._activity_model_trained:
+            raise RuntimeError("Train the model or load weights from checkpoint before making predictions")
+        if self._inference_backend is None:
+            if self._inference_backend_name == 'tflite':
+                from TFLiteInferenceBackend import TFLiteInferenceBackend
+                self._inference_backend = TFLiteInferenceBackend(model_content=self._tflite_model(self._quantization),
+                                                                 num_threads=self._inference_threads)
+            elif self._inference_backend_name == 'keras':
+                from KerasInferenceBackend import KerasInferenceBackend
+                self._inference_backend = KerasInferenceBackend(model=self._model(),
+                                                                input_shape=self._activity_model_input_shape,
+                                                                dtype=self._dtype)
+            elif self._inference_backend_name == 'numpy':
+                self._inference_backend = NumpyInferenceBackend(model_file=self._current_numpy_model_file())
+            else:
+                raise ValueError("Unknown inference backend [{}]".format(self._inference_backend_name))
+        return self._inference_backend
+
+    def keras_model(self) -> 'tf.keras.Model':
+        """
+        Get the trained Keras model, e.g. to call Keras predict on directly rather than through a backend.
+
+        :return: The trained Keras model.
+        """
+        if not self._activity_model_trained or self._activity_model is None:
+            # For the numpy backend only the exported weights are loaded, the Keras model is never built.
+            raise RuntimeError("Train the model or load weights from checkpoint into Keras before using it")
+        return self._activity_model
+
+    def streaming_backend(self,
+                          resync_interval: int = 5) -> 'StreamingInferenceBackend':
+        """
+        Create a backend that predicts a stream of samples update by update, each stream needs its own.
+
+        :param resync_interval: For the LSTM model, the most samples the state is carried past a full window before
+                                it is re-computed from the latest window, see StreamingLSTMInferenceBackend
+        :return: The streaming backend, the CNN model with its convolutions computed a time step at a time or the
+                 LSTM model with its state carried from sample to sample.
+        """
+        if not self._activity_model_trained:
+            raise RuntimeError("Train the model or load weights from checkpoint before making predictions")
+        if self._activity_model_type == self.ModelType.CNN:
+            from StreamingCNNInferenceBackend import StreamingCNNInferenceBackend
+            return StreamingCNNInferenceBackend(model_file=self._current_numpy_model_file())
+        if self._activity_model_type == self.ModelType.LSTM:
+            from StreamingLSTMInferenceBackend import StreamingLSTMInferenceBackend
+            return StreamingLSTMInferenceBackend(model_file=self._current_numpy_model_file(),
+                                                 resync_interval=resync_interval)
+        raise ValueError("Streaming is not supported for the [{}] model"
+                         .format(self._activity_model_type.name.lower()))
+
+    def predict_probabilities(self,
+                              sample_window: np.ndarray) -> np.ndarray:
+        """
+        Predict the class probabilities of a single window of samples.
+
+        :param sample_window: The window as a numpy array of look back window size x num features values in any
+                              shape e.g. (1, look back window size, num features)
+        :return: The probability of each class as (num classes,)
+        """
+        self._predict_buffer[...] = sample_window.reshape(self._predict_buffer.shape)
+        return self.inference_backend().predict_window(self._predict_buffer)
+
     def predict(self,
                 sample_window: np.ndarray) -> Tuple[float, str]:
         """
@@ -338,31 +878,82 @@ class ActivityModel:
         :param sample_window: The numpy array containing the sample window
         :return: The sample confidence as 0.0 to 1.0 and the string name of the predicted activity.
         """
-        prediction = self._activity_model.predict(sample_window)
-        certainty = np.max(prediction) * 100
-        activity = np.round(prediction, 0)
-        activity_name = "Unknown"
-        for cl in self._activity_classes:
-            if np.all(cl[self._CLASS_AS_ONE_HOT] == activity[0]):
-                activity_name = cl[self._ACTIVITY_NAME]
-                break
+        return self.classify(self.predict_probabilities(sample_window))
+
+    def classify(self,
+                 probabilities: np.ndarray) -> Tuple[float, str]:
+        """
+        Name the most likely activity given the probability of each class, e.g. as predicted for a window.
+
+        :param probabilities: The probability of each class as (num classes,)
+        :return: The certainty as 0.0 to 100.0 and the string name of the most likely activity.
+        """
+        best = int(np.argmax(probabilities))
+        certainty = probabilities[best] * 100
+        # The activity is only named if it is more likely than not.
+        activity_name = self._class_name_by_index[best] if probabilities[best] > 0.5 else "Unknown"
         return (certainty, activity_name)  # noqa
 
     def run_experiment(self,
-                       experiment_file: str = './experiment-1.csv') -> None:
+                       experiment_file: str = './experiment-1.csv',
+                       batch_size: int = 1024,
+                       print_results: bool = True) -> 'pd.DataFrame':
         """
-        Load the experiment file and predict the sequence of activity it collected. Do this by selecting 10%
-        of random entry points and 'look_back_window' slice of observations.
+        Load the experiment file and predict the activity of every look back window in it. The windows are
+        passed to the model a large batch at a time, and the results are decoded for all windows at once.
+
+        :param experiment_file: The csv file or recording store (.rec) of accelerometer readings to classify, the
+                                recordings of a store are classified as one experiment end to end.
+        :param batch_size: The number of windows passed to the model in one forward pass.
+        :param print_results: If True print the results as runs of consecutive windows of the same activity.
+        :return: DataFrame with one row per window, indexed by the first sample of the window, giving the
+                 predicted activity, the certainty as 0.0 to 1.0 and the probability of every class.
         """
+        import pandas as pd
         print("Loading experiment[{}]".format(experiment_file))
-        # Load csv as DataFrame and remove the first index column.
-        x = np.delete(pd.read_csv(experiment_file).to_numpy(), 0, 1)
-        x, _ = self.data_to_look_back_data_set(x, np.zeros((1)))
-        shape = (1, x.shape[1], x.shape[2], 1)
-        # for i in np.random.randint(0, x.shape[0], int(x.shape[0] * .1)):  # Run 10% as tests
-        for i in range(x.shape[0]):
-            certainty, activity_name = self.predict(np.reshape(x[i], shape))
-            print("Sample # [{}] Activity [{}] with certainty {:.0f}%".format(i, activity_name, certainty))
+        if experiment_file.endswith(RecordingStore.FILE_EXTENSION):
+            x = RecordingStore(experiment_file).samples(self._dtype)
+        else:
+            x = RecordingLoader.read_recording(experiment_file, dtype=self._dtype)
+        windows = LookBackWindows.strided_windows(x, self._look_back_window_size)
+
+        backend = self.inference_backend()
+        probabilities = np.zeros((len(windows), self._n_classes), dtype=np.float32)
+        for i in range(0, len(windows), batch_size):
+            batch = windows[i:i + batch_size].reshape(tuple((-1, *self._activity_model_input_shape)))
+            probabilities[i:i + batch_size] = backend.predict_batch(batch)
+
+        best = np.argmax(probabilities, axis=-1)
+        certainty = probabilities[np.arange(len(best)), best]
+        # The activity is only named if it is more likely than not, index n_classes is Unknown.
+        names = np.array(self._class_name_by_index + ["Unknown"])
+        activity = names[np.where(certainty > 0.5, best, self._n_classes)]
+
+        results = pd.DataFrame(probabilities, columns=self._class_name_by_index)
+        results.insert(0, 'activity', activity)
+        results.insert(1, 'certainty', certainty)
+        results.index.name = 'sample'
+        if print_results:
+            self._print_activity_runs(activity, certainty)
+        return results
+
+    @staticmethod
+    def _print_activity_runs(activity: np.ndarray,
+                             certainty: np.ndarray) -> None:
+        """
+        Print the predictions as runs of consecutive windows predicted as the same activity.
+
+        :param activity: The predicted activity of each window
+        :param certainty: The certainty of the prediction of each window as 0.0 to 1.0
+        """
+        run_starts = np.concatenate([[0], np.flatnonzero(activity[1:] != activity[:-1]) + 1])
+        run_ends = np.concatenate([run_starts[1:], [len(activity)]])
+        mean_certainty = np.add.reduceat(certainty, run_starts) / (run_ends - run_starts) if len(activity) > 0 else []
+        for start, end, mean in zip(run_starts, run_ends, mean_certainty):
+            print("Sample # [{}] to [{}] Activity [{}] with mean certainty {:.0f}%".format(start,
+                                                                                         end - 1,
+                                                                                         activity[start],
+                                                                                         mean * 100))
         return
 
     def data_to_look_back_data_set(self,
@@ -370,22 +961,20 @@ class ActivityModel:
                                    x_data_one_hot: np.array) -> Tuple[np.ndarray, np.ndarray]:
         """
         Take x and y data and convert into look_back format data suitable for LSTM training.
+
+        No data is copied, X is a read only strided view on x_data and Y is the one hot encoding broadcast
+        to one row per frame.
         :param x_data: the X data set
         :param x_data_one_hot: the one hot encoding of the data type of X (Circle etc.)
         :return: X,Y data as look back frames.
         """
-        num_frames = len(x_data) - (self._look_back_window_size - 1)
-        x_look_back_data_set = np.zeros((num_frames, self._look_back_window_size, x_data.shape[1]))
-        y_look_back_data_set = np.zeros((num_frames, x_data_one_hot.shape[0]))
-        i = 0
-        for f in range(0, num_frames):
-            x_look_back_data_set[i] = (x_data[i:i + self._look_back_window_size])
-            y_look_back_data_set[i] = x_data_one_hot
-            i += 1
+        x_look_back_data_set = LookBackWindows.strided_windows(x_data, self._look_back_window_size)
+        y_look_back_data_set = np.broadcast_to(x_data_one_hot, (x_look_back_data_set.shape[0],
+                                                                x_data_one_hot.shape[0]))
         return tuple((x_look_back_data_set, y_look_back_data_set))
 
     def create_model(self,
-                     model_type: 'ModelType') -> Tuple[tf.keras.Model, Tuple]:
+                     model_type: 'ModelType') -> Tuple['tf.keras.Model', Tuple]:
         """
         Create a model of the given type
         """
@@ -397,13 +986,14 @@ class ActivityModel:
             model, shape = self.create_cnn_network()
         return tuple((model, shape))
 
-    def create_cnn_network(self) -> Tuple[tf.keras.Model, Tuple]:
+    def create_cnn_network(self) -> Tuple['tf.keras.Model', Tuple]:
         """
         Create the CNN model that will be used as the accelerometer sequence classifier.
 
         This is a 1D Convolution, but modelled as a 2D Conv as the target TF Lite environment does
         not (yet) support 1D Convolution
         """
+        import tensorflow as tf
         shape = tuple((self._look_back_window_size, self._n_features, 1))
         model = tf.keras.Sequential([
             tf.keras.layers.Conv2D(filters=8, kernel_size=(3, 1), activation='relu',
@@ -415,7 +1005,7 @@ class ActivityModel:
             tf.keras.layers.Flatten(),
             tf.keras.layers.Dense(25, activation='relu', name='Dense1'),
             tf.keras.layers.Dropout(0.3, name="Dropout-Regularise3"),
-            tf.keras.layers.Dense(self._n_classes, activation='softmax', name='Output')
+            tf.keras.layers.Dense(self._n_classes, activation='softmax', name='Output', dtype='float32')
         ], name="cnn-activity-model")
 
         #
@@ -429,13 +1019,15 @@ class ActivityModel:
             optimizer=tf.keras.optimizers.Adam(learning_rate=decayed_lr),
             loss=tf.keras.losses.categorical_crossentropy
         )
-        print(model.summary())
+        if self._verbose:
+            model.summary()
         return tuple((model, shape))
 
-    def create_lstm_network(self) -> Tuple[tf.keras.Model, Tuple]:
+    def create_lstm_network(self) -> Tuple['tf.keras.Model', Tuple]:
         """
         Create the LSTM model that will be used as the accelerometer sequence classifier
         """
+        import tensorflow as tf
         shape = tuple((self._look_back_window_size, self._n_features))
         model = tf.keras.Sequential([
             tf.keras.layers.LSTM(units=10,
@@ -445,7 +1037,7 @@ class ActivityModel:
             tf.keras.layers.Dense(50, activation='relu', name="dense-1"),
             tf.keras.layers.Dropout(0.2, name="Dropout-Regularise2"),
             tf.keras.layers.Dense(10, activation='relu', name="dense-2"),
-            tf.keras.layers.Dense(self._n_classes, activation='softmax', name='output')
+            tf.keras.layers.Dense(self._n_classes, activation='softmax', name='output', dtype='float32')
         ], name="lstm-activity-model")
 
         #
@@ -455,18 +1047,20 @@ class ActivityModel:
             optimizer=tf.keras.optimizers.Adam(learning_rate=1e-3),
             loss=tf.keras.losses.categorical_crossentropy
         )
-        print(model.summary())
+        if self._verbose:
+            model.summary()
         return tuple((model, shape))
 
-    def create_simple_network(self) -> Tuple[tf.keras.Model, Tuple]:
+    def create_simple_network(self) -> Tuple['tf.keras.Model', Tuple]:
         """
         Treat the sequence as a flat vector of length look_back * num_features
         :return: A Dense model.
         """
-        shape = self._look_back_window_size * self._n_features
+        import tensorflow as tf
+        shape = tuple((self._look_back_window_size * self._n_features,))
         model = tf.keras.Sequential([
-            tf.keras.layers.Dense(units=shape,
-                                  input_dim=1,
+            tf.keras.layers.Dense(units=shape[0],
+                                  input_shape=shape,
                                   activation='relu',
                                   name="input"),
             tf.keras.layers.Dense(units=round(self._look_back_window_size / self._n_features, 0),
@@ -476,7 +1070,7 @@ class ActivityModel:
             tf.keras.layers.Dense(units=self._n_features * 2,
                                   activation='relu',
                                   name="dense-2"),
-            tf.keras.layers.Dense(self._n_classes, activation='softmax', name='output')
+            tf.keras.layers.Dense(self._n_classes, activation='softmax', name='output', dtype='float32')
         ], name="simple-model")
 
         model.compile(
@@ -484,8 +1078,9 @@ class ActivityModel:
             loss=tf.keras.losses.categorical_crossentropy
         )
 
-        print(model.summary())
-        return tuple((model, tuple(shape)))
+        if self._verbose:
+            model.summary()
+        return tuple((model, shape))
 
     def export_as_tf_lite(self) -> None:
         """
@@ -497,10 +1092,48 @@ class ActivityModel:
         The c form is written as <model_name>.h
 
         Both of these are written to the export file path defined in this class.
+
+        The model is exported with the quantization it was created with. If that is not none and data is
+        loaded, the float and quantized forms are compared side by side, see compare_tflite_models.
         """
-        if self._activity_model is not None and self._activity_model_trained:
-            TFLiteGenerator.generate_tflite_files(file_path=self._export_filepath,
-                                                  model_to_export=self._activity_model)
+        from TFLiteGenerator import TFLiteGenerator
+        if self._activity_model_trained:
+            exported_model = TFLiteGenerator.generate_tflite_files(
+                file_path=self._export_filepath,
+                model_to_export=self._model(),
+                input_shape=self._tflite_input_shape(),
+                quantization=self._quantization,
+                representative_data=self._representative_data() if self._quantization == 'int8' else None)
+            if self._quantization != 'none' and self._windows is not None:
+                self.compare_tflite_models({'none': self._tflite_model('none'),
+                                            self._quantization: exported_model})
         else:
             raise ValueError("The model must be both created and trained before it can be exported as TF-Lite")
         return
+
+    def compare_tflite_models(self,
+                              tflite_models: Dict[str, bytes]) -> 'pd.DataFrame':
+        """
+        Run each TF Lite form of the model in the TF Lite interpreter on the host and report its size, single
+        window latency and accuracy on the test data, so a quantized model can be checked against the float
+        model before it is shipped to the device.
+
+        :param tflite_models: The TF Lite binary form of the model by name e.g. by quantization
+        :return: DataFrame with a row per model of its size in bytes, median latency in ms and test accuracy
+        """
+        import pandas as pd
+        from TFLiteInferenceBackend import TFLiteInferenceBackend
+        if not self._activity_model_trained or self._windows is None:
+            raise RuntimeError("Train the model or load weights and load data before comparing TF Lite models")
+        results = list()
+        for name, model_content in tflite_models.items():
+            backend = TFLiteInferenceBackend(model_content=model_content, num_threads=self._inference_threads)
+            confusion = self.confusion_matrix(backend=backend)
+            results.append(tuple((name,
+                                  len(model_content),
+                                  1000 * self.measure_inference_latency(backend=backend),
+                                  np.trace(confusion) / np.sum(confusion))))
+        comparison = pd.DataFrame(results, columns=['quantization', 'size_bytes', 'latency_ms', 'accuracy'])
+        comparison = comparison.set_index('quantization')
+        print("TF Lite models on the host\n{}".format(comparison.to_string(float_format='{:.4f}'.format)))
+        return comparison
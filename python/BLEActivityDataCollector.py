@@ -1,4 +1,5 @@
 import asyncio
+from typing import List
 from bleak import BleakScanner
 from bleak import BleakClient
 from BLEMessage import BLEMessage
@@ -29,13 +30,15 @@ class BLEActivityDataCollector:
                  conf: Conf,
                  ble_stream: BLEStream,
                  sample_period: int = 10,
-                 verbose: bool = True):
+                 verbose: bool = True,
+                 ble_device=None):
         """
         Establish the BLEActivityCollector
         :param conf: JSON Config manager
         :param ble_stream: The BLE Stream to send the updates to.
         :param sample_period: The number of seconds to listen for
         :param verbose: If True enable verbose logging
+        :param ble_device: Optional device to connect to, as found by discover, otherwise the first device found
 
         """
         self._verbose = verbose
@@ -50,7 +53,7 @@ class BLEActivityDataCollector:
                 "Missing or bad settings in config file [{}] with error [{}]".format(conf.source_file, str(e)))
         self._notify_uuid_accel_xyz = self._ble_characteristic_uuid + self._ble_base_uuid.format(0XFFE1)
         self._sample_period = sample_period
-        self._ble_device_address = None
+        self._ble_device_address = ble_device
         self._ble_stream = ble_stream
         self._ble_stream.open()
         return
@@ -67,28 +70,45 @@ class BLEActivityDataCollector:
             print(str(ble_msg))
         return
 
-    async def run(self) -> None:
+    @staticmethod
+    async def discover(conf: Conf) -> List:
+        """
+        Scan for all the devices with the collector device name, so a collector can be run for each of them.
+        :param conf: JSON Config manager
+        :return: The devices found
+        """
         devices = await BleakScanner.discover()  # Scan for available BLE devices
+        return [d for d in devices if d.name == conf.config['ble_collector']['service_name']]
 
-        # Connect to the device 'ActivityCollector'; the exact device name is set in the JSON config.
-        # The Arduino sketches use the same JSON config
-        for d in devices:
-            if d.name == self._ble_device_name:
-                self._ble_device_address = d
-                break  # we only connect to the first device with this name
+    async def run(self) -> None:
+        # The stream is always closed, even if no device is found or the connection fails, so any worker the
+        # stream has started is stopped.
+        try:
+            if self._ble_device_address is None:
+                devices = await BleakScanner.discover()  # Scan for available BLE devices
 
-        if self._ble_device_address is not None:
-            async with BleakClient(self._ble_device_address, timeout=self._ble_connect_timeout) as client:
+                # Connect to the device 'ActivityCollector'; the exact device name is set in the JSON config.
+                # The Arduino sketches use the same JSON config
+                for d in devices:
+                    if d.name == self._ble_device_name:
+                        self._ble_device_address = d
+                        break  # we only connect to the first device with this name
 
-                print("connect to {} at address {}".format(self._ble_device_name, self._ble_device_address))
-                try:
-                    await client.start_notify(self._notify_uuid_accel_xyz, self.callback_accel_xyz)
-                    await asyncio.sleep(self._sample_period)
-                    await client.stop_notify(self._notify_uuid_accel_xyz)
-                    print("Disconnect from {} at address {}".format(self._ble_device_name, self._ble_device_address))
-                    self._ble_stream.close()
-                    print("Done Ok")
-                except Exception as e:
-                    print(e)
-        else:
-            print("No BLE device with name {} found".format(self._ble_device_name))
+            if self._ble_device_address is not None:
+                async with BleakClient(self._ble_device_address, timeout=self._ble_connect_timeout) as client:
+
+                    print("connect to {} at address {}".format(self._ble_device_name, self._ble_device_address))
+                    try:
+                        await client.start_notify(self._notify_uuid_accel_xyz, self.callback_accel_xyz)
+                        await asyncio.sleep(self._sample_period)
+                        await client.stop_notify(self._notify_uuid_accel_xyz)
+                        print("Disconnect from {} at address {}".format(self._ble_device_name,
+                                                                        self._ble_device_address))
+                        print("Done Ok")
+                    except Exception as e:
+                        print(e)
+            else:
+                print("No BLE device with name {} found".format(self._ble_device_name))
+        finally:
+            self._ble_stream.close()
+        return
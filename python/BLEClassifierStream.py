@@ -1,27 +1,99 @@
 import numpy as np
-from typing import Deque
-from collections import deque
+from typing import Tuple, Optional
+from concurrent.futures import Future
 from BLEMessage import BLEMessage
 from BLEStream import BLEStream
 from ActivityModel import ActivityModel
+from PredictionSmoother import PredictionSmoother
+from InferenceService import InferenceService
+from InferenceOffload import InferenceOffload
+from StreamingInferenceBackend import StreamingInferenceBackend
 
 
 class BLEClassifierStream(BLEStream):
     """
     Class to classify a rolling window of accelerometer updates
+
+    The window is classified once it is full and then every hop size updates, in between updates are only
+    buffered. A hop size of predict_interval / sample_interval classifies at the same cadence as the device.
+
+    If an inference service is given the windows are predicted by it, in micro batches with the windows of the
+    other streams it serves, rather than one at a time by the model.
+
+    The window is held in a ring buffer allocated once, in the dtype of the model, that every update is written
+    straight into. Each update is written twice, window length rows apart, so the latest window is always a
+    contiguous run of rows that is passed to the model as a view, without any copy or allocation per update.
+
+    If max queued is given the windows are predicted on a worker thread, fed through a bounded queue, so writing
+    an update never waits for the model, see InferenceOffload.
+
+    If a streaming backend is given every update is pushed to it as it is written, so a prediction only costs
+    the work of the latest update rather than a pass over the whole window. The first streaming prediction is
+    checked against a full window pass.
     """
-    _data: Deque[BLEMessage]
+    _window: np.ndarray
+    _window_shape: Tuple
+    _next_row: int
+    _num_updates: int
     _classifier_window_len: int
     _output_file: str
     _activity_model: ActivityModel
+    _hop_size: int
+    _updates_to_next_prediction: int
+    _smoother: PredictionSmoother
+    _inference_service: InferenceService
+    _offload: InferenceOffload
+    _streaming_backend: StreamingInferenceBackend
+    _streaming_checked: bool
+    _name: str
 
     def __init__(self,
-                 activity_model: ActivityModel
+                 activity_model: ActivityModel,
+                 hop_size: int = 1,
+                 smoother: PredictionSmoother = None,
+                 inference_service: InferenceService = None,
+                 name: str = None,
+                 max_queued: int = 0,
+                 overflow: str = 'drop_oldest',
+                 streaming_backend: StreamingInferenceBackend = None
                  ):
+        """
+        :param activity_model: The trained model to classify the window with
+        :param hop_size: The number of updates between predictions, 1 to predict on every update
+        :param smoother: Optional smoother of the predictions, to report the activity over recent predictions
+        :param inference_service: Optional service shared by many streams to predict the windows
+        :param name: Optional name of the stream e.g. the device address, to tell the activity of each stream apart
+        :param max_queued: The most windows waiting to be predicted on the worker, 0 to predict as updates are
+                           written
+        :param overflow: What to do with a new window when the queue is full, see InferenceOffload
+        :param streaming_backend: Optional backend, for this stream only, to predict update by update
+        """
+        if hop_size < 1:
+            raise ValueError("Hop size must be at least 1 but was [{}]".format(hop_size))
+        if streaming_backend is not None and (inference_service is not None or max_queued > 0):
+            # The state of the streaming backend moves on with every update, so it must be predicted in step.
+            raise ValueError("Streaming predictions cannot be offloaded or predicted by an inference service")
         self._activity_model = activity_model
         self._classifier_window_len = self._activity_model.look_back_window_size()
-        self._data = deque(maxlen=self._classifier_window_len)  # we only keep a rolling window as needed by the model.
-        self._accelerometer_data = None  # noqa
+        self._window_shape = self._activity_model.classification_input_shape()
+        num_features = int(np.prod(self._window_shape)) // self._classifier_window_len
+        if num_features != 3:
+            raise ValueError("Expected model with x,y,z features but it has [{}] features".format(num_features))
+        # we only keep a rolling window as needed by the model.
+        self._window = np.zeros((2 * self._classifier_window_len, num_features), dtype=self._activity_model.dtype())
+        self._next_row = 0
+        self._num_updates = 0
+        self._hop_size = hop_size
+        self._updates_to_next_prediction = self._classifier_window_len
+        self._smoother = smoother if smoother is not None else \
+            PredictionSmoother(num_classes=self._activity_model.num_classes())
+        self._inference_service = inference_service
+        self._name = name
+        self._streaming_backend = streaming_backend
+        self._streaming_checked = False
+        self._offload = None  # noqa
+        if max_queued > 0:
+            self._offload = InferenceOffload(predict=self._predict, max_queued=max_queued, overflow=overflow)
         return
 
     def open(self) -> None:
@@ -35,36 +107,121 @@ class BLEClassifierStream(BLEStream):
         """
         Just not the stream as finished
         """
+        if self._offload is not None:
+            self._offload.close()
+            print("Windows {}".format(self._offload.stats()))
         print("BLE Classifier Stream finished")
         return
 
     def _as_numpy(self) -> np.ndarray:
         """
-        Covert the current data to numpy form needed to pass to model for classification.
-        :return: numpy array of dimension [1, len data, 3]
+        The latest window in the form needed to pass to model for classification.
+        :return: view of the latest window in the ring buffer in the model classification input shape
+        """
+        return self._window[self._next_row:self._next_row + self._classifier_window_len].reshape(self._window_shape)
+
+    def _append(self,
+                ble_message: BLEMessage) -> None:
+        """
+        Write the update into the ring buffer, in both of its rows.
+        :param ble_message: The xyz accelerometer update
         """
-        shape = self._activity_model.classification_input_shape()
-        asnp = np.zeros(shape)
-        for i in range(0, len(self._data)):
-            asnp[0, i] = np.asarray(self._data[i].get()).reshape(shape[2:])
-            i += 1
-        return asnp
+        # The two rows of the update are the next row and the one window length after it.
+        self._window[self._next_row::self._classifier_window_len] = (ble_message.get_accelerometer_x(),
+                                                                     ble_message.get_accelerometer_y(),
+                                                                     ble_message.get_accelerometer_z())
+        self._next_row = (self._next_row + 1) % self._classifier_window_len
+        self._num_updates = min(self._num_updates + 1, self._classifier_window_len)
+        return
 
     def write_value(self,
                     ble_message: BLEMessage) -> None:
         """
         Track tle last window_len of accelerometer updates and as soon as there are sufficient messages
-        start classifying the activity.
+        start classifying the activity every hop size updates.
         :param ble_message: The xyz accelerometer update in from of a BLEMEssage
         """
-        self._data.append(ble_message)
-        if len(self._data) >= self._classifier_window_len:
-            certainty, activity_name = self._activity_model.predict(self._as_numpy())
-            print("{}: Activity [{}] with certainty {:.0f}%".format(self.ts(),
-                                                                    activity_name,
-                                                                    certainty))
+        self._append(ble_message)
+        if self._streaming_backend is not None:
+            self._streaming_backend.push(self._window[self._next_row - 1])  # The row just written
+        self._updates_to_next_prediction -= 1
+        if self._num_updates >= self._classifier_window_len:
+            if self._updates_to_next_prediction <= 0:
+                self._updates_to_next_prediction = self._hop_size
+                if self._streaming_backend is not None:
+                    self._report(self._streaming_prediction())
+                elif self._offload is None:
+                    self._predict(self._as_numpy())
+                else:
+                    self._offload.submit(self._as_numpy())
         else:
             print("{}: Waiting for sufficient data {} of required {} seen ".format(self.ts(),
-                                                                                   len(self._data),
+                                                                                   self._num_updates,
                                                                                    self._classifier_window_len))
         return
+
+    def offload_stats(self) -> Optional[dict]:
+        """
+        :return: The windows queued, dropped & processed by the worker, None if predicting as updates are written
+        """
+        return self._offload.stats() if self._offload is not None else None
+
+    def _predict(self,
+                 window: np.ndarray) -> None:
+        """
+        Predict the window and report the activity.
+
+        On the worker the prediction of the inference service is waited for, so the bounded queue holds back
+        windows while the service is busy.
+        :param window: The window in the model classification input shape
+        """
+        if self._inference_service is None:
+            self._report(self._activity_model.predict_probabilities(window))
+        elif self._offload is None:
+            self._inference_service.submit(window).add_done_callback(self._report_future)
+        else:
+            self._report_future(self._inference_service.submit(window))
+        return
+
+    def _streaming_prediction(self) -> np.ndarray:
+        """
+        Predict the latest window from the state of the streaming backend, checking the first prediction against
+        a full pass over the window.
+        :return: The probability of each class as (num classes,)
+        """
+        probabilities = self._streaming_backend.predict_latest()
+        if not self._streaming_checked:
+            full_window = self._streaming_backend.predict_window(self._as_numpy())
+            difference = float(np.max(np.abs(probabilities - full_window)))
+            if difference > ActivityModel.NUMPY_PARITY_TOLERANCE:
+                raise RuntimeError("Streaming prediction differs from full window by [{}]".format(difference))
+            self._streaming_checked = True
+        return probabilities
+
+    def _report_future(self,
+                       prediction: Future) -> None:
+        """
+        Report the activity of a window predicted by the inference service.
+        :param prediction: The completed prediction of the window
+        """
+        try:
+            self._report(prediction.result())
+        except Exception as e:
+            print("{}: Prediction failed [{}]".format(self.ts(), str(e)))
+        return
+
+    def _report(self,
+                probabilities: np.ndarray) -> None:
+        """
+        Smooth the prediction of the latest window and report the activity.
+        :param probabilities: The probability of each class predicted for the latest window
+        """
+        certainty, activity_name = self._activity_model.classify(self._smoother.update(probabilities))
+        if self._name is None:
+            print("{}: Activity [{}] with certainty {:.0f}%".format(self.ts(), activity_name, certainty))
+        else:
+            print("{}: [{}] Activity [{}] with certainty {:.0f}%".format(self.ts(),
+                                                                         self._name,
+                                                                         activity_name,
+                                                                         certainty))
+        return
@@ -1,29 +1,46 @@
-from typing import Deque
+from typing import Deque, TYPE_CHECKING
 from collections import deque
-import pandas as pd
+import numpy as np
 from BLEMessage import BLEMessage
 from BLEStream import BLEStream
+from RecordingStore import RecordingStore
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class BLEFileStream(BLEStream):
     """
     Class to manage an ordered set of accelerometer updates over Bluetooth and persist them to file.
+
+    If the output file has the RecordingStore file extension (.rec) the updates are written in binary
+    columnar form, otherwise they are written as csv.
     """
     _data: Deque[BLEMessage]
-    _accelerometer_data: pd.DataFrame
+    _accelerometer_data: 'pd.DataFrame'
     _output_file: str
+    _class_name: str
+    _sample_interval: int
+    _device: str
 
     def __init__(self,
-                 output_file: str
+                 output_file: str,
+                 class_name: str = '',
+                 sample_interval: int = 0,
+                 device: str = ''
                  ):
+        """
+        :param output_file: The file to write the updates to on close.
+        :param class_name: The activity class being recorded, saved in the header of binary recordings.
+        :param sample_interval: The milli seconds between updates, saved in the header of binary recordings.
+        :param device: The name of the device being recorded, saved in the header of binary recordings.
+        """
         self._data = deque()
         self._output_file = output_file
+        self._class_name = class_name
+        self._sample_interval = sample_interval
+        self._device = device
         self._accelerometer_data = None  # noqa
-        self._reset()
-        return
-
-    def _reset(self):
-        self._accelerometer_data = pd.DataFrame(columns=['accel_x', 'accel_y', 'accel_z'])
         return
 
     def open(self) -> None:
@@ -35,10 +52,17 @@ class BLEFileStream(BLEStream):
 
     def close(self) -> None:
         """
-        Write the current set of values to the output file.
+        Write the current set of values to the output file, if any were received.
         """
-        print("Write data to csv {}".format(self._output_file))
-        self._write_to_csv_file()
+        if len(self._data) == 0:
+            print("No updates received, nothing written to {}".format(self._output_file))
+            return
+        if self._output_file.endswith(RecordingStore.FILE_EXTENSION):
+            print("Write data to recording store {}".format(self._output_file))
+            self._write_to_store_file()
+        else:
+            print("Write data to csv {}".format(self._output_file))
+            self._write_to_csv_file()
         return
 
     def write_value(self,
@@ -55,9 +79,19 @@ class BLEFileStream(BLEStream):
         """
         Write all of the collected BLE Messages to the output file as csv
         """
-        self._reset()
-        for msg in self._data:
-            ser = pd.Series(msg.get(), index=self._accelerometer_data.columns)
-            self._accelerometer_data = self._accelerometer_data.append(ser, ignore_index=True)
+        import pandas as pd  # Only needed for csv, and slow to import
+        self._accelerometer_data = pd.DataFrame([msg.get() for msg in self._data],
+                                                columns=['accel_x', 'accel_y', 'accel_z'])
         self._accelerometer_data.to_csv(self._output_file)
         return
+
+    def _write_to_store_file(self) -> None:
+        """
+        Write all of the collected BLE Messages to the output file as a single recording store
+        """
+        RecordingStore.write(store_file=self._output_file,
+                             recordings=[np.array([msg.get() for msg in self._data], dtype=np.float32).reshape(-1, 3)],
+                             class_names=[self._class_name],
+                             sample_interval=self._sample_interval,
+                             devices=[self._device])
+        return
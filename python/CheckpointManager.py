@@ -0,0 +1,267 @@
+import io
+import json
+import time
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, Future
+from os import remove, replace
+from os.path import join, exists
+import numpy as np
+import tensorflow as tf
+
+
+class CheckpointManager(tf.keras.callbacks.Callback):
+    """
+    Keras callback that saves resumable checkpoints of the model weights and optimizer state.
+
+    At the end of every epoch the weights and optimizer state are copied into memory and then written to disk
+    by a single background thread, so the training loop only waits on the copy and never on the disk. The
+    background thread writes the state of the epoch as the last checkpoint (used to resume training) and keeps
+    the best keep_best epochs by validation loss, deleting any that fall out of the best.
+
+    A manifest (checkpoint-<model>.json) lists the checkpoints along with the config and data fingerprint each
+    was trained on, so training is only resumed on the same model settings and data. The manifest is only
+    updated once a checkpoint file is completely written, so it never points at a partial file.
+
+    The state of other callbacks (e.g. early stopping patience) is not saved, so it starts afresh on resume.
+    """
+    CHECKPOINT_VERSION = 1
+    # Settings that can change on resume, as they do not change the shape of the weights.
+    RESUMABLE_SETTINGS = ['training_steps', 'adaptive_training', 'augmentation']
+
+    _checkpoint_path: str
+    _model_name: str
+    _config: Dict
+    _data_fingerprint: str
+    _keep_best: int
+    _manifest_file: str
+    _manifest: Dict
+    _writer: Optional[ThreadPoolExecutor]
+    _pending: List[Future]
+
+    def __init__(self,
+                 checkpoint_path: str,
+                 model_name: str,
+                 config: Dict,
+                 data_fingerprint: str = None,
+                 keep_best: int = 3):
+        """
+        :param checkpoint_path: The path to write the checkpoints and manifest to
+        :param model_name: The model name used to name the checkpoint files
+        :param config: The model config the checkpoints are trained with
+        :param data_fingerprint: The fingerprint of the data the checkpoints are trained on
+        :param keep_best: The number of checkpoints with the lowest validation loss to keep
+        """
+        super().__init__()
+        if keep_best < 1:
+            raise ValueError("Must keep at least one best checkpoint, but keep best is [{}]".format(keep_best))
+        self._checkpoint_path = checkpoint_path
+        self._model_name = model_name
+        self._config = config
+        self._data_fingerprint = data_fingerprint
+        self._keep_best = keep_best
+        self._manifest_file = join(checkpoint_path, 'checkpoint-' + model_name + '.json')
+        self._manifest = self._load_manifest()
+        self._writer = None
+        self._pending = list()
+        return
+
+    @property
+    def manifest(self) -> Dict:
+        """
+        The manifest of the checkpoints written so far.
+        :return: The manifest as a dictionary
+        """
+        return self._manifest
+
+    def _load_manifest(self) -> Dict:
+        """
+        Load the manifest of existing checkpoints, or an empty manifest if there is none.
+        :return: The manifest as a dictionary
+        """
+        if exists(self._manifest_file):
+            with open(self._manifest_file, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == self.CHECKPOINT_VERSION:
+                return manifest
+            print("Warning, ignoring checkpoint manifest [{}] of unknown version".format(self._manifest_file))
+        return {'version': self.CHECKPOINT_VERSION, 'model': self._model_name, 'last': None, 'best': list()}
+
+    def _write_manifest(self) -> None:
+        """
+        Replace the manifest file in a single step so it is never seen part written.
+        """
+        tmp_file = self._manifest_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self._manifest, f, indent=2)
+        replace(tmp_file, self._manifest_file)
+        return
+
+    def clean(self) -> None:
+        """
+        Delete all of the checkpoints in the manifest, and the manifest, so a new training run starts afresh.
+        """
+        entries = self._manifest['best'] + ([self._manifest['last']] if self._manifest['last'] else [])
+        for entry in entries:
+            checkpoint_file = join(self._checkpoint_path, entry['file'])
+            if exists(checkpoint_file):
+                remove(checkpoint_file)
+        if exists(self._manifest_file):
+            remove(self._manifest_file)
+        self._manifest = self._load_manifest()
+        return
+
+    @staticmethod
+    def _optimizer_variables(optimizer: tf.keras.optimizers.Optimizer) -> List[tf.Variable]:
+        """
+        The optimizer state (step count and slots such as the Adam moments) as a list of variables.
+        :param optimizer: The optimizer to get the state of
+        :return: The list of optimizer variables
+        """
+        variables = optimizer.variables
+        return list(variables() if callable(variables) else variables)  # a method in older versions of Keras
+
+    def on_train_begin(self,
+                       logs: Dict = None) -> None:
+        self._writer = ThreadPoolExecutor(max_workers=1)  # One writer so checkpoints are written in epoch order
+        self._pending = list()
+        return
+
+    def on_epoch_end(self,
+                     epoch: int,
+                     logs: Dict = None) -> None:
+        self._raise_write_errors()
+        logs = logs or {}
+        val_loss = logs.get('val_loss', logs.get('loss'))
+        # Copy the state now, as training moves on while the copy is written.
+        state = {'weight_{}'.format(i): w for i, w in enumerate(self.model.get_weights())}
+        for i, v in enumerate(self._optimizer_variables(self.model.optimizer)):
+            state['optimizer_{}'.format(i)] = v.numpy()
+        self._pending.append(self._writer.submit(self._write_checkpoint, epoch + 1, float(val_loss), state))
+        return
+
+    def on_train_end(self,
+                     logs: Dict = None) -> None:
+        self._writer.shutdown(wait=True)
+        self._raise_write_errors()
+        return
+
+    def _raise_write_errors(self) -> None:
+        """
+        Raise any error seen by the background writer on the training thread.
+        """
+        done = [f for f in self._pending if f.done()]
+        self._pending = [f for f in self._pending if f not in done]
+        for f in done:
+            f.result()
+        return
+
+    def _save_file(self,
+                   checkpoint_file: str,
+                   state: Dict[str, np.ndarray]) -> None:
+        """
+        Write the state to a checkpoint file in a single step so it is never seen part written.
+        :param checkpoint_file: The name of the checkpoint file in the checkpoint path
+        :param state: The weights and optimizer state to write
+        """
+        buffer = io.BytesIO()
+        np.savez(buffer, **state)
+        tmp_file = join(self._checkpoint_path, checkpoint_file + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(buffer.getbuffer())
+        replace(tmp_file, join(self._checkpoint_path, checkpoint_file))
+        return
+
+    def _write_checkpoint(self,
+                          epoch: int,
+                          val_loss: float,
+                          state: Dict[str, np.ndarray]) -> None:
+        """
+        Write the checkpoint of an epoch, run on the background writer thread.
+        :param epoch: The number of epochs trained
+        :param val_loss: The validation loss at the end of the epoch
+        :param state: The weights and optimizer state at the end of the epoch
+        """
+        entry = {'epoch': epoch,
+                 'val_loss': val_loss,
+                 'saved': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                 'config': self._config,
+                 'data_fingerprint': self._data_fingerprint}
+
+        last_file = 'cp-' + self._model_name + '-last.npz'
+        self._save_file(last_file, state)
+        self._manifest['last'] = dict(entry, file=last_file)
+
+        best = self._manifest['best']
+        if len(best) < self._keep_best or val_loss < best[-1]['val_loss']:
+            best_file = 'cp-{}-{:04d}.npz'.format(self._model_name, epoch)
+            self._save_file(best_file, state)
+            best.append(dict(entry, file=best_file))
+            best.sort(key=lambda e: e['val_loss'])
+            evicted = best[self._keep_best:]
+            del best[self._keep_best:]
+            self._write_manifest()
+            for e in evicted:
+                if exists(join(self._checkpoint_path, e['file'])):
+                    remove(join(self._checkpoint_path, e['file']))
+        else:
+            self._write_manifest()
+        return
+
+    def _check_compatible(self,
+                          entry: Dict,
+                          strict: bool = True) -> None:
+        """
+        Check the checkpoint was trained with the same model settings and data as now.
+        :param entry: The manifest entry of the checkpoint
+        :param strict: If True raise an error on any difference, otherwise only print a warning
+        """
+        def settings(config: Dict) -> Dict:
+            return {k: v for k, v in config.items() if k not in self.RESUMABLE_SETTINGS}
+
+        problems = list()
+        if settings(entry['config']) != settings(self._config):
+            problems.append("Checkpoint [{}] was trained with config {} but the config is now {}"
+                            .format(entry['file'], entry['config'], self._config))
+        if self._data_fingerprint is not None and entry['data_fingerprint'] != self._data_fingerprint:
+            problems.append("Checkpoint [{}] was trained on different data, fingerprint [{}] but data is now [{}]"
+                            .format(entry['file'], entry['data_fingerprint'], self._data_fingerprint))
+        for problem in problems:
+            if strict:
+                raise RuntimeError(problem)
+            print("Warning, {}".format(problem))
+        return
+
+    def restore(self,
+                model: tf.keras.Model,
+                last: bool = True,
+                with_optimizer: bool = True) -> int:
+        """
+        Restore the model (and optimizer) from the last checkpoint, or the checkpoint with lowest validation loss.
+        :param model: The compiled model to restore into
+        :param last: If True restore the last checkpoint to resume training, otherwise restore the best. Only
+                     resuming needs the same config and data, restoring the best only warns of any difference.
+        :param with_optimizer: If True also restore the optimizer state
+        :return: The number of epochs the restored checkpoint was trained for, 0 if there is no checkpoint
+        """
+        entry = self._manifest['last'] if last else (self._manifest['best'][0] if self._manifest['best'] else None)
+        if entry is None:
+            return 0
+        self._check_compatible(entry, strict=last)
+        with np.load(join(self._checkpoint_path, entry['file'])) as checkpoint:
+            weights = [checkpoint['weight_{}'.format(i)] for i in range(len(model.get_weights()))]
+            if with_optimizer:
+                # The optimizer creates its slots on the first update, so apply a zero update to create them
+                # and then overwrite them, and the step count, from the checkpoint.
+                model.optimizer.apply_gradients([(tf.zeros_like(v), v) for v in model.trainable_variables])
+                variables = self._optimizer_variables(model.optimizer)
+                num_saved = len([k for k in checkpoint.files if k.startswith('optimizer_')])
+                if num_saved != len(variables):
+                    raise RuntimeError("Checkpoint [{}] has [{}] optimizer variables but optimizer has [{}]"
+                                       .format(entry['file'], num_saved, len(variables)))
+                for i, v in enumerate(variables):
+                    v.assign(checkpoint['optimizer_{}'.format(i)])
+            model.set_weights(weights)
+        print("Restored checkpoint [{}] at epoch [{}] with validation loss [{}]".format(entry['file'],
+                                                                                       entry['epoch'],
+                                                                                       entry['val_loss']))
+        return entry['epoch']
@@ -35,6 +35,53 @@ class Conf:
         """
         return self._conf
 
+    @property
+    def dtype(self) -> 'np.dtype':
+        """
+        The dtype that all data is held in from loading through to model input. Defaults to float32 as this is
+        the dtype the models compute in, so no casts are needed on the way into the model.
+        :return: The configured data dtype
+        """
+        import numpy as np
+        return np.dtype(self._conf.get('precision', {}).get('dtype', 'float32'))
+
+    @property
+    def mixed_precision(self) -> str:
+        """
+        The Keras mixed precision policy to train with e.g. mixed_bfloat16, or none to train in dtype.
+        :return: The configured mixed precision policy name
+        """
+        return self._conf.get('precision', {}).get('mixed_precision', 'none')
+
+    @property
+    def execution(self) -> dict:
+        """
+        The device and threading settings TensorFlow runs with, see ExecutionProfile.
+        :return: The execution settings with defaults for any not given in the config
+        """
+        execution = {'device': 'auto', 'intra_op_threads': 0, 'inter_op_threads': 0, 'xla': False}
+        execution.update(self._conf.get('execution', {}))
+        return execution
+
+    @property
+    def live_classifier(self) -> dict:
+        """
+        The settings the live stream is classified with on the host, see BLEClassifierStream.
+
+        A hop_size of 0 predicts at the same cadence as the device, every predict_interval / sample_interval
+        samples of the ble_predictor settings.
+        :return: The live classifier settings with defaults for any not given in the config
+        """
+        live_classifier = {'hop_size': 0, 'smoothing': 'none', 'smoothing_window': 5, 'ema_alpha': 0.5,
+                           'max_batch_size': 32, 'max_batch_latency_ms': 10,
+                           'max_queued': 4, 'overflow': 'drop_oldest', 'streaming_resync_interval': 5}
+        live_classifier.update(self._conf.get('live_classifier', {}))
+        if live_classifier['hop_size'] <= 0:
+            predictor = self._conf['ble_predictor']
+            live_classifier['hop_size'] = max(1, int(round(predictor['predict_interval'] /
+                                                           predictor['sample_interval'])))
+        return live_classifier
+
     @property
     def source_file(self) -> str:
         """
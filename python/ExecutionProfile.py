@@ -0,0 +1,171 @@
+import argparse
+from typing import Dict
+from Conf import Conf
+
+
+class ExecutionProfile:
+    """
+    The device and threading settings that TensorFlow runs with.
+
+    The device can be forced to cpu or gpu, or left as auto in which case the gpu profile is used only if a
+    GPU is present. The cpu profile is a supported configuration in its own right: the intra op (threads used
+    within a single op such as a matmul) and inter op (ops run in parallel) thread pools can be sized to
+    the host, and XLA JIT compilation can be enabled to fuse the small ops of these models into fewer kernels.
+
+    Thread pools can only be sized before TensorFlow initialises its runtime, so the profile must be applied
+    before any other TensorFlow work is done in the process.
+    """
+    DEVICES = ['auto', 'cpu', 'gpu']
+
+    _device: str
+    _intra_op_threads: int
+    _inter_op_threads: int
+    _xla: bool
+    _profile: str
+
+    def __init__(self,
+                 device: str = 'auto',
+                 intra_op_threads: int = 0,
+                 inter_op_threads: int = 0,
+                 xla: bool = False):
+        """
+        :param device: One of auto, cpu or gpu
+        :param intra_op_threads: Threads used within an op, 0 to let TensorFlow choose
+        :param inter_op_threads: Threads used to run independent ops in parallel, 0 to let TensorFlow choose
+        :param xla: If True enable XLA JIT compilation for training and inference
+        """
+        if device not in ExecutionProfile.DEVICES:
+            raise ValueError("Device must be one of {} but got [{}]".format(ExecutionProfile.DEVICES, device))
+        self._device = device
+        self._intra_op_threads = intra_op_threads
+        self._inter_op_threads = inter_op_threads
+        self._xla = xla
+        self._profile = None  # noqa
+        return
+
+    @staticmethod
+    def from_conf(conf: Conf,
+                  device: str = None,
+                  intra_op_threads: int = None,
+                  inter_op_threads: int = None,
+                  xla: bool = None) -> 'ExecutionProfile':
+        """
+        Create the execution profile from the config, with any given (not None) settings taking precedence.
+        :param conf: The config with the execution settings
+        :param device: Override of the configured device
+        :param intra_op_threads: Override of the configured intra op threads
+        :param inter_op_threads: Override of the configured inter op threads
+        :param xla: Override of the configured XLA setting
+        :return: The execution profile
+        """
+        settings = dict(conf.execution)
+        overrides = {'device': device,
+                     'intra_op_threads': intra_op_threads,
+                     'inter_op_threads': inter_op_threads,
+                     'xla': xla}
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        return ExecutionProfile(**settings)
+
+    @staticmethod
+    def add_args(parser: argparse.ArgumentParser) -> None:
+        """
+        Add the command line overrides of the configured execution settings, see from_args.
+        :param parser: The parser to add the arguments to
+        """
+        parser.add_argument("--device",
+                            help="Run on cpu or gpu, auto uses the gpu only if one is present, overrides the config",
+                            choices=ExecutionProfile.DEVICES,
+                            default=None)
+        parser.add_argument("--intra_threads",
+                            help="The threads used within an op, 0 lets TensorFlow choose, overrides the config",
+                            default=None,
+                            type=int)
+        parser.add_argument("--inter_threads",
+                            help="The number of ops run in parallel, 0 lets TensorFlow choose, overrides the config",
+                            default=None,
+                            type=int)
+        # Both flags so XLA can be turned off as well as on when the config enables it.
+        xla = parser.add_mutually_exclusive_group()
+        xla.add_argument("--xla",
+                         help="Enable XLA JIT compilation, overrides the config",
+                         dest='xla',
+                         action='store_true',
+                         default=None)
+        xla.add_argument("--no_xla",
+                         help="Disable XLA JIT compilation, overrides the config",
+                         dest='xla',
+                         action='store_false',
+                         default=None)
+        return
+
+    @staticmethod
+    def from_args(conf: Conf,
+                  args: argparse.Namespace) -> 'ExecutionProfile':
+        """
+        Create the execution profile from the config, with any settings given on the command line taking precedence.
+        :param conf: The config with the execution settings
+        :param args: The parsed command line, with the arguments added by add_args
+        :return: The execution profile
+        """
+        return ExecutionProfile.from_conf(conf=conf,
+                                          device=args.device,
+                                          intra_op_threads=args.intra_threads,
+                                          inter_op_threads=args.inter_threads,
+                                          xla=args.xla)
+
+    @property
+    def profile(self) -> str:
+        """
+        The profile chosen when applied, cpu or gpu.
+        :return: The chosen profile or None if not yet applied
+        """
+        return self._profile
+
+    @property
+    def xla(self) -> bool:
+        """
+        :return: True if XLA JIT compilation is enabled
+        """
+        return self._xla
+
+    def apply(self) -> str:
+        """
+        Detect the accelerators present and configure TensorFlow for the chosen profile.
+        :return: The profile chosen, cpu or gpu
+        """
+        import tensorflow as tf
+        gpus = tf.config.list_physical_devices('GPU')
+        if self._device == 'gpu' and len(gpus) == 0:
+            raise RuntimeError("The gpu execution profile was requested but no GPU is present")
+        self._profile = 'gpu' if self._device != 'cpu' and len(gpus) > 0 else 'cpu'
+
+        try:
+            if self._profile == 'gpu':
+                for gpu in gpus:
+                    tf.config.experimental.set_memory_growth(gpu, True)
+            elif len(gpus) > 0:
+                tf.config.set_visible_devices([], 'GPU')  # cpu forced on a host with a GPU
+            if self._intra_op_threads > 0:
+                tf.config.threading.set_intra_op_parallelism_threads(self._intra_op_threads)
+            if self._inter_op_threads > 0:
+                tf.config.threading.set_inter_op_parallelism_threads(self._inter_op_threads)
+        except RuntimeError as e:
+            # TensorFlow is already initialised in this process, so keep the devices and threads it has.
+            print("Execution profile device and thread settings not applied [{}]".format(str(e)))
+        tf.config.optimizer.set_jit(self._xla)
+        return self._profile
+
+    def describe(self) -> Dict:
+        """
+        The profile and the settings TensorFlow is running with.
+        :return: The settings as a dictionary
+        """
+        import tensorflow as tf
+        return {'profile': self._profile,
+                'device': self._device,
+                'intra_op_threads': tf.config.threading.get_intra_op_parallelism_threads(),
+                'inter_op_threads': tf.config.threading.get_inter_op_parallelism_threads(),
+                'xla': self._xla}
+
+    def __str__(self) -> str:
+        return ', '.join('{}={}'.format(k, v) for k, v in self.describe().items())
@@ -0,0 +1,38 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+
+class InferenceBackend(ABC):
+    """
+    Run a trained activity model forward to get class probabilities, for a single window or for a batch of
+    windows. Windows are passed in the input shape of the model, with a leading batch dimension.
+    """
+    BACKENDS = ['keras', 'tflite', 'numpy']
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """
+        :return: The name of the backend as given on the command line
+        """
+        pass
+
+    @abstractmethod
+    def predict_window(self,
+                       window: np.ndarray) -> np.ndarray:
+        """
+        Predict the class probabilities of a single window.
+        :param window: The window as (1, *model input shape)
+        :return: The probability of each class as (num classes,)
+        """
+        pass
+
+    @abstractmethod
+    def predict_batch(self,
+                      windows: np.ndarray) -> np.ndarray:
+        """
+        Predict the class probabilities of a batch of windows.
+        :param windows: The windows as (batch, *model input shape)
+        :return: The probability of each class as (batch, num classes)
+        """
+        pass
@@ -0,0 +1,123 @@
+import threading
+from collections import deque
+from typing import Callable, Deque
+import numpy as np
+
+
+class InferenceOffload:
+    """
+    Run the predictions of a stream of windows on a worker thread, fed through a bounded queue, so the caller (e.g.
+    the BLE notification callback on the asyncio event loop) only ever queues a window and never waits for the
+    model.
+
+    If windows arrive faster than they are predicted the queue fills and the overflow policy decides what gives:
+        drop_oldest : the oldest queued window is dropped to make room for the new one.
+        latest      : all queued windows are dropped, so the next prediction is of the latest window.
+        block       : the caller waits for room in the queue, so no window is dropped but the caller is held up.
+
+    Counters of the windows queued, dropped and processed are kept so overflow can be seen.
+
+    The worker is a daemon thread, so a stream that is never closed (e.g. after a connection error) does not
+    stop the interpreter from exiting.
+    """
+    OVERFLOW_POLICIES = ['drop_oldest', 'latest', 'block']
+
+    _predict: Callable[[np.ndarray], None]
+    _max_queued: int
+    _overflow: str
+    _windows: Deque[np.ndarray]
+    _condition: threading.Condition
+    _closed: bool
+    _worker: threading.Thread
+    _num_queued: int
+    _num_dropped: int
+    _num_processed: int
+
+    def __init__(self,
+                 predict: Callable[[np.ndarray], None],
+                 max_queued: int = 4,
+                 overflow: str = 'drop_oldest'):
+        """
+        :param predict: Predicts and reports a window, called on the worker for each window in the order queued
+        :param max_queued: The most windows waiting to be predicted
+        :param overflow: What to do with a new window when the queue is full, one of OVERFLOW_POLICIES
+        """
+        if max_queued < 1:
+            raise ValueError("Max queued must be at least 1 but was [{}]".format(max_queued))
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError("[{}] is not a valid overflow policy".format(overflow))
+        self._predict = predict
+        self._max_queued = max_queued
+        self._overflow = overflow
+        self._windows = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._num_queued = 0
+        self._num_dropped = 0
+        self._num_processed = 0
+        self._worker = threading.Thread(target=self._run, name='InferenceOffload', daemon=True)
+        self._worker.start()
+        return
+
+    def submit(self,
+               window: np.ndarray) -> None:
+        """
+        Queue a window to be predicted. The window is copied so the caller can re-use it.
+        :param window: The window to predict
+        """
+        window = np.array(window, copy=True)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot queue windows once the offload is closed")
+            if len(self._windows) >= self._max_queued:
+                if self._overflow == 'block':
+                    self._condition.wait_for(lambda: len(self._windows) < self._max_queued or self._closed)
+                elif self._overflow == 'latest':
+                    self._num_dropped += len(self._windows)
+                    self._windows.clear()
+                else:
+                    self._windows.popleft()
+                    self._num_dropped += 1
+            self._windows.append(window)
+            self._num_queued += 1
+            self._condition.notify_all()
+        return
+
+    def close(self) -> None:
+        """
+        Predict the windows already queued and stop the worker thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+        return
+
+    def stats(self) -> dict:
+        """
+        :return: The number of windows queued, dropped and processed so far and the number waiting now
+        """
+        with self._condition:
+            return {'queued': self._num_queued,
+                    'dropped': self._num_dropped,
+                    'processed': self._num_processed,
+                    'waiting': len(self._windows)}
+
+    def _run(self) -> None:
+        """
+        Predict the queued windows in order until closed and the queue is empty.
+        """
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._windows) > 0 or self._closed)
+                if len(self._windows) == 0:
+                    return
+                window = self._windows.popleft()
+                self._condition.notify_all()
+            try:
+                self._predict(window)
+            except Exception as e:
+                print("Prediction failed [{}]".format(str(e)))
+            with self._condition:
+                self._num_processed += 1
+        return
@@ -0,0 +1,148 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Tuple, List
+import numpy as np
+from InferenceBackend import InferenceBackend
+from ActivityModel import ActivityModel
+
+
+class InferenceService:
+    """
+    Share one model between many streams of windows, e.g. one per connected device, by grouping the windows
+    submitted by all the streams into micro batches that are each run as a single forward pass.
+
+    A batch is run as soon as it is full (max batch size) or once the first window in it has waited for the
+    max latency, whichever comes first. So under light load each window is predicted within the max latency and
+    under heavy load the cost of each forward pass is shared by up to max batch size windows.
+
+    The batches are run on a single worker thread, so the backend is only ever called from that thread. Each
+    window gets a Future that completes with its class probabilities, any callbacks added to it are called on
+    the worker thread in the order the windows were submitted.
+    """
+    _backend: InferenceBackend
+    _max_batch_size: int
+    _max_latency: float
+    _requests: queue.Queue
+    _batch: np.ndarray
+    _worker: threading.Thread
+    _num_windows: int
+    _num_batches: int
+
+    _STOP = None
+
+    def __init__(self,
+                 backend: InferenceBackend,
+                 input_shape: Tuple,
+                 dtype: np.dtype,
+                 max_batch_size: int = 32,
+                 max_latency: float = 0.01):
+        """
+        :param backend: The backend to run the batches on
+        :param input_shape: The input shape of a single window, without the batch dimension
+        :param dtype: The dtype windows are passed to the backend in
+        :param max_batch_size: The most windows run in a single forward pass
+        :param max_latency: The most seconds a window waits for a batch to fill before the batch is run
+        """
+        if max_batch_size < 1:
+            raise ValueError("Max batch size must be at least 1 but was [{}]".format(max_batch_size))
+        if max_latency < 0:
+            raise ValueError("Max latency must not be negative but was [{}]".format(max_latency))
+        self._backend = backend
+        self._max_batch_size = max_batch_size
+        self._max_latency = max_latency
+        self._requests = queue.Queue()
+        self._batch = np.zeros(tuple((max_batch_size, *input_shape)), dtype=dtype)
+        self._num_windows = 0
+        self._num_batches = 0
+        self._worker = threading.Thread(target=self._run, name='InferenceService', daemon=True)
+        self._worker.start()
+        return
+
+    @staticmethod
+    def from_model(activity_model: ActivityModel,
+                   live_classifier_conf: dict) -> 'InferenceService':
+        """
+        Create the service for the inference backend of the trained model, with the batch settings of the live
+        classifier config, see Conf.live_classifier.
+        :param activity_model: The trained model
+        :param live_classifier_conf: The live classifier settings
+        :return: The inference service, running
+        """
+        return InferenceService(backend=activity_model.inference_backend(),
+                                input_shape=activity_model.classification_input_shape()[1:],
+                                dtype=activity_model.dtype(),
+                                max_batch_size=int(live_classifier_conf['max_batch_size']),
+                                max_latency=float(live_classifier_conf['max_batch_latency_ms']) / 1000.0)
+
+    def submit(self,
+               window: np.ndarray) -> Future:
+        """
+        Queue a window to be predicted in the next batch. The window is copied so the caller can re-use it.
+        :param window: The window in any shape with the model input size e.g. (1, *model input shape)
+        :return: Future that completes with the probability of each class as (num classes,)
+        """
+        future = Future()
+        self._requests.put(tuple((np.array(window, copy=True), future, time.perf_counter())))
+        return future
+
+    def close(self) -> None:
+        """
+        Predict all the windows already submitted and stop the worker thread.
+        """
+        self._requests.put(self._STOP)
+        self._worker.join()
+        return
+
+    def stats(self) -> dict:
+        """
+        :return: The number of windows predicted, the number of batches they were run in and the mean batch size
+        """
+        return {'windows': self._num_windows,
+                'batches': self._num_batches,
+                'mean_batch_size': self._num_windows / max(1, self._num_batches)}
+
+    def _next_batch(self) -> Tuple[List[Tuple[np.ndarray, Future, float]], bool]:
+        """
+        Wait for the next window then gather more until the batch is full or the first window has waited for the
+        max latency.
+        :return: The requests in the batch and True if the service has been asked to stop.
+        """
+        request = self._requests.get()
+        if request is self._STOP:
+            return tuple((list(), True))  # noqa
+        requests = [request]
+        deadline = request[2] + self._max_latency
+        while len(requests) < self._max_batch_size:
+            try:
+                request = self._requests.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if request is self._STOP:
+                return tuple((requests, True))  # noqa
+            requests.append(request)
+        return tuple((requests, False))  # noqa
+
+    def _run(self) -> None:
+        """
+        Run the submitted windows in batches until asked to stop.
+        """
+        stop = False
+        while not stop:
+            requests, stop = self._next_batch()
+            if len(requests) == 0:
+                continue
+            for i, (window, _, _) in enumerate(requests):
+                self._batch[i] = window.reshape(self._batch.shape[1:])
+            try:
+                probabilities = self._backend.predict_batch(self._batch[:len(requests)])
+            except Exception as e:
+                for _, future, _ in requests:
+                    future.set_exception(e)
+                continue
+            self._num_batches += 1
+            self._num_windows += len(requests)
+            for i, (_, future, _) in enumerate(requests):
+                future.set_result(probabilities[i])
+        return
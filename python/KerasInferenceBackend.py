@@ -0,0 +1,46 @@
+from typing import Tuple, Callable
+import numpy as np
+import tensorflow as tf
+from InferenceBackend import InferenceBackend
+
+
+class KerasInferenceBackend(InferenceBackend):
+    """
+    Run the Keras model in TensorFlow.
+
+    For a single window the model is traced once as a function with a fixed input signature, so it is never
+    re-traced, and calling it is the cost of the forward pass alone without the per call data set up and step
+    loop of Keras predict, which is built for large batches.
+    """
+    _model: tf.keras.Model
+    _window_function: Callable
+
+    def __init__(self,
+                 model: tf.keras.Model,
+                 input_shape: Tuple,
+                 dtype: np.dtype):
+        """
+        :param model: The trained Keras model
+        :param input_shape: The input shape of a single window, without the batch dimension
+        :param dtype: The dtype windows are passed in
+        """
+        self._model = model
+
+        @tf.function(input_signature=[tf.TensorSpec(shape=tuple((1, *input_shape)), dtype=tf.as_dtype(dtype))])
+        def predict_window(window):
+            return model(window, training=False)
+
+        self._window_function = predict_window
+        return
+
+    @property
+    def name(self) -> str:
+        return 'keras'
+
+    def predict_window(self,
+                       window: np.ndarray) -> np.ndarray:
+        return self._window_function(window).numpy()[0]
+
+    def predict_batch(self,
+                      windows: np.ndarray) -> np.ndarray:
+        return np.asarray(self._model.predict_on_batch(windows))
@@ -0,0 +1,67 @@
+from typing import Tuple
+import numpy as np
+import tensorflow as tf
+from LookBackWindows import LookBackWindows
+from WindowAugmenter import WindowAugmenter
+
+
+class LookBackDataset:
+    """
+    Build a streaming tf.data input pipeline over a set of look back windows.
+
+    Only the raw recordings and the index of the selected windows are held by the pipeline. Each batch of
+    windows is gathered from the raw recordings as it is needed, so peak memory is bounded by the size of the
+    raw data rather than the (look back window size times larger) windowed data. The batches are prefetched
+    so preparing the next batch overlaps with the training step on the current one.
+    """
+
+    @staticmethod
+    def create(windows: LookBackWindows,
+               index: np.ndarray,
+               shape: Tuple,
+               batch_size: int = 32,
+               shuffle: bool = False,
+               shuffle_buffer_size: int = 10000,
+               cache: bool = False,
+               seed: int = None,
+               augmenter: WindowAugmenter = None) -> tf.data.Dataset:
+        """
+        Create the input pipeline for the given subset of windows.
+        :param windows: The look back windows to draw from
+        :param index: The subset of the windows (e.g. train or test split) to feed
+        :param shape: The shape of a single window as required by the model
+        :param batch_size: The number of windows in each batch
+        :param shuffle: If True the windows are re-shuffled on every pass over the data set
+        :param shuffle_buffer_size: The number of window indices held in the shuffle buffer
+        :param cache: If True the gathered batches are cached after the first pass. Only sensible for
+                      a small and un-shuffled subset such as the validation data.
+        :param seed: Optional seed for the shuffle
+        :param augmenter: Optional augmenter to randomly augment every batch, e.g. for training
+        :return: tf.data.Dataset of (X,Y) batches
+        """
+        samples = tf.constant(windows.samples)
+        recording_one_hot = tf.constant(windows.recording_one_hot, dtype=samples.dtype)
+        window_offsets = tf.range(windows.look_back_window_size, dtype=tf.int64)
+        batch_shape = tf.constant(tuple((-1, *shape)), dtype=tf.int32)
+
+        def _gather(starts: tf.Tensor,
+                    recording: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+            x = tf.gather(samples, tf.expand_dims(starts, axis=-1) + window_offsets)
+            y = tf.gather(recording_one_hot, recording)
+            if augmenter is not None:
+                # The augmentation is numpy, run on the whole batch so there is one call per batch.
+                augmented = tf.numpy_function(augmenter.augment, [x], x.dtype)
+                x = tf.ensure_shape(augmented, x.shape)
+            return tf.reshape(x, batch_shape), y
+
+        ds = tf.data.Dataset.from_tensor_slices((windows.window_starts[index].astype(np.int64),
+                                                 windows.window_recording[index].astype(np.int64)))
+        if shuffle:
+            ds = ds.shuffle(buffer_size=min(shuffle_buffer_size, len(index)),
+                            seed=seed,
+                            reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size)
+        ds = ds.map(_gather, num_parallel_calls=tf.data.experimental.AUTOTUNE)
+        if cache:
+            ds = ds.cache()
+        return ds.prefetch(tf.data.experimental.AUTOTUNE)
@@ -0,0 +1,65 @@
+from typing import Tuple
+import numpy as np
+import tensorflow as tf
+from LookBackWindows import LookBackWindows
+from WindowAugmenter import WindowAugmenter
+
+
+class LookBackSequence(tf.keras.utils.Sequence):
+    """
+    Keras Sequence that feeds batches of look back windows to the model. Windows are only copied out of the
+    underlying recordings one batch at a time, so the full windowed data set is never materialised.
+    """
+    _windows: LookBackWindows
+    _index: np.ndarray
+    _shape: Tuple
+    _batch_size: int
+    _shuffle: bool
+    _augmenter: WindowAugmenter
+
+    def __init__(self,
+                 windows: LookBackWindows,
+                 index: np.ndarray,
+                 shape: Tuple,
+                 batch_size: int = 32,
+                 shuffle: bool = False,
+                 augmenter: WindowAugmenter = None):
+        """
+        :param windows: The look back windows to draw batches from
+        :param index: The subset of the windows (e.g. train or test split) to feed
+        :param shape: The shape of a single window as required by the model
+        :param batch_size: The number of windows in each batch
+        :param shuffle: If True the order of the windows is shuffled at the end of every epoch
+        :param augmenter: Optional augmenter to randomly augment every batch, e.g. for training
+        """
+        super().__init__()
+        self._windows = windows
+        self._index = np.array(index)
+        self._shape = shape
+        self._batch_size = batch_size
+        self._shuffle = shuffle
+        self._augmenter = augmenter
+        return
+
+    def __len__(self) -> int:
+        return int(np.ceil(len(self._index) / self._batch_size))
+
+    def __getitem__(self,
+                    batch: int) -> Tuple[np.ndarray, np.ndarray]:
+        index = self._index[batch * self._batch_size:(batch + 1) * self._batch_size]
+        if self._augmenter is None:
+            return self._windows.gather(index, self._shape)
+        x, y = self._windows.gather(index)
+        x = self._augmenter.augment(x).reshape(tuple((-1, *self._shape)))
+        return tuple((x, y))  # noqa
+
+    def on_epoch_end(self) -> None:
+        if self._shuffle:
+            np.random.shuffle(self._index)
+        return
+
+    def labels(self) -> np.ndarray:
+        """
+        :return: The one hot labels of all windows in the sequence, in batch order
+        """
+        return self._windows.labels(self._index)
@@ -0,0 +1,201 @@
+import hashlib
+from typing import List, Tuple
+import numpy as np
+
+
+class LookBackWindows:
+    """
+    Class to present a set of accelerometer recordings as look back windows without copying the recordings.
+
+    All recordings are held end to end in a single contiguous (rows, features) buffer. A read only strided view
+    over that buffer exposes every run of look back window size rows as a window, and an index of window start
+    rows selects only those windows that lie entirely inside a single recording. Data is only copied when a
+    batch of windows is gathered to be passed to the model.
+    """
+    _samples: np.ndarray
+    _windows: np.ndarray
+    _look_back_window_size: int
+    _recording_lengths: np.ndarray
+    _recording_one_hot: np.ndarray
+    _window_starts: np.ndarray
+    _window_recording: np.ndarray
+
+    def __init__(self,
+                 samples: np.ndarray,
+                 recording_lengths: List[int],
+                 recording_one_hot: np.ndarray,
+                 look_back_window_size: int):
+        """
+        Establish the look back windows over the given recordings.
+        :param samples: All recordings as a single (rows, features) array, with recordings held end to end
+        :param recording_lengths: The number of rows in each recording in the order they appear in samples
+        :param recording_one_hot: The one hot class of each recording as (num recordings, num classes)
+        :param look_back_window_size: The number of sequential samples that make up a single window
+        """
+        if samples.ndim != 2:
+            raise ValueError("Expected samples of shape (rows, features) but got {}".format(samples.shape))
+        num_rows = int(np.sum(recording_lengths))
+        if num_rows != samples.shape[0]:
+            raise ValueError("Recording lengths sum to {} but there are {} samples".format(num_rows, samples.shape[0]))
+        self._samples = samples
+        self._look_back_window_size = look_back_window_size
+        self._recording_lengths = np.asarray(recording_lengths, dtype=np.int64)
+        self._recording_one_hot = np.asarray(recording_one_hot)
+        self._windows = self.strided_windows(samples, look_back_window_size)
+
+        # Only those windows that start and end in the same recording are valid.
+        windows_per_recording = np.maximum(self._recording_lengths - (look_back_window_size - 1), 0)
+        recording_starts = np.cumsum(self._recording_lengths) - self._recording_lengths
+        self._window_recording = np.repeat(np.arange(len(self._recording_lengths)), windows_per_recording)
+        first_window = np.cumsum(windows_per_recording) - windows_per_recording
+        self._window_starts = (recording_starts[self._window_recording] +
+                               np.arange(len(self._window_recording)) - first_window[self._window_recording])
+        return
+
+    @staticmethod
+    def strided_windows(x_data: np.ndarray,
+                        look_back_window_size: int) -> np.ndarray:
+        """
+        Create a read only view of x_data as every overlapping run of look_back_window_size rows.
+        :param x_data: (rows, features) array to take the windows over.
+        :param look_back_window_size: The number of rows in each window
+        :return: A read only (num windows, look back window size, features) view on x_data
+        """
+        num_frames = max(x_data.shape[0] - (look_back_window_size - 1), 0)
+        return np.lib.stride_tricks.as_strided(x_data,
+                                               shape=(num_frames, look_back_window_size, x_data.shape[1]),
+                                               strides=(x_data.strides[0], x_data.strides[0], x_data.strides[1]),
+                                               writeable=False)
+
+    def __len__(self) -> int:
+        """
+        :return: The number of valid look back windows across all recordings
+        """
+        return len(self._window_starts)
+
+    @property
+    def window_recording(self) -> np.ndarray:
+        """
+        The index of the recording that each window was taken from.
+        :return: int array with one entry per window
+        """
+        return self._window_recording
+
+    @property
+    def num_recordings(self) -> int:
+        return len(self._recording_lengths)
+
+    @property
+    def samples(self) -> np.ndarray:
+        """
+        :return: All recordings end to end as (rows, features)
+        """
+        return self._samples
+
+    @property
+    def window_starts(self) -> np.ndarray:
+        """
+        :return: The row in samples at which each window starts
+        """
+        return self._window_starts
+
+    @property
+    def recording_one_hot(self) -> np.ndarray:
+        """
+        :return: The one hot class of each recording as (num recordings, num classes)
+        """
+        return self._recording_one_hot
+
+    @property
+    def look_back_window_size(self) -> int:
+        return self._look_back_window_size
+
+    def labels(self,
+               index: np.ndarray = None) -> np.ndarray:
+        """
+        The one hot class labels of the given windows
+        :param index: The windows to get the labels for, or None for all windows
+        :return: one hot labels as (num windows, num classes)
+        """
+        recording = self._window_recording if index is None else self._window_recording[index]
+        return self._recording_one_hot[recording]
+
+    def class_index(self,
+                    index: np.ndarray = None) -> np.ndarray:
+        """
+        The class (as index of the one hot encoding) of the given windows
+        :param index: The windows to get the class index for, or None for all windows
+        :return: int array of class index, one per window
+        """
+        return np.argmax(self.labels(index), axis=-1)
+
+    def fingerprint(self) -> str:
+        """
+        A hash that identifies the exact recordings, classes and window size the windows are taken from.
+        :return: The hash as hex string
+        """
+        h = hashlib.sha1()
+        h.update(np.ascontiguousarray(self._samples).data)
+        h.update(self._recording_lengths.tobytes())
+        h.update(np.ascontiguousarray(self._recording_one_hot, dtype=np.float32).data)
+        h.update(str(self._look_back_window_size).encode('utf-8'))
+        return h.hexdigest()
+
+    def split(self,
+              test_size: float = 0.2,
+              random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Shuffle and split the windows into train and test sets by index only.
+        :param test_size: The fraction of the windows to hold back for test
+        :param random_state: Seed for the shuffle so splits are repeatable
+        :return: The train and test window indices
+        """
+        index = np.random.RandomState(random_state).permutation(len(self))
+        num_test = int(np.ceil(len(index) * test_size))
+        return tuple((index[num_test:], index[:num_test]))  # noqa
+
+    def k_fold(self,
+               num_folds: int,
+               fold: int,
+               random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Split the windows into train and test sets for one fold of k-fold cross validation. The split is made
+        by recording, so the overlapping windows of a recording are never in both sets. The recordings of
+        each class are dealt round robin across the folds, so every fold holds back a similar mix of classes.
+        Only recordings long enough to hold a window are dealt, so every fold has windows to test on.
+        :param num_folds: The number of folds to split the recordings into
+        :param fold: The fold (0 to num_folds - 1) to hold back for test
+        :param random_state: Seed for the shuffle so the folds are the same for every fold that is run
+        :return: The (shuffled) train and test window indices
+        """
+        has_windows = np.bincount(self._window_recording, minlength=self.num_recordings) > 0
+        num_with_windows = int(np.sum(has_windows))
+        if num_folds < 2 or num_folds > num_with_windows:
+            raise ValueError("Number of folds must be from 2 to the number of recordings with at least one window [{}]"
+                             " but got [{}]".format(num_with_windows, num_folds))
+        if not 0 <= fold < num_folds:
+            raise ValueError("Fold must be from 0 to [{}] but got [{}]".format(num_folds - 1, fold))
+        rng = np.random.RandomState(random_state)
+        recording_class = np.argmax(self._recording_one_hot, axis=-1)
+        recording_fold = np.full(self.num_recordings, -1, dtype=np.int64)  # Recordings without windows in no fold
+        dealt = 0
+        for cls in np.unique(recording_class):
+            recordings = rng.permutation(np.flatnonzero((recording_class == cls) & has_windows))
+            recording_fold[recordings] = (dealt + np.arange(len(recordings))) % num_folds
+            dealt += len(recordings)  # Carry the deal on across classes so folds stay the same size
+        is_test = recording_fold[self._window_recording] == fold
+        return tuple((rng.permutation(np.flatnonzero(~is_test)), rng.permutation(np.flatnonzero(is_test))))  # noqa
+
+    def gather(self,
+               index: np.ndarray,
+               shape: Tuple = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Copy the given windows out as a single batch.
+        :param index: The windows to include in the batch
+        :param shape: Optional shape of a single window as required by the model, e.g. (20, 3, 1)
+        :return: X,Y for the batch where X is (batch, *shape) and Y is one hot labels
+        """
+        x = self._windows[self._window_starts[index]]
+        if shape is not None and x.shape[1:] != tuple(shape):
+            x = x.reshape(tuple((x.shape[0], *shape)))
+        return tuple((x, self.labels(index)))  # noqa
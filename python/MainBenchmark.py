@@ -0,0 +1,245 @@
+import sys
+import json
+import time
+import multiprocessing
+from typing import Callable, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from os.path import isfile
+import numpy as np
+from ActivityModel import ActivityModel
+from BaseArgParser import BaseArgParser
+from Conf import Conf
+
+
+class MainBenchmark:
+    """
+    Measure how fast each model type runs on each of the paths a prediction can take, and compare the results
+    to a saved baseline so a performance regression is caught before a release.
+
+    The paths are Keras predict (predict), a direct call of the Keras model (call, see KerasInferenceBackend),
+    the TF Lite interpreter on the exported model (tflite) and the numpy forward pass (numpy). For each model
+    and path the measures are:
+        cold_start_s  : loading the trained model and creating the path, in a fresh interpreter.
+        first_call_ms : the first single window prediction, which pays any one off tracing or allocation.
+        p50/p95/p99_ms: percentiles of the single window latency once warm.
+        windows_per_s_<batch size> : throughput of batches of windows at each batch size.
+
+    Each model and path is measured in its own fresh worker process, so the cold start includes the imports
+    and set up that path pays and no path is warmed by another. Windows are random, as the time taken does not
+    depend on the values, so no training data needs to be loaded.
+    """
+    PATHS = ['predict', 'call', 'tflite', 'numpy']
+    BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    LATENCY_MEASURES = ['cold_start_s', 'first_call_ms', 'p50_ms', 'p95_ms', 'p99_ms']
+
+    _BACKEND_BY_PATH = {'predict': 'keras', 'call': 'keras', 'tflite': 'tflite', 'numpy': 'numpy'}
+
+    _config_file: str
+    _data_file_path: str
+    _checkpoint_path: str
+    _model_types: List[str]
+    _paths: List[str]
+    _num_runs: int
+    _batch_sizes: List[int]
+    _batch_seconds: float
+    _output_file: str
+    _baseline_file: str
+    _save_file: str
+    _tolerance: float
+
+    def __init__(self):
+        args = self._get_args(description="Measure the inference latency and throughput of the models")
+        self._config_file = args.json
+        self._data_file_path = args.data
+        self._checkpoint_path = args.checkpoint
+        self._model_types = args.models
+        self._paths = args.paths
+        self._num_runs = args.runs
+        self._batch_sizes = args.batch_sizes
+        self._batch_seconds = args.batch_seconds
+        self._output_file = args.output
+        self._baseline_file = args.baseline
+        self._save_file = args.save
+        self._tolerance = args.tolerance
+        return
+
+    @staticmethod
+    def _get_args(description: str):
+        """
+        Extract and verify command line arguments
+        :param description: The description of the application
+        """
+        parser = BaseArgParser(description).parser()
+        parser.add_argument("-m", "--models",
+                            help="The types of neural network model to benchmark",
+                            nargs='+',
+                            choices=ActivityModel.ModelType.model_options(),  # noqa
+                            default=ActivityModel.ModelType.model_options(),
+                            type=ActivityModel.ModelType.valid_model_type)
+        parser.add_argument("-p", "--paths",
+                            help="The prediction paths to benchmark, Keras predict, a direct call of the Keras model, "
+                                 "the TF Lite interpreter or the numpy forward pass",
+                            nargs='+',
+                            choices=MainBenchmark.PATHS,
+                            default=MainBenchmark.PATHS)
+        parser.add_argument("-c", "--checkpoint",
+                            help="The path where the trained model checkpoints are saved",
+                            default='./checkpoint/',
+                            nargs='?',
+                            type=BaseArgParser.valid_path)
+        parser.add_argument("-n", "--runs",
+                            help="The number of single window predictions to take the latency percentiles over",
+                            default=1000,
+                            type=int)
+        parser.add_argument("--batch_sizes",
+                            help="The batch sizes to measure the throughput of",
+                            nargs='+',
+                            default=MainBenchmark.BATCH_SIZES,
+                            type=int)
+        parser.add_argument("--batch_seconds",
+                            help="The least time in seconds to run batches of each size for",
+                            default=0.5,
+                            type=float)
+        parser.add_argument("-o", "--output",
+                            help="The csv file to write the results table to",
+                            default='./benchmark-results.csv',
+                            nargs='?')
+        parser.add_argument("-b", "--baseline",
+                            help="A JSON file of results saved by an earlier run to check for regressions",
+                            default=None,
+                            type=BaseArgParser.valid_file)
+        parser.add_argument("-s", "--save",
+                            help="Save the results as JSON to this file for use as a later baseline",
+                            default=None)
+        parser.add_argument("-t", "--tolerance",
+                            help="The fraction a result can be worse than its baseline by before it is a regression",
+                            default=0.25,
+                            type=float)
+        return parser.parse_args()
+
+    @staticmethod
+    def _run_benchmark(job: Dict) -> Dict:
+        """
+        Benchmark a single model on a single path. This is run in a fresh worker process, so nothing has been
+        imported or set up for the path before the cold start is timed.
+        :param job: The model, path and benchmark settings
+        :return: The model and path along with the timings
+        """
+        start = time.perf_counter()
+        activity_model = ActivityModel(conf=Conf(job['config_file']),
+                                       data_file_path=job['data_path'],
+                                       checkpoint_filepath=job['checkpoint_path'],
+                                       export_filepath='',
+                                       model_type=ActivityModel.ModelType.str2modeltype(job['model']),
+                                       test_on_load=False,
+                                       plot_training=False,
+                                       inference_backend=MainBenchmark._BACKEND_BY_PATH[job['path']])
+        activity_model.load_model_from_checkpoint()
+        if job['path'] == 'predict':
+            model = activity_model.keras_model()
+
+            def predict_window(window: np.ndarray) -> np.ndarray:
+                return model.predict(window, verbose=0)
+
+            def predict_batch(windows: np.ndarray) -> np.ndarray:
+                return model.predict(windows, batch_size=len(windows), verbose=0)
+        else:
+            backend = activity_model.inference_backend()
+            predict_window: Callable = backend.predict_window
+            predict_batch: Callable = backend.predict_batch
+        cold_start = time.perf_counter() - start
+
+        windows = np.random.default_rng(seed=1).standard_normal(
+            size=tuple((max(job['batch_sizes'] + [job['runs']]), *activity_model.classification_input_shape()[1:])))
+        windows = windows.astype(activity_model.dtype())
+
+        start = time.perf_counter()
+        predict_window(windows[:1])
+        first_call = time.perf_counter() - start
+
+        latency = list()
+        for i in range(job['runs']):
+            start = time.perf_counter()
+            predict_window(windows[i:i + 1])
+            latency.append(time.perf_counter() - start)
+        p50, p95, p99 = np.percentile(latency, [50, 95, 99]) * 1000.0
+
+        result = {'model': job['model'], 'path': job['path'], 'cold_start_s': cold_start,
+                  'first_call_ms': first_call * 1000.0, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+        for batch_size in job['batch_sizes']:
+            batch = windows[:batch_size]
+            predict_batch(batch)  # Exclude any tracing or re-allocation for a new batch size from the timings
+            num_windows = 0
+            start = time.perf_counter()
+            while num_windows == 0 or time.perf_counter() - start < job['batch_seconds']:
+                predict_batch(batch)
+                num_windows += batch_size
+            result['windows_per_s_{}'.format(batch_size)] = num_windows / (time.perf_counter() - start)
+        return result
+
+    def _regressions(self,
+                     results: Dict[str, Dict]) -> int:
+        """
+        Compare the results to the baseline, latencies regress if they are slower and throughputs if they are
+        lower than the baseline by more than the tolerance.
+        :param results: The results by model/path
+        :return: The number of results that regressed against the baseline
+        """
+        with open(self._baseline_file, 'r') as f:
+            baseline = json.load(f)
+        num_regressions = 0
+        for key, result in results.items():
+            for measure, value in result.items():
+                if measure in ['model', 'path'] or measure not in baseline.get(key, {}):
+                    continue
+                base = baseline[key][measure]
+                if measure in self.LATENCY_MEASURES:
+                    regressed = value > base * (1.0 + self._tolerance)
+                else:
+                    regressed = value < base / (1.0 + self._tolerance)
+                if regressed:
+                    print("[{}] of [{}] regressed from [{:.3f}] to [{:.3f}]".format(measure, key, base, value))
+                    num_regressions += 1
+        return num_regressions
+
+    def run(self) -> int:
+        """
+        Benchmark every model on every path, report the results and compare to the baseline if one was given.
+        :return: The number of results that regressed against the baseline
+        """
+        import pandas as pd
+        results: Dict[str, Dict] = dict()
+        for model in self._model_types:
+            for path in self._paths:
+                job = {'model': model,
+                       'path': path,
+                       'config_file': self._config_file,
+                       'data_path': self._data_file_path,
+                       'checkpoint_path': self._checkpoint_path,
+                       'runs': self._num_runs,
+                       'batch_sizes': self._batch_sizes,
+                       'batch_seconds': self._batch_seconds}
+                print("Benchmarking [{}] on [{}]".format(model, path))
+                # A new pool per job so every job starts in a fresh process.
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    try:
+                        results['{}/{}'.format(model, path)] = pool.submit(MainBenchmark._run_benchmark, job).result()
+                    except Exception as e:
+                        print("Skipped [{}] on [{}] as [{}]".format(model, path, str(e)))
+
+        table = pd.DataFrame(list(results.values()))
+        table.to_csv(self._output_file, index=False)
+        print(table.to_string(index=False, float_format='{:.3f}'.format))
+
+        if self._save_file is not None:
+            with open(self._save_file, 'w') as f:
+                json.dump(results, f, indent=2)
+
+        num_regressions = 0
+        if self._baseline_file is not None and isfile(self._baseline_file):
+            num_regressions = self._regressions(results)
+        return num_regressions
+
+
+if __name__ == "__main__":
+    sys.exit(1 if MainBenchmark().run() > 0 else 0)
@@ -0,0 +1,57 @@
+import sys
+import numpy as np
+from os import makedirs
+from os.path import dirname
+from BaseArgParser import BaseArgParser
+from Conf import Conf
+from RecordingStore import RecordingStore
+
+
+class MainConvertRecordings:
+    _data_file_path: str
+    _output_file: str
+    _config_file: str
+    _as_int16: bool
+
+    def __init__(self):
+        args = self._get_args(description="Convert csv training data files to a single binary recording store")
+        self._data_file_path = args.data
+        self._output_file = args.output
+        self._config_file = args.json
+        self._as_int16 = args.int16
+        return
+
+    @staticmethod
+    def _get_args(description: str):
+        """
+        Extract and verify command line arguments
+        :param description: The description of the application
+        """
+        parser = BaseArgParser(description).parser()
+        parser.add_argument("-o", "--output",
+                            help="The recording store file to create",
+                            default='./recordings/corpus' + RecordingStore.FILE_EXTENSION,
+                            nargs='?')
+        parser.add_argument("-i", "--int16",
+                            help="Store the recordings as int16 rather than float32",
+                            action='store_true')
+        return parser.parse_args()
+
+    def run(self) -> None:
+        conf = Conf(self._config_file)
+        ble_conf = conf.config['ble_collector']
+        if dirname(self._output_file) != '':
+            makedirs(dirname(self._output_file), exist_ok=True)
+        num_files = RecordingStore.convert_csv_files(data_path=self._data_file_path,
+                                                     store_file=self._output_file,
+                                                     class_names=[cls['class_name'] for cls in conf.config['classes']],
+                                                     sample_interval=int(ble_conf['sample_interval']),
+                                                     device=ble_conf['service_name'],
+                                                     dtype=np.int16 if self._as_int16 else np.float32)
+        print("Converted [{}] csv files to [{}]".format(num_files, self._output_file))
+        return
+
+
+if __name__ == "__main__":
+    MainConvertRecordings().run()
+    sys.exit(0)
@@ -0,0 +1,150 @@
+import sys
+import json
+import time
+from typing import Dict
+from os import makedirs
+from os.path import join
+import numpy as np
+from ActivityModel import ActivityModel
+from BaseArgParser import BaseArgParser
+from Conf import Conf
+from WorkerPool import WorkerPool
+
+
+class MainCrossValidate:
+    """
+    Run k-fold cross validation of a model, with each fold trained and tested in its own worker process, and
+    report the accuracy and confusion matrix of every fold and over all folds.
+
+    The folds are split by recording, so the overlapping look back windows of a recording are never in both
+    the train and test data of a fold. As with MainSweep the training data is parsed once into a single
+    recording store that every fold memory maps, see WorkerPool.
+    """
+    _config_file: str
+    _data_file_path: str
+    _model_type: ActivityModel.ModelType
+    _num_folds: int
+    _num_workers: int
+    _threads_per_worker: int
+    _output_file: str
+
+    def __init__(self):
+        args = self._get_args(description="K-fold cross validation of a model, split by recording")
+        self._config_file = args.json
+        self._data_file_path = args.data
+        self._model_type = ActivityModel.ModelType.str2modeltype(args.model)
+        self._num_folds = args.folds
+        self._num_workers = args.workers
+        self._threads_per_worker = args.threads
+        self._output_file = args.output
+        return
+
+    @staticmethod
+    def _get_args(description: str):
+        """
+        Extract and verify command line arguments
+        :param description: The description of the application
+        """
+        parser = BaseArgParser(description).parser()
+        parser.add_argument("-m", "--model",
+                            help="The type of neural network model to cross validate",
+                            choices=ActivityModel.ModelType.model_options(),  # noqa
+                            default=ActivityModel.ModelType.default_model_type(),
+                            type=ActivityModel.ModelType.valid_model_type)
+        parser.add_argument("-k", "--folds",
+                            help="The number of folds to split the recordings into",
+                            default=5,
+                            type=int)
+        parser.add_argument("-w", "--workers",
+                            help="The number of folds to run in parallel",
+                            default=2,
+                            type=int)
+        parser.add_argument("-t", "--threads",
+                            help="The number of TensorFlow threads each fold is pinned to",
+                            default=1,
+                            type=int)
+        parser.add_argument("-o", "--output",
+                            help="The JSON file to write the per fold and overall results to",
+                            default='./cross-validation-results.json',
+                            nargs='?')
+        return parser.parse_args()
+
+    @staticmethod
+    def _run_fold(fold: Dict) -> Dict:
+        """
+        Train and test a single fold. This is run in a worker process, so the execution profile pins the
+        TensorFlow threads before any TensorFlow work is done in the process.
+        :param fold: The settings of the fold to run
+        :return: The fold along with its accuracy, confusion matrix and timings
+        """
+        conf = Conf(fold['config_file'])
+        checkpoint_path = join(fold['work_path'], 'checkpoint-{}'.format(fold['fold']))
+        makedirs(checkpoint_path, exist_ok=True)
+
+        activity_model = ActivityModel(conf=conf,
+                                       data_file_path=fold['data_path'],
+                                       checkpoint_filepath=checkpoint_path,
+                                       export_filepath='',
+                                       model_type=ActivityModel.ModelType.str2modeltype(fold['model']),
+                                       test_on_load=False,
+                                       plot_training=False,
+                                       execution_profile=WorkerPool.execution_profile(conf=conf, job=fold))
+        activity_model.load_training_data(num_folds=fold['num_folds'], fold=fold['fold'])
+        start = time.perf_counter()
+        activity_model.train()
+        train_time = time.perf_counter() - start
+        confusion = activity_model.confusion_matrix()
+
+        return {'fold': fold['fold'],
+                'accuracy': float(np.trace(confusion) / np.sum(confusion)),
+                'train_time_s': train_time,
+                'confusion': confusion.tolist()}
+
+    def run(self) -> None:
+        conf = Conf(self._config_file)
+        model_name = self._model_type.name.lower()
+        folds = [{'fold': i,
+                  'num_folds': self._num_folds,
+                  'model': model_name,
+                  'config_file': self._config_file} for i in range(self._num_folds)]
+        print("Running [{}] folds of [{}] on [{}] workers".format(self._num_folds, model_name, self._num_workers))
+
+        pool = WorkerPool(conf=conf,
+                          data_file_path=self._data_file_path,
+                          num_workers=self._num_workers,
+                          threads_per_worker=self._threads_per_worker,
+                          name='cv')
+        start = time.perf_counter()
+        results = pool.map(MainCrossValidate._run_fold, folds)
+        wall_time = time.perf_counter() - start
+
+        class_names = [cls['class_name'] for cls in conf.config['classes']]
+        for result in results:
+            print("Fold [{}] accuracy [{:.4f}] trained in [{:.1f}] s, confusion matrix\n{}".format(
+                result['fold'], result['accuracy'], result['train_time_s'], np.array(result['confusion'])))
+
+        accuracies = np.array([result['accuracy'] for result in results])
+        confusion = np.sum([result['confusion'] for result in results], axis=0)
+        summary = {'model': model_name,
+                   'num_folds': self._num_folds,
+                   'classes': class_names,
+                   'mean_accuracy': float(np.mean(accuracies)),
+                   'std_accuracy': float(np.std(accuracies)),
+                   'pooled_accuracy': float(np.trace(confusion) / np.sum(confusion)),
+                   'confusion': confusion.tolist(),
+                   'wall_time_s': wall_time,
+                   'sum_train_time_s': float(np.sum([result['train_time_s'] for result in results])),
+                   'folds': results}
+        with open(self._output_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        print("Accuracy over [{}] folds [{:.4f}] +/- [{:.4f}], pooled accuracy [{:.4f}]".format(
+            self._num_folds, summary['mean_accuracy'], summary['std_accuracy'], summary['pooled_accuracy']))
+        print("Confusion matrix over all folds, classes {}\n{}".format(class_names, confusion))
+        print("Wall time [{:.1f}] s for [{:.1f}] s of training".format(wall_time, summary['sum_train_time_s']))
+        return
+
+
+if __name__ == "__main__":
+    MainCrossValidate().run()
+    sys.exit(0)
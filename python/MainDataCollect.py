@@ -4,6 +4,7 @@ from BLEActivityDataCollector import BLEActivityDataCollector
 from BLEFileStream import BLEFileStream
 from BaseArgParser import BaseArgParser
 from Conf import Conf
+from RecordingStore import RecordingStore
 from os.path import exists
 from os import path
 
@@ -14,6 +15,7 @@ class MainDataCollect:
     _script: str
     _help: str
     _config_file: str
+    _file_extension: str
 
     def __init__(self):
         args = self._get_args(description="Collect and store accelerometer data over Bluetooth from Arduino Nano ")
@@ -21,6 +23,7 @@ class MainDataCollect:
         self._data_dir = args.data
         self._sample_time_in_seconds = args.sample_time
         self._activity_type = args.activity
+        self._file_extension = RecordingStore.FILE_EXTENSION if args.format == 'rec' else '.csv'
         self._out_file = self._next_sequential_file()
         self._config_file = args.json
         return
@@ -28,17 +31,18 @@ class MainDataCollect:
     def _next_sequential_file(self) -> str:
         """
         All data files for the activity type are of the form <data_path>/type-<n>.csv e.g. <data_path>/circle-1.csv.
-        This function used the data path and the activity type and finds the next file in the sequence.
+        This function used the data path and the activity type and finds the next file in the sequence. Binary
+        recordings (.rec) share the same sequence so a sequence number is never used for both forms.
 
         :return: The full path and name of the next file in the activity sequence.
         """
         file_sequence_id = 1
         while 1:
-            next_file = path.join(self._data_dir, '{}-{}.csv'.format(self._activity_type, file_sequence_id))
-            if not exists(next_file):
+            next_file = path.join(self._data_dir, '{}-{}'.format(self._activity_type, file_sequence_id))
+            if not exists(next_file + '.csv') and not exists(next_file + RecordingStore.FILE_EXTENSION):
                 break
             file_sequence_id += 1
-        return next_file
+        return next_file + self._file_extension
 
     @staticmethod
     def _get_args(description: str):
@@ -54,12 +58,21 @@ class MainDataCollect:
         parser.add_argument("-a", "--activity",
                             help="The activity type being recorded",
                             choices=['circle', 'up-down', 'stationary', 'experiment'])
+        parser.add_argument("-f", "--format",
+                            help="Save the recording as csv or as a binary recording store",
+                            choices=['csv', 'rec'],
+                            default='csv')
         return parser.parse_args()
 
     def run(self) -> None:
+        conf = Conf(self._config_file)
+        ble_stream = BLEFileStream(output_file=self._out_file,
+                                   class_name=self._activity_type,
+                                   sample_interval=int(conf.config['ble_collector']['sample_interval']),
+                                   device=conf.config['ble_collector']['service_name'])
         loop = asyncio.get_event_loop()
-        loop.run_until_complete(BLEActivityDataCollector(conf=Conf(self._config_file),
-                                                         ble_stream=BLEFileStream(self._out_file),
+        loop.run_until_complete(BLEActivityDataCollector(conf=conf,
+                                                         ble_stream=ble_stream,
                                                          sample_period=self._sample_time_in_seconds).run())
         loop.close()
         return
@@ -1,11 +1,15 @@
 import sys
+import argparse
 from ActivityModel import ActivityModel
 from BaseArgParser import BaseArgParser
 from Conf import Conf
+from ExecutionProfile import ExecutionProfile
+from InferenceBackend import InferenceBackend
 
 
 class MainFileActivityClassifier:
     _experiment_file: str
+    _experiment_results_file: str
     _data_file_path: str
     _checkpoint_file_path: str
     _export_file_path: str
@@ -14,11 +18,24 @@ class MainFileActivityClassifier:
     _model_type: ActivityModel.ModelType
     _config_file: str
     _verbose: bool
+    _num_loader_workers: int
+    _cache_path: str
+    _stream_training_data: bool
+    _mixed_precision: str
+    _adaptive_training: bool
+    _headless: bool
+    _execution_args: argparse.Namespace
+    _resume_training: bool
+    _keep_best_checkpoints: int
+    _inference_backend: str
+    _inference_threads: int
+    _quantization: str
 
     def __init__(self):
         args = self._get_args(description="Train activity classifier model on saved accelerometer training data")
         self._verbose = args.verbose
         self._experiment_file = args.experiment
+        self._experiment_results_file = args.experiment_results
         self._data_file_path = args.data
         self._checkpoint_file_path = args.checkpoint
         self._use_saved_weights = args.load_weights
@@ -26,6 +43,18 @@ class MainFileActivityClassifier:
         self._generate_tflite_files = args.tflite
         self._config_file = args.json
         self._model_type = ActivityModel.ModelType.str2modeltype(args.model)
+        self._num_loader_workers = args.workers
+        self._cache_path = None if args.no_cache else args.cache
+        self._stream_training_data = args.pipeline
+        self._mixed_precision = args.mixed_precision
+        self._adaptive_training = args.adaptive
+        self._headless = args.headless
+        self._execution_args = args
+        self._resume_training = args.resume
+        self._keep_best_checkpoints = args.keep_best
+        self._inference_backend = args.backend
+        self._inference_threads = args.backend_threads
+        self._quantization = args.quantization
         return
 
     @staticmethod
@@ -39,8 +68,12 @@ class MainFileActivityClassifier:
                             help="Load saved weights from the checkpoint directory",
                             action='store_true')
         parser.add_argument("-e", "--experiment",
-                            help="An existing csv file containing accelerometer data to classify",
+                            help="An existing csv file or recording store (.rec) containing accelerometer data to "
+                                 "classify",
                             type=BaseArgParser.valid_file)
+        parser.add_argument("--experiment_results",
+                            help="A csv file to save the activity predicted for every window of the experiment to",
+                            default=None)
         parser.add_argument("-m", "--model",
                             help="The type of neural network model to create",
                             choices=ActivityModel.ModelType.model_options(),  # noqa
@@ -54,11 +87,58 @@ class MainFileActivityClassifier:
         parser.add_argument("-t", "--tflite",
                             help="Generate the .cpp & .h mode network files for use with TFLite",
                             action='store_true')
+        parser.add_argument("-q", "--quantization",
+                            help="Quantize the TF Lite model, dynamic (int8 weights), float16 (float16 weights) or "
+                                 "int8 (int8 weights, compute, input & output calibrated on the training data)",
+                            choices=ActivityModel.QUANTIZATION_MODES,
+                            default='none')
         parser.add_argument("-c", "--checkpoint",
                             help="The path where model checkpoints will be saved",
                             default='./checkpoint/',
                             nargs='?',
                             type=BaseArgParser.valid_path)
+        parser.add_argument("-w", "--workers",
+                            help="The number of data files to load in parallel, defaults to the number of cores",
+                            default=None,
+                            type=int)
+        parser.add_argument("-k", "--cache",
+                            help="The path where parsed training data is cached between runs",
+                            default='./cache/',
+                            nargs='?',
+                            type=BaseArgParser.valid_path)
+        parser.add_argument("--no_cache",
+                            help="Parse all training data files and do not use or update the cache",
+                            action='store_true')
+        parser.add_argument("-p", "--pipeline",
+                            help="Train from a streaming tf.data input pipeline rather than in memory batches",
+                            action='store_true')
+        parser.add_argument("--mixed_precision",
+                            help="Train with a Keras mixed precision policy, overrides the policy set in the config",
+                            choices=['none', 'mixed_bfloat16', 'mixed_float16'],
+                            default=None)
+        parser.add_argument("-a", "--adaptive",
+                            help="Stop training early once validation loss stops improving, see config for settings",
+                            action='store_true')
+        parser.add_argument("--headless",
+                            help="Save the training plot to the checkpoint path rather than showing it",
+                            action='store_true')
+        parser.add_argument("-r", "--resume",
+                            help="Resume training from the last checkpoint, with the same config and training data",
+                            action='store_true')
+        parser.add_argument("--keep_best",
+                            help="The number of checkpoints with the lowest validation loss to keep",
+                            default=3,
+                            type=int)
+        parser.add_argument("-b", "--backend",
+                            help="The backend predictions are run on, tflite runs the model as exported to the device, "
+                                 "numpy runs the model without TensorFlow",
+                            choices=InferenceBackend.BACKENDS,
+                            default='keras')
+        parser.add_argument("--backend_threads",
+                            help="The number of threads the tflite backend runs with",
+                            default=None,
+                            type=int)
+        ExecutionProfile.add_args(parser)
         return parser.parse_args()
 
     def run(self) -> None:
@@ -68,7 +148,21 @@ class MainFileActivityClassifier:
                                        checkpoint_filepath=self._checkpoint_file_path,
                                        export_filepath=self._export_file_path,
                                        generate_tflite=self._generate_tflite_files,
-                                       model_type=self._model_type)
+                                       model_type=self._model_type,
+                                       num_loader_workers=self._num_loader_workers,
+                                       cache_path=self._cache_path,
+                                       stream_training_data=self._stream_training_data,
+                                       mixed_precision=self._mixed_precision,
+                                       adaptive_training=self._adaptive_training,
+                                       headless=self._headless,
+                                       verbose=self._verbose,
+                                       execution_profile=ExecutionProfile.from_args(conf=conf,
+                                                                                    args=self._execution_args),
+                                       resume_training=self._resume_training,
+                                       keep_best_checkpoints=self._keep_best_checkpoints,
+                                       inference_backend=self._inference_backend,
+                                       inference_threads=self._inference_threads,
+                                       quantization=self._quantization)
 
         activity_model.load_training_data()
 
@@ -76,6 +170,8 @@ class MainFileActivityClassifier:
         # If Generate TF Lite flag has been set the TF Lite /cpp & .h files will be generated.
         if self._use_saved_weights:
             activity_model.load_model_from_checkpoint()
+            if self._generate_tflite_files:
+                activity_model.export_as_tf_lite()
         else:
             activity_model.train()
 
@@ -85,7 +181,9 @@ class MainFileActivityClassifier:
         # If an experiment file has been specified run predictions based on the accelerometer data in the
         # experiment file.
         if self._experiment_file is not None:
-            activity_model.run_experiment(experiment_file=self._experiment_file)
+            results = activity_model.run_experiment(experiment_file=self._experiment_file)
+            if self._experiment_results_file is not None:
+                results.to_csv(self._experiment_results_file)
         return
 
 
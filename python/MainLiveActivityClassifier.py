@@ -5,6 +5,11 @@ from BLEClassifierStream import BLEClassifierStream
 from ActivityModel import ActivityModel
 from BaseArgParser import BaseArgParser
 from Conf import Conf
+from ExecutionProfile import ExecutionProfile
+from InferenceBackend import InferenceBackend
+from PredictionSmoother import PredictionSmoother
+from InferenceService import InferenceService
+from InferenceOffload import InferenceOffload
 
 
 class MainLiveActivityClassifier:
@@ -15,6 +20,9 @@ class MainLiveActivityClassifier:
     _verbose: bool
     _config_file: str
     _conf: Conf
+    _live_classifier_conf: dict
+    _max_devices: int
+    _streaming: bool
 
     def __init__(self):
         args = self._get_args(description="Classify a live stream of accelerometer readings from the Arduino")
@@ -22,13 +30,32 @@ class MainLiveActivityClassifier:
         self._conf = Conf(self._config_file)
         self._verbose = args.verbose
         self._sample_time_in_seconds = args.sample_time
+        self._max_devices = args.devices
+        self._streaming = args.streaming
         self._model_type = ActivityModel.ModelType.str2modeltype(args.model)
+        self._live_classifier_conf = self._conf.live_classifier
+        if args.hop_size is not None:
+            self._live_classifier_conf['hop_size'] = args.hop_size
+        if args.smoothing is not None:
+            self._live_classifier_conf['smoothing'] = args.smoothing
+        if args.max_batch_size is not None:
+            self._live_classifier_conf['max_batch_size'] = args.max_batch_size
+        if args.max_queued is not None:
+            self._live_classifier_conf['max_queued'] = args.max_queued
+        if args.overflow is not None:
+            self._live_classifier_conf['overflow'] = args.overflow
+        if args.resync_interval is not None:
+            self._live_classifier_conf['streaming_resync_interval'] = args.resync_interval
 
         self._activity_model = ActivityModel(conf=self._conf,
                                              data_file_path=args.data,
                                              checkpoint_filepath=args.checkpoint,
                                              export_filepath='',
-                                             model_type=self._model_type)
+                                             model_type=self._model_type,
+                                             verbose=self._verbose,
+                                             execution_profile=ExecutionProfile.from_args(conf=self._conf, args=args),
+                                             inference_backend=args.backend,
+                                             inference_threads=args.backend_threads)
         self._activity_model.load_model_from_checkpoint()
         return
 
@@ -53,15 +80,125 @@ class MainLiveActivityClassifier:
                             default='./checkpoint/',
                             nargs='?',
                             type=BaseArgParser.valid_path)
+        parser.add_argument("--hop_size",
+                            help="The number of updates between predictions, overrides the config which by default "
+                                 "predicts at the same interval as the device",
+                            default=None,
+                            type=int)
+        parser.add_argument("--smoothing",
+                            help="Smooth predictions by majority vote or exponential moving average (ema) over the "
+                                 "recent predictions, overrides the config",
+                            choices=PredictionSmoother.METHODS,
+                            default=None)
+        parser.add_argument("-n", "--devices",
+                            help="Classify the streams of up to this many devices at once, predicting the windows of "
+                                 "all of them in micro batches on the one model",
+                            default=1,
+                            type=int)
+        parser.add_argument("--max_batch_size",
+                            help="The most windows predicted in one batch when classifying many devices, overrides the "
+                                 "config",
+                            default=None,
+                            type=int)
+        parser.add_argument("--max_queued",
+                            help="The most windows of a device waiting to be predicted, 0 predicts in the BLE "
+                                 "callback, overrides the config",
+                            default=None,
+                            type=int)
+        parser.add_argument("--overflow",
+                            help="What to do with a new window when the queue is full, drop the oldest, keep only the "
+                                 "latest or block the BLE callback until there is room, overrides the config",
+                            choices=InferenceOffload.OVERFLOW_POLICIES,
+                            default=None)
+        parser.add_argument("--streaming",
+                            help="Predict update by update, the cnn model computes only the latest time step of its "
+                                 "convolutions and the lstm model only one time step of its state for each update",
+                            action='store_true')
+        parser.add_argument("--resync_interval",
+                            help="When streaming the lstm model, the most updates its state is carried past a full "
+                                 "window before it is re-computed from the latest window, overrides the config",
+                            default=None,
+                            type=int)
+        parser.add_argument("-b", "--backend",
+                            help="The backend predictions are run on, tflite runs the model as exported to the device, "
+                                 "numpy runs the model without TensorFlow",
+                            choices=InferenceBackend.BACKENDS,
+                            default='keras')
+        parser.add_argument("--backend_threads",
+                            help="The number of threads the tflite backend runs with",
+                            default=None,
+                            type=int)
+        ExecutionProfile.add_args(parser)
         return parser.parse_args()
 
+    def _classifier_stream(self,
+                           inference_service: InferenceService = None,
+                           name: str = None) -> BLEClassifierStream:
+        """
+        Create a stream to classify the updates of a device with the live classifier settings.
+        :param inference_service: Optional service shared by all devices to predict the windows
+        :param name: Optional name of the device
+        :return: The classifier stream
+        """
+        if self._streaming:
+            # Streaming predictions are made in step with the updates, so are never offloaded or batched.
+            resync_interval = int(self._live_classifier_conf['streaming_resync_interval'])
+            return BLEClassifierStream(activity_model=self._activity_model,
+                                       hop_size=int(self._live_classifier_conf['hop_size']),
+                                       smoother=PredictionSmoother.from_conf(
+                                           live_classifier_conf=self._live_classifier_conf,
+                                           num_classes=self._activity_model.num_classes()),
+                                       name=name,
+                                       streaming_backend=self._activity_model.streaming_backend(
+                                           resync_interval=resync_interval))
+        return BLEClassifierStream(activity_model=self._activity_model,
+                                   hop_size=int(self._live_classifier_conf['hop_size']),
+                                   smoother=PredictionSmoother.from_conf(
+                                       live_classifier_conf=self._live_classifier_conf,
+                                       num_classes=self._activity_model.num_classes()),
+                                   inference_service=inference_service,
+                                   name=name,
+                                   max_queued=int(self._live_classifier_conf['max_queued']),
+                                   overflow=self._live_classifier_conf['overflow'])
+
+    async def _run_devices(self) -> None:
+        """
+        Classify all the devices found, up to the maximum, at once with the windows of every device predicted by
+        one shared inference service.
+        """
+        devices = (await BLEActivityDataCollector.discover(self._conf))[:self._max_devices]
+        if len(devices) == 0:
+            print("No BLE device with name {} found".format(self._conf.config['ble_collector']['service_name']))
+            return
+        inference_service = None
+        if not self._streaming:
+            inference_service = InferenceService.from_model(activity_model=self._activity_model,
+                                                            live_classifier_conf=self._live_classifier_conf)
+        try:
+            await asyncio.gather(*[BLEActivityDataCollector(conf=self._conf,
+                                                            ble_stream=self._classifier_stream(
+                                                                inference_service=inference_service,
+                                                                name=str(device.address)),
+                                                            sample_period=self._sample_time_in_seconds,
+                                                            verbose=self._verbose,
+                                                            ble_device=device).run()
+                                   for device in devices])
+        finally:
+            if inference_service is not None:
+                inference_service.close()
+                print("Inference service {}".format(inference_service.stats()))
+        return
+
     def run(self) -> None:
         loop = asyncio.get_event_loop()
-        loop.run_until_complete(
-            BLEActivityDataCollector(conf=self._conf,
-                                     ble_stream=BLEClassifierStream(activity_model=self._activity_model),
-                                     sample_period=self._sample_time_in_seconds,
-                                     verbose=self._verbose).run())
+        if self._max_devices > 1:
+            loop.run_until_complete(self._run_devices())
+        else:
+            loop.run_until_complete(
+                BLEActivityDataCollector(conf=self._conf,
+                                         ble_stream=self._classifier_stream(),
+                                         sample_period=self._sample_time_in_seconds,
+                                         verbose=self._verbose).run())
         loop.close()
         return
 
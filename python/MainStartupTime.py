@@ -0,0 +1,107 @@
+import sys
+import json
+import time
+import statistics
+import subprocess
+from typing import Dict, List
+from os.path import dirname, abspath, join, isfile
+from BaseArgParser import BaseArgParser
+
+
+class MainStartupTime:
+    """
+    Measure the start up time of each of the command line entry points, so that a heavy import creeping back
+    onto the start up path is caught.
+
+    Each entry point is run in a fresh interpreter with -h, so the time is that of the interpreter start, the
+    module imports and argument parsing, which is the fixed cost paid before any real work begins.
+    """
+    ENTRY_POINTS = ['MainLiveActivityClassifier', 'MainFileActivityClassifier', 'MainDataCollect']
+
+    _entry_points: List[str]
+    _num_runs: int
+    _baseline_file: str
+    _save_file: str
+    _tolerance: float
+
+    def __init__(self):
+        args = self._get_args(description="Measure the start up time of the command line entry points")
+        self._entry_points = args.entry_points
+        self._num_runs = args.runs
+        self._baseline_file = args.baseline
+        self._save_file = args.save
+        self._tolerance = args.tolerance
+        return
+
+    @staticmethod
+    def _get_args(description: str):
+        """
+        Extract and verify command line arguments
+        :param description: The description of the application
+        """
+        parser = BaseArgParser(description).parser()
+        parser.add_argument("-e", "--entry_points",
+                            help="The entry points to time",
+                            nargs='+',
+                            choices=MainStartupTime.ENTRY_POINTS,
+                            default=MainStartupTime.ENTRY_POINTS)
+        parser.add_argument("-n", "--runs",
+                            help="The number of times to start each entry point, the median time is reported",
+                            default=5,
+                            type=int)
+        parser.add_argument("-b", "--baseline",
+                            help="A JSON file of start up times saved by an earlier run to check for regressions",
+                            default=None,
+                            type=BaseArgParser.valid_file)
+        parser.add_argument("-s", "--save",
+                            help="Save the start up times as JSON to this file for use as a later baseline",
+                            default=None)
+        parser.add_argument("-t", "--tolerance",
+                            help="The fraction a start up time can exceed its baseline by before it is a regression",
+                            default=0.25,
+                            type=float)
+        return parser.parse_args()
+
+    def _time_entry_point(self,
+                          entry_point: str) -> float:
+        """
+        Start the given entry point with -h the set number of times.
+        :param entry_point: The name of the entry point module to time
+        :return: The median start up time in seconds
+        """
+        script = join(dirname(abspath(__file__)), entry_point + '.py')
+        times = list()
+        for _ in range(self._num_runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, script, '-h'], check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        return statistics.median(times)
+
+    def run(self) -> int:
+        """
+        Time all of the entry points and compare to the baseline if one was given.
+        :return: The number of entry points that regressed against the baseline
+        """
+        timings: Dict[str, float] = dict()
+        for entry_point in self._entry_points:
+            timings[entry_point] = self._time_entry_point(entry_point)
+            print("{:<30} {:8.3f} s".format(entry_point, timings[entry_point]))
+
+        if self._save_file is not None:
+            with open(self._save_file, 'w') as f:
+                json.dump(timings, f, indent=2)
+
+        num_regressions = 0
+        if self._baseline_file is not None and isfile(self._baseline_file):
+            with open(self._baseline_file, 'r') as f:
+                baseline = json.load(f)
+            for entry_point, start_time in timings.items():
+                if entry_point in baseline and start_time > baseline[entry_point] * (1.0 + self._tolerance):
+                    print("Start up of [{}] regressed from [{:.3f}] s to [{:.3f}] s"
+                          .format(entry_point, baseline[entry_point], start_time))
+                    num_regressions += 1
+        return num_regressions
+
+
+if __name__ == "__main__":
+    sys.exit(1 if MainStartupTime().run() > 0 else 0)
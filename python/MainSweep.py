@@ -0,0 +1,158 @@
+import sys
+import time
+import itertools
+from typing import Dict, List
+from os import makedirs
+from os.path import join
+from ActivityModel import ActivityModel
+from BaseArgParser import BaseArgParser
+from Conf import Conf
+from WorkerPool import WorkerPool
+
+
+class MainSweep:
+    """
+    Train and test every combination of model type, look back window size and training steps, with each
+    trial run in its own worker process, and report the results as a single table.
+
+    The training data is parsed once and written to a single recording store that every trial memory maps, see
+    WorkerPool. As look back windows are views on the recordings, all trials share the one copy of the data held
+    in the OS page cache, whatever their window size.
+    """
+    _config_file: str
+    _data_file_path: str
+    _model_types: List[str]
+    _window_sizes: List[int]
+    _training_steps: List[int]
+    _num_workers: int
+    _threads_per_worker: int
+    _output_file: str
+    _target_accuracy: float
+
+    def __init__(self):
+        args = self._get_args(description="Sweep model type, look back window size and training steps in parallel")
+        self._config_file = args.json
+        self._data_file_path = args.data
+        self._model_types = args.models
+        self._window_sizes = args.windows
+        self._training_steps = args.steps
+        self._num_workers = args.workers
+        self._threads_per_worker = args.threads
+        self._output_file = args.output
+        self._target_accuracy = args.target
+        return
+
+    @staticmethod
+    def _get_args(description: str):
+        """
+        Extract and verify command line arguments
+        :param description: The description of the application
+        """
+        parser = BaseArgParser(description).parser()
+        parser.add_argument("-m", "--models",
+                            help="The types of neural network model to sweep",
+                            nargs='+',
+                            choices=ActivityModel.ModelType.model_options(),  # noqa
+                            default=ActivityModel.ModelType.model_options(),
+                            type=ActivityModel.ModelType.valid_model_type)
+        parser.add_argument("-l", "--windows",
+                            help="The look back window sizes to sweep, defaults to the size set in the config",
+                            nargs='+',
+                            type=int)
+        parser.add_argument("-n", "--steps",
+                            help="The numbers of training steps to sweep, defaults to the steps set in the config",
+                            nargs='+',
+                            type=int)
+        parser.add_argument("-w", "--workers",
+                            help="The number of trials to run in parallel",
+                            default=2,
+                            type=int)
+        parser.add_argument("-t", "--threads",
+                            help="The number of TensorFlow threads each trial is pinned to",
+                            default=1,
+                            type=int)
+        parser.add_argument("-o", "--output",
+                            help="The csv file to write the results table to",
+                            default='./sweep-results.csv',
+                            nargs='?')
+        parser.add_argument("-a", "--target",
+                            help="The test accuracy (0.0 to 1.0) the chosen model must reach",
+                            default=0.9,
+                            type=float)
+        return parser.parse_args()
+
+    @staticmethod
+    def _run_trial(trial: Dict) -> Dict:
+        """
+        Train and test a single model configuration. This is run in a worker process, so the execution profile
+        pins the TensorFlow threads before any TensorFlow work is done in the process.
+        :param trial: The settings of the trial to run
+        :return: The trial settings along with the accuracy and timings
+        """
+        conf = Conf(trial['config_file'])
+        conf.config[trial['model']]['look_back_window_size'] = trial['look_back_window_size']
+        conf.config[trial['model']]['training_steps'] = trial['training_steps']
+        checkpoint_path = join(trial['work_path'], 'checkpoint-{}'.format(trial['trial']))
+        makedirs(checkpoint_path, exist_ok=True)
+
+        activity_model = ActivityModel(conf=conf,
+                                       data_file_path=trial['data_path'],
+                                       checkpoint_filepath=checkpoint_path,
+                                       export_filepath='',
+                                       model_type=ActivityModel.ModelType.str2modeltype(trial['model']),
+                                       test_on_load=False,
+                                       plot_training=False,
+                                       execution_profile=WorkerPool.execution_profile(conf=conf, job=trial))
+        activity_model.load_training_data()
+        start = time.perf_counter()
+        activity_model.train()
+        train_time = time.perf_counter() - start
+        accuracy = activity_model.test()
+        latency = activity_model.measure_inference_latency()
+
+        result = {k: trial[k] for k in ['trial', 'model', 'look_back_window_size', 'training_steps']}
+        result['accuracy'] = accuracy
+        result['train_time_s'] = train_time
+        result['latency_ms'] = latency * 1000.0
+        result['profile'] = activity_model.execution_profile().profile
+        return result
+
+    def run(self) -> None:
+        conf = Conf(self._config_file)
+        trials = list()
+        for model in self._model_types:
+            window_sizes = self._window_sizes or [conf.config[model]['look_back_window_size']]
+            training_steps = self._training_steps or [conf.config[model]['training_steps']]
+            for window_size, steps in itertools.product(window_sizes, training_steps):
+                trials.append({'trial': len(trials),
+                               'model': model,
+                               'look_back_window_size': window_size,
+                               'training_steps': steps,
+                               'config_file': self._config_file})
+        print("Running [{}] trials on [{}] workers".format(len(trials), self._num_workers))
+
+        import pandas as pd
+        pool = WorkerPool(conf=conf,
+                          data_file_path=self._data_file_path,
+                          num_workers=self._num_workers,
+                          threads_per_worker=self._threads_per_worker,
+                          name='sweep')
+        results = pd.DataFrame(pool.map(MainSweep._run_trial, trials))
+
+        results = results.sort_values(by=['accuracy', 'latency_ms'], ascending=[False, True])
+        results.to_csv(self._output_file, index=False)
+        print(results.to_string(index=False))
+
+        meets_target = results[results['accuracy'] >= self._target_accuracy]
+        if len(meets_target) > 0:
+            best = meets_target.sort_values(by=['latency_ms', 'train_time_s']).iloc[0]
+            print("Cheapest model to reach accuracy [{}] is [{}] with look back window [{}] and [{}] training steps"
+                  .format(self._target_accuracy, best['model'], best['look_back_window_size'], best['training_steps']))
+        else:
+            print("No trial reached the target accuracy [{}]".format(self._target_accuracy))
+        return
+
+
+if __name__ == "__main__":
+    MainSweep().run()
+    sys.exit(0)
@@ -0,0 +1,235 @@
+import json
+from typing import Callable, Dict, List, Tuple, Optional
+import numpy as np
+from InferenceBackend import InferenceBackend
+
+
+class NumpyInferenceBackend(InferenceBackend):
+    """
+    Run the models as a pure numpy forward pass, so predictions can be made without importing TensorFlow at all.
+
+    The trained model is exported once (with TensorFlow) as a compact .npz holding the layer settings and
+    weights, and this backend then only needs numpy to load and run it. Only the layers used by the models are
+    supported: Conv2D (valid padding, unit strides), MaxPooling2D (valid padding), Flatten, Dense, LSTM (returning
+    the last output only) and Dropout (which does nothing at inference). Batches are run as whole arrays layer
+    by layer, an LSTM one time step at a time.
+    """
+    SUPPORTED_LAYERS = ['Conv2D', 'MaxPooling2D', 'Flatten', 'Dense', 'LSTM', 'Dropout']
+
+    _ACTIVATIONS: Dict[str, Callable] = {
+        'linear': lambda x: x,
+        'relu': lambda x: np.maximum(x, 0.0),
+        'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+        'tanh': np.tanh,
+        'softmax': lambda x: NumpyInferenceBackend._softmax(x)
+    }
+
+    _model_file: str
+    _input_shape: tuple
+    _layers: List[Dict]
+
+    def __init__(self,
+                 model_file: str):
+        """
+        :param model_file: The .npz file the model was exported to
+        """
+        self._model_file = model_file
+        with np.load(model_file, allow_pickle=False) as exported:
+            self._input_shape = tuple(int(d) for d in exported['input_shape'])
+            self._layers = json.loads(str(exported['layers']))
+            for i, layer in enumerate(self._layers):
+                for name in layer.pop('weights'):
+                    layer[name] = exported['{}_{}'.format(i, name)].astype(np.float32)
+        return
+
+    @property
+    def name(self) -> str:
+        return 'numpy'
+
+    @staticmethod
+    def exported_from(model_file: str) -> Optional[Dict]:
+        """
+        :param model_file: The exported .npz file
+        :return: The source the weights were exported from as given to export, None if not recorded
+        """
+        with np.load(model_file, allow_pickle=False) as exported:
+            return json.loads(str(exported['source'])) if 'source' in exported.files else None
+
+    @staticmethod
+    def export(model,
+               model_file: str,
+               source: Dict = None) -> None:
+        """
+        Export the layer settings and weights of a trained Keras model as a .npz that this backend can run.
+        :param model: The trained Keras model
+        :param model_file: The .npz file to write
+        :param source: Where the weights came from e.g. the checkpoint file and epoch, so a stale export can be told
+        """
+        layers = list()
+        arrays = {'input_shape': np.array(model.input_shape[1:], dtype=np.int64),
+                  'source': np.array(json.dumps(source if source is not None else {}))}
+        for i, layer in enumerate(model.layers):
+            layer_type = type(layer).__name__
+            if layer_type not in NumpyInferenceBackend.SUPPORTED_LAYERS:
+                raise ValueError("Layer [{}] of type [{}] cannot be run on the numpy backend".format(layer.name,
+                                                                                                     layer_type))
+            config = layer.get_config()
+            exported = {'type': layer_type, 'weights': list()}
+            if layer_type in ['Conv2D', 'Dense']:
+                if layer_type == 'Conv2D' and (config['padding'] != 'valid' or
+                                               tuple(config['strides']) != (1, 1) or
+                                               tuple(config['dilation_rate']) != (1, 1)):
+                    raise ValueError("Only valid padding and unit strides are supported for Conv2D [{}]"
+                                     .format(layer.name))
+                exported['activation'] = config['activation']
+                if exported['activation'] not in NumpyInferenceBackend._ACTIVATIONS:
+                    raise ValueError("Activation [{}] of layer [{}] is not supported".format(config['activation'],
+                                                                                              layer.name))
+                names = ['kernel', 'bias'] if config['use_bias'] else ['kernel']
+                for name, weight in zip(names, layer.get_weights()):
+                    arrays['{}_{}'.format(i, name)] = weight.astype(np.float32)
+                    exported['weights'].append(name)
+            elif layer_type == 'MaxPooling2D':
+                if config['padding'] != 'valid' or tuple(config['strides']) != tuple(config['pool_size']):
+                    raise ValueError("Only valid padding and strides equal to pool size are supported for [{}]"
+                                     .format(layer.name))
+                exported['pool_size'] = list(config['pool_size'])
+            elif layer_type == 'LSTM':
+                if config['return_sequences'] or config['return_state'] or config['go_backwards'] or \
+                        config['stateful'] or config.get('time_major', False):
+                    raise ValueError("Only an LSTM returning the last output of a forward pass is supported for [{}]"
+                                     .format(layer.name))
+                exported['activation'] = config['activation']
+                exported['recurrent_activation'] = config['recurrent_activation']
+                for activation in [exported['activation'], exported['recurrent_activation']]:
+                    if activation not in NumpyInferenceBackend._ACTIVATIONS:
+                        raise ValueError("Activation [{}] of layer [{}] is not supported".format(activation,
+                                                                                                  layer.name))
+                names = ['kernel', 'recurrent_kernel', 'bias'] if config['use_bias'] else ['kernel',
+                                                                                          'recurrent_kernel']
+                for name, weight in zip(names, layer.get_weights()):
+                    arrays['{}_{}'.format(i, name)] = weight.astype(np.float32)
+                    exported['weights'].append(name)
+            layers.append(exported)
+        arrays['layers'] = np.array(json.dumps(layers))
+        with open(model_file, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        return
+
+    @staticmethod
+    def _softmax(x: np.ndarray) -> np.ndarray:
+        e = np.exp(x - np.max(x, axis=-1, keepdims=True))
+        return e / np.sum(e, axis=-1, keepdims=True)
+
+    @staticmethod
+    def _conv2d(x: np.ndarray,
+                kernel: np.ndarray) -> np.ndarray:
+        """
+        Valid padding, unit stride 2D convolution as a single tensor product over strided patches of the input.
+        :param x: The input as (batch, height, width, channels in)
+        :param kernel: The kernel as (kernel height, kernel width, channels in, channels out)
+        :return: The output as (batch, output height, output width, channels out)
+        """
+        batch, height, width, channels = x.shape
+        kernel_height, kernel_width = kernel.shape[:2]
+        patches = np.lib.stride_tricks.as_strided(
+            x,
+            shape=(batch, height - kernel_height + 1, width - kernel_width + 1, kernel_height, kernel_width, channels),
+            strides=(x.strides[0], x.strides[1], x.strides[2], x.strides[1], x.strides[2], x.strides[3]),
+            writeable=False)
+        return np.tensordot(patches, kernel, axes=3)
+
+    @staticmethod
+    def _max_pool2d(x: np.ndarray,
+                    pool_size: List[int]) -> np.ndarray:
+        """
+        Valid padding max pooling with strides equal to the pool size.
+        :param x: The input as (batch, height, width, channels)
+        :param pool_size: The pool (height, width)
+        :return: The output as (batch, height // pool height, width // pool width, channels)
+        """
+        batch, height, width, channels = x.shape
+        pool_height, pool_width = pool_size
+        out_height, out_width = height // pool_height, width // pool_width
+        x = x[:, :out_height * pool_height, :out_width * pool_width]
+        return x.reshape(batch, out_height, pool_height, out_width, pool_width, channels).max(axis=(2, 4))
+
+    @staticmethod
+    def _lstm_step(layer: Dict,
+                   x_kernel: np.ndarray,
+                   h: np.ndarray,
+                   c: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One time step of an LSTM, with the gates in the Keras order of input, forget, cell and output.
+        :param layer: The exported LSTM layer
+        :param x_kernel: The product of the input at the time step with the kernel as (batch, 4 x units)
+        :param h: The hidden state as (batch, units)
+        :param c: The cell state as (batch, units)
+        :return: The hidden and cell state after the time step
+        """
+        units = h.shape[-1]
+        z = x_kernel + h @ layer['recurrent_kernel']
+        if 'bias' in layer:
+            z += layer['bias']
+        recurrent_activation = NumpyInferenceBackend._ACTIVATIONS[layer['recurrent_activation']]
+        activation = NumpyInferenceBackend._ACTIVATIONS[layer['activation']]
+        i = recurrent_activation(z[:, :units])
+        f = recurrent_activation(z[:, units:2 * units])
+        c = f * c + i * activation(z[:, 2 * units:3 * units])
+        h = recurrent_activation(z[:, 3 * units:]) * activation(c)
+        return tuple((h, c))  # noqa
+
+    @staticmethod
+    def _lstm(layer: Dict,
+              x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run an LSTM over whole sequences from zero state.
+        :param layer: The exported LSTM layer
+        :param x: The sequences as (batch, time steps, features)
+        :return: The hidden and cell state after the last time step, each as (batch, units)
+        """
+        units = layer['recurrent_kernel'].shape[0]
+        h = np.zeros((len(x), units), dtype=np.float32)
+        c = np.zeros((len(x), units), dtype=np.float32)
+        # The input part of every time step does not depend on the state, so is one product for the sequence.
+        x_kernel = x @ layer['kernel']
+        for t in range(x.shape[1]):
+            h, c = NumpyInferenceBackend._lstm_step(layer, x_kernel[:, t], h, c)
+        return tuple((h, c))  # noqa
+
+    def _apply(self,
+               layer: Dict,
+               x: np.ndarray) -> np.ndarray:
+        """
+        Run a single layer forward.
+        :param layer: The exported layer
+        :param x: The input to the layer, with a leading batch dimension
+        :return: The output of the layer
+        """
+        layer_type = layer['type']
+        if layer_type == 'Conv2D':
+            x = self._conv2d(np.ascontiguousarray(x), layer['kernel'])
+        elif layer_type == 'Dense':
+            x = x @ layer['kernel']
+        elif layer_type == 'MaxPooling2D':
+            x = self._max_pool2d(x, layer['pool_size'])
+        elif layer_type == 'Flatten':
+            x = x.reshape(len(x), -1)
+        elif layer_type == 'LSTM':
+            return self._lstm(layer, x)[0]  # The bias and activations are applied within each time step
+        if 'bias' in layer:
+            x = x + layer['bias']
+        if 'activation' in layer:
+            x = self._ACTIVATIONS[layer['activation']](x)
+        return x
+
+    def predict_batch(self,
+                      windows: np.ndarray) -> np.ndarray:
+        x = np.ascontiguousarray(windows, dtype=np.float32).reshape(tuple((-1, *self._input_shape)))
+        for layer in self._layers:
+            x = self._apply(layer, x)
+        return x
+
+    def predict_window(self,
+                       window: np.ndarray) -> np.ndarray:
+        return self.predict_batch(window)[0]
@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class PredictionSmoother:
+    """
+    Smooth the class probabilities of a stream of predictions over the most recent predictions, so a single
+    odd window does not flip the activity reported.
+
+        none     : the probabilities of the latest prediction, unchanged.
+        majority : the fraction of the last window predictions that voted for each class.
+        ema      : an exponential moving average of the probabilities, weighting the latest by ema alpha.
+    """
+    METHODS = ['none', 'majority', 'ema']
+
+    _method: str
+    _window: int
+    _ema_alpha: float
+    _votes: np.ndarray
+    _num_votes: int
+    _next_vote: int
+    _average: np.ndarray
+
+    def __init__(self,
+                 num_classes: int,
+                 method: str = 'none',
+                 window: int = 5,
+                 ema_alpha: float = 0.5):
+        """
+        :param num_classes: The number of classes predicted
+        :param method: The smoothing method, one of METHODS
+        :param window: The number of recent predictions the majority vote is taken over
+        :param ema_alpha: The weight 0.0 to 1.0 of the latest prediction in the exponential moving average
+        """
+        if method not in self.METHODS:
+            raise ValueError("[{}] is not a valid smoothing method".format(method))
+        if window < 1:
+            raise ValueError("Smoothing window must be at least 1 but was [{}]".format(window))
+        if not 0.0 < ema_alpha <= 1.0:
+            raise ValueError("EMA alpha must be greater than 0 and at most 1 but was [{}]".format(ema_alpha))
+        self._method = method
+        self._window = window
+        self._ema_alpha = float(ema_alpha)
+        self._votes = np.zeros(window, dtype=np.int64)
+        self._num_votes = 0
+        self._next_vote = 0
+        self._average = np.zeros(num_classes, dtype=np.float32)
+        return
+
+    @staticmethod
+    def from_conf(live_classifier_conf: dict,
+                  num_classes: int) -> 'PredictionSmoother':
+        """
+        Create the smoother from the live classifier settings, see Conf.live_classifier.
+        :param live_classifier_conf: The live classifier settings
+        :param num_classes: The number of classes predicted
+        :return: The prediction smoother
+        """
+        return PredictionSmoother(num_classes=num_classes,
+                                  method=live_classifier_conf['smoothing'],
+                                  window=int(live_classifier_conf['smoothing_window']),
+                                  ema_alpha=float(live_classifier_conf['ema_alpha']))
+
+    @property
+    def method(self) -> str:
+        return self._method
+
+    def reset(self) -> None:
+        """
+        Forget all previous predictions.
+        """
+        self._num_votes = 0
+        self._next_vote = 0
+        return
+
+    def update(self,
+               probabilities: np.ndarray) -> np.ndarray:
+        """
+        Add the latest prediction and get the smoothed probabilities.
+        :param probabilities: The probability of each class of the latest prediction as (num classes,)
+        :return: The smoothed probability of each class as (num classes,)
+        """
+        if self._method == 'majority':
+            self._votes[self._next_vote] = int(np.argmax(probabilities))
+            self._next_vote = (self._next_vote + 1) % self._window
+            self._num_votes = min(self._num_votes + 1, self._window)
+            votes = np.bincount(self._votes[:self._num_votes], minlength=len(self._average))
+            return votes / self._num_votes
+        elif self._method == 'ema':
+            if self._num_votes == 0:
+                self._average[...] = probabilities
+            else:
+                self._average += self._ema_alpha * (probabilities - self._average)
+            self._num_votes = 1
+            return self._average.copy()
+        return probabilities
@@ -0,0 +1,154 @@
+from typing import Dict, List, Tuple
+import hashlib
+import json
+from os import makedirs, remove, replace, stat
+from os.path import abspath, exists, join
+import numpy as np
+from RecordingLoader import RecordingLoader
+
+
+class RecordingCache:
+    """
+    Class to keep a persistent cache of parsed recording files so that only new or changed files are parsed.
+
+    Each parsed recording is saved as a .npy file and tracked in a manifest keyed by the absolute path of the
+    source file along with its size, modification time and content hash. The cache is held in a sub directory
+    that is specific to the look back window size, class list and dtype, so a change to any of those starts a
+    new cache. Unchanged recordings are memory mapped back from the cache rather than parsed.
+    """
+    _MANIFEST = 'manifest.json'
+
+    _cache_root: str
+    _cache_key: List
+    _cache_path: str
+    _recording_loader: RecordingLoader
+    _manifest: Dict[str, Dict]
+
+    def __init__(self,
+                 cache_path: str,
+                 look_back_window_size: int,
+                 class_names: List[str],
+                 recording_loader: RecordingLoader = None):
+        """
+        :param cache_path: The root directory to hold the cache
+        :param look_back_window_size: The look back window size the recordings are loaded for
+        :param class_names: The names of the activity classes the recordings are loaded for
+        :param recording_loader: The loader used to parse the files that are not in the cache
+        """
+        self._cache_key = [look_back_window_size, class_names]
+        self._cache_root = cache_path
+        self._recording_loader = recording_loader if recording_loader is not None else RecordingLoader()
+        self._cache_path = None  # noqa
+        self._manifest = None  # noqa
+        return
+
+    def _open(self,
+              dtype: np.dtype) -> None:
+        """
+        Locate (or create) the cache directory for the current key and dtype and read its manifest.
+        :param dtype: The dtype the recordings are loaded as
+        """
+        key = json.dumps(self._cache_key + [np.dtype(dtype).str])
+        self._cache_path = join(self._cache_root, hashlib.sha1(key.encode('utf-8')).hexdigest()[:16])
+        makedirs(self._cache_path, exist_ok=True)
+        self._manifest = dict()
+        manifest_file = join(self._cache_path, self._MANIFEST)
+        if exists(manifest_file):
+            try:
+                with open(manifest_file, 'r') as f:
+                    self._manifest = json.load(f)
+            except ValueError:
+                print("Warning, ignoring corrupt cache manifest [{}]".format(manifest_file))
+        return
+
+    def _save_manifest(self) -> None:
+        manifest_file = join(self._cache_path, self._MANIFEST)
+        with open(manifest_file + '.tmp', 'w') as f:
+            json.dump(self._manifest, f, indent=1)
+        replace(manifest_file + '.tmp', manifest_file)
+        return
+
+    @staticmethod
+    def content_hash(data_file: str) -> str:
+        """
+        :param data_file: The file to hash
+        :return: The sha1 hash of the file contents as hex string
+        """
+        h = hashlib.sha1()
+        with open(data_file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        return h.hexdigest()
+
+    def _is_current(self,
+                    data_file: str,
+                    entry: Dict) -> bool:
+        """
+        Check if the cache entry is still a true copy of the given file. The content is only hashed if the
+        size matches but the modification time does not.
+        :param data_file: The source file of the entry
+        :param entry: The manifest entry for the file
+        :return: True if the cached recording can be used in place of parsing the file
+        """
+        st = stat(data_file)
+        if entry is None or entry['size'] != st.st_size or not exists(join(self._cache_path, entry['npy'])):
+            return False
+        if entry['mtime_ns'] != st.st_mtime_ns:
+            if entry['sha1'] != self.content_hash(data_file):
+                return False
+            entry['mtime_ns'] = st.st_mtime_ns  # Touched but not changed
+        return True
+
+    def _evict(self,
+               data_file: str) -> None:
+        entry = self._manifest.pop(data_file)
+        npy_file = join(self._cache_path, entry['npy'])
+        if exists(npy_file):
+            remove(npy_file)
+        return
+
+    def load(self,
+             data_files: List[str],
+             num_features: int,
+             dtype: np.dtype = np.float64) -> Tuple[np.ndarray, List[int]]:
+        """
+        Load the given recording files end to end into a single array, parsing only files not already cached.
+        :param data_files: The csv files to load
+        :param num_features: The number of feature columns in every file
+        :param dtype: The dtype of the returned array
+        :return: The recordings as (total rows, features) and the number of rows in each recording
+        """
+        self._open(dtype)
+
+        # Evict entries for files that no longer exist, or that have changed.
+        for data_file in list(self._manifest.keys()):
+            if not exists(data_file) or not self._is_current(data_file, self._manifest[data_file]):
+                self._evict(data_file)
+
+        sources = [abspath(f) for f in data_files]
+        to_parse = [f for f in sources if f not in self._manifest]
+        if len(to_parse) > 0:
+            print("Cache miss for [{}] of [{}] data files".format(len(to_parse), len(sources)))
+            parsed, parsed_lengths = self._recording_loader.load(to_parse, num_features, dtype)
+            offset = 0
+            for data_file, num_rows in zip(to_parse, parsed_lengths):
+                content_hash = self.content_hash(data_file)
+                npy = hashlib.sha1(data_file.encode('utf-8')).hexdigest()[:16] + '.npy'
+                np.save(join(self._cache_path, npy), parsed[offset:offset + num_rows])
+                offset += num_rows
+                st = stat(data_file)
+                self._manifest[data_file] = {'size': st.st_size,
+                                             'mtime_ns': st.st_mtime_ns,
+                                             'sha1': content_hash,
+                                             'rows': num_rows,
+                                             'npy': npy}
+        self._save_manifest()
+
+        recording_lengths = [self._manifest[f]['rows'] for f in sources]
+        samples = np.empty((sum(recording_lengths), num_features), dtype=dtype)
+        offset = 0
+        for data_file, num_rows in zip(sources, recording_lengths):
+            samples[offset:offset + num_rows] = np.load(join(self._cache_path, self._manifest[data_file]['npy']),
+                                                        mmap_mode='r')
+            offset += num_rows
+        return tuple((samples, recording_lengths))  # noqa
@@ -0,0 +1,99 @@
+from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from os import cpu_count
+import numpy as np
+
+
+class RecordingLoader:
+    """
+    Class to load a set of accelerometer recording csv files into a single (rows, features) array.
+
+    Files are parsed in parallel and the final array is allocated once. On a thread pool the row counts are
+    found first so each file can be parsed directly into its own slice of the final array. On a process pool
+    the parsed files are returned to this process and copied into place.
+    """
+    _num_workers: int
+    _use_processes: bool
+
+    def __init__(self,
+                 num_workers: int = None,
+                 use_processes: bool = False):
+        """
+        :param num_workers: The number of files to parse in parallel, defaults to the number of cores
+        :param use_processes: If True parse on a process pool rather than a thread pool
+        """
+        self._num_workers = num_workers if num_workers is not None else cpu_count()
+        self._use_processes = use_processes
+        return
+
+    @staticmethod
+    def count_rows(data_file: str) -> int:
+        """
+        Count the data rows in a recording csv file without parsing it.
+        :param data_file: The csv file to count the rows of
+        :return: The number of data rows, excluding the header row
+        """
+        num_lines = 0
+        last_byte = b'\n'
+        with open(data_file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                num_lines += block.count(b'\n')
+                last_byte = block[-1:]
+        if last_byte != b'\n':
+            num_lines += 1  # last line has no terminating new line
+        return max(num_lines - 1, 0)
+
+    @staticmethod
+    def read_recording(data_file: str,
+                       dtype: np.dtype = np.float64) -> np.ndarray:
+        """
+        Parse a single recording csv file, dropping the index column.
+        :param data_file: The csv file to parse
+        :param dtype: The dtype of the returned array
+        :return: The recording as (rows, features)
+        """
+        import pandas as pd
+        return pd.read_csv(data_file, index_col=0).to_numpy(dtype=dtype)
+
+    @staticmethod
+    def _read_into(data_file: str,
+                   target: np.ndarray) -> None:
+        """
+        Parse a recording csv file into the given slice of the final array.
+        :param data_file: The csv file to parse
+        :param target: The slice of the final array that the recording must exactly fill
+        """
+        x = RecordingLoader.read_recording(data_file, target.dtype)
+        if x.shape != target.shape:
+            raise ValueError("Expected [{}] to have shape {} but got {}".format(data_file, target.shape, x.shape))
+        target[:] = x
+        return
+
+    def load(self,
+             data_files: List[str],
+             num_features: int,
+             dtype: np.dtype = np.float64) -> Tuple[np.ndarray, List[int]]:
+        """
+        Load the given recording files end to end into a single array.
+        :param data_files: The csv files to load
+        :param num_features: The number of feature columns in every file
+        :param dtype: The dtype of the returned array
+        :return: The recordings as (total rows, features) and the number of rows in each recording
+        """
+        if self._use_processes:
+            with ProcessPoolExecutor(max_workers=self._num_workers) as pool:
+                recordings = list(pool.map(RecordingLoader.read_recording, data_files, [dtype] * len(data_files)))
+            recording_lengths = [len(x) for x in recordings]
+            samples = np.empty((sum(recording_lengths), num_features), dtype=dtype)
+            offset = 0
+            for x in recordings:
+                samples[offset:offset + len(x)] = x
+                offset += len(x)
+        else:
+            with ThreadPoolExecutor(max_workers=self._num_workers) as pool:
+                recording_lengths = list(pool.map(RecordingLoader.count_rows, data_files))
+                samples = np.empty((sum(recording_lengths), num_features), dtype=dtype)
+                offsets = np.cumsum([0] + recording_lengths)
+                targets = [samples[offsets[i]:offsets[i + 1]] for i in range(len(data_files))]
+                list(pool.map(RecordingLoader._read_into, data_files, targets))  # list() to raise any parse error
+        return tuple((samples, recording_lengths))  # noqa
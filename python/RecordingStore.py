@@ -0,0 +1,304 @@
+from typing import List, NamedTuple, Tuple
+import re
+import struct
+from os import listdir
+from os.path import isfile, join
+import numpy as np
+from RecordingLoader import RecordingLoader
+
+
+class RecordingStore:
+    """
+    Class to read and write accelerometer recordings in a binary columnar form.
+
+    A store file holds one or more recordings as a fixed width payload of (rows, features) values with the
+    recordings held end to end. A small header describes the payload and an index gives the offset, length,
+    activity class, sample interval and device of each recording. The payload is memory mapped on read so
+    recordings (and windows over them) are views onto the file rather than parsed copies.
+
+    Layout (little endian)
+        header : magic, version, num features, payload dtype, int16 scale, num recordings
+        index  : one fixed size entry per recording
+        payload: aligned to PAYLOAD_ALIGN bytes from the start of the file
+    """
+
+    class Recording(NamedTuple):
+        class_name: str
+        row_offset: int
+        num_rows: int
+        sample_interval: int
+        device: str
+
+    FILE_EXTENSION: str = '.rec'
+    PAYLOAD_ALIGN: int = 64
+    INT16_SCALE: float = 1.0 / 4096.0  # Nano 33 accelerometer range is +/- 4g
+
+    _MAGIC = b'ACTREC'
+    _VERSION = 1
+    _HEADER = struct.Struct('<6sHIIfI')
+    _ENTRY = struct.Struct('<QQI32s64s')
+    _DTYPES = {1: np.dtype('<f4'), 2: np.dtype('<i2')}
+
+    _store_file: str
+    _num_features: int
+    _dtype: np.dtype
+    _scale: float
+    _recordings: List[Recording]
+    _payload: np.ndarray
+
+    def __init__(self,
+                 store_file: str):
+        """
+        Open an existing store file and memory map its payload
+        :param store_file: The store file to open
+        """
+        self._store_file = store_file
+        with open(store_file, 'rb') as f:
+            magic, version, self._num_features, dtype_code, self._scale, num_recordings = \
+                self._HEADER.unpack(f.read(self._HEADER.size))
+            if magic != self._MAGIC or version != self._VERSION:
+                raise ValueError("[{}] is not a version {} recording store".format(store_file, self._VERSION))
+            if dtype_code not in self._DTYPES:
+                raise ValueError("[{}] has unknown payload type [{}]".format(store_file, dtype_code))
+            self._dtype = self._DTYPES[dtype_code]
+            self._recordings = list()
+            for _ in range(num_recordings):
+                row_offset, num_rows, sample_interval, class_name, device = \
+                    self._ENTRY.unpack(f.read(self._ENTRY.size))
+                self._recordings.append(RecordingStore.Recording(class_name=self._decode(class_name),
+                                                                 row_offset=row_offset,
+                                                                 num_rows=num_rows,
+                                                                 sample_interval=sample_interval,
+                                                                 device=self._decode(device)))
+        num_rows = sum(r.num_rows for r in self._recordings)
+        if num_rows > 0:
+            self._payload = np.memmap(store_file,
+                                      dtype=self._dtype,
+                                      mode='r',
+                                      offset=self._payload_offset(num_recordings),
+                                      shape=(num_rows, self._num_features))
+        else:
+            self._payload = np.empty((0, self._num_features), dtype=self._dtype)  # Cannot map zero bytes
+        return
+
+    @staticmethod
+    def _decode(value: bytes) -> str:
+        return value.rstrip(b'\0').decode('utf-8')
+
+    @staticmethod
+    def _payload_offset(num_recordings: int) -> int:
+        index_end = RecordingStore._HEADER.size + num_recordings * RecordingStore._ENTRY.size
+        return -(-index_end // RecordingStore.PAYLOAD_ALIGN) * RecordingStore.PAYLOAD_ALIGN
+
+    @property
+    def store_file(self) -> str:
+        return self._store_file
+
+    @property
+    def recordings(self) -> List[Recording]:
+        """
+        :return: The index entry for every recording in the store
+        """
+        return self._recordings
+
+    @property
+    def payload(self) -> np.ndarray:
+        """
+        The raw memory mapped payload of all recordings end to end, in the dtype it is stored as.
+        :return: Read only (rows, features) array
+        """
+        return self._payload
+
+    @property
+    def is_float(self) -> bool:
+        """
+        :return: True if the payload is stored as float and so can be used without conversion
+        """
+        return self._dtype.kind == 'f'
+
+    def samples(self,
+                dtype: np.dtype = None) -> np.ndarray:
+        """
+        The payload of all recordings as (rows, features) in the given dtype. This is the mapped payload
+        itself if it is already of the given dtype, otherwise it is a converted copy.
+        :param dtype: The required dtype, if None a float payload is returned as is and int16 as float32
+        :return: (rows, features) array of samples
+        """
+        if dtype is None:
+            dtype = self._dtype if self.is_float else np.float32
+        if self._payload.dtype == np.dtype(dtype):
+            return self._payload
+        if self.is_float:
+            return self._payload.astype(dtype)
+        return self._payload.astype(dtype) * np.asarray(self._scale, dtype=dtype)
+
+    def recording(self,
+                  i: int) -> np.ndarray:
+        """
+        :param i: The index of the recording
+        :return: The i'th recording as a view onto the mapped payload
+        """
+        r = self._recordings[i]
+        return self._payload[r.row_offset:r.row_offset + r.num_rows]
+
+    @staticmethod
+    def write(store_file: str,
+              recordings: List[np.ndarray],
+              class_names: List[str],
+              sample_interval: int,
+              devices: List[str] = None,
+              dtype: np.dtype = np.float32) -> None:
+        """
+        Write the given recordings as a single store file.
+        :param store_file: The file to write, any existing file is replaced
+        :param recordings: The recordings to write, each as (rows, features)
+        :param class_names: The activity class of each recording
+        :param sample_interval: The interval in milli seconds between samples
+        :param devices: Optional name of the device each recording was taken from
+        :param dtype: The payload dtype, float32 or int16
+        """
+        dtype = np.dtype(dtype).newbyteorder('<')
+        dtype_code = [k for k, v in RecordingStore._DTYPES.items() if v == dtype]
+        if len(dtype_code) == 0:
+            raise ValueError("Recordings can only be stored as float32 or int16 not [{}]".format(dtype))
+        if len(recordings) != len(class_names):
+            raise ValueError("Expected one class name for each of the [{}] recordings".format(len(recordings)))
+        devices = devices if devices is not None else [''] * len(recordings)
+        num_features = recordings[0].shape[1] if len(recordings) > 0 else 0
+
+        with open(store_file, 'wb') as f:
+            f.write(RecordingStore._HEADER.pack(RecordingStore._MAGIC,
+                                                RecordingStore._VERSION,
+                                                num_features,
+                                                dtype_code[0],
+                                                RecordingStore.INT16_SCALE,
+                                                len(recordings)))
+            row_offset = 0
+            for x, class_name, device in zip(recordings, class_names, devices):
+                f.write(RecordingStore._ENTRY.pack(row_offset,
+                                                   len(x),
+                                                   sample_interval,
+                                                   class_name.encode('utf-8'),
+                                                   device.encode('utf-8')))
+                row_offset += len(x)
+            f.write(b'\0' * (RecordingStore._payload_offset(len(recordings)) - f.tell()))
+            for x in recordings:
+                if dtype.kind == 'i':
+                    x = np.clip(np.round(np.asarray(x) / RecordingStore.INT16_SCALE), -32768, 32767)
+                f.write(np.ascontiguousarray(x, dtype=dtype).tobytes())
+        return
+
+    @staticmethod
+    def find_csv_files(data_path: str,
+                       class_names: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Find the csv recordings of a known activity class in the data path.
+        :param data_path: The path holding the csv files, named by activity class e.g. circle-1.csv
+        :param class_names: The known activity classes
+        :return: The csv files and the activity class of each
+        """
+        data_files = list()
+        data_classes = list()
+        for f in sorted(listdir(data_path)):
+            if not isfile(join(data_path, f)):
+                continue
+            for class_name in class_names:
+                if re.match('^' + class_name + '.*\\.csv$', f):
+                    data_files.append(join(data_path, f))
+                    data_classes.append(class_name)
+                    break
+        return tuple((data_files, data_classes))  # noqa
+
+    @staticmethod
+    def find_store_files(data_path: str) -> List[str]:
+        """
+        :param data_path: The path to look for recording stores in
+        :return: The recording store files in the data path
+        """
+        return [join(data_path, f) for f in sorted(listdir(data_path))
+                if isfile(join(data_path, f)) and f.endswith(RecordingStore.FILE_EXTENSION)]
+
+    @staticmethod
+    def convert_csv_files(data_path: str,
+                          store_file: str,
+                          class_names: List[str],
+                          sample_interval: int,
+                          device: str = '',
+                          dtype: np.dtype = np.float32) -> int:
+        """
+        Convert all the csv recordings of a known activity class in the data path to a single store file.
+        :param data_path: The path holding the csv files, named by activity class e.g. circle-1.csv
+        :param store_file: The store file to write
+        :param class_names: The known activity classes
+        :param sample_interval: The interval in milli seconds between samples
+        :param device: The name of the device the recordings were taken from
+        :param dtype: The payload dtype, float32 or int16
+        :return: The number of csv files converted
+        """
+        data_files, data_classes = RecordingStore.find_csv_files(data_path=data_path, class_names=class_names)
+        if len(data_files) == 0:
+            raise ValueError("No csv data files of known activity class found in [{}]".format(data_path))
+
+        samples, recording_lengths = RecordingLoader().load(data_files=data_files,
+                                                            num_features=3,  # x,y,z Accelerometer readings
+                                                            dtype=np.float32)
+        offsets = np.cumsum([0] + recording_lengths)
+        RecordingStore.write(store_file=store_file,
+                             recordings=[samples[offsets[i]:offsets[i + 1]] for i in range(len(data_files))],
+                             class_names=data_classes,
+                             sample_interval=sample_interval,
+                             devices=[device] * len(data_files),
+                             dtype=dtype)
+        return len(data_files)
+
+    @staticmethod
+    def merge_data_files(data_path: str,
+                         store_file: str,
+                         class_names: List[str],
+                         sample_interval: int,
+                         dtype: np.dtype = np.float32) -> int:
+        """
+        Merge all the recordings of a known activity class in the data path into a single store file. These are
+        the csv files named by activity class and the recordings held in any recording stores, the same set of
+        recordings that ActivityModel loads from the data path.
+        :param data_path: The path holding the csv files and recording stores
+        :param store_file: The store file to write, this must not be in the data path
+        :param class_names: The known activity classes
+        :param sample_interval: The interval in milli seconds between samples
+        :param dtype: The payload dtype, float32 or int16
+        :return: The number of recordings merged
+        """
+        recordings = list()
+        recording_classes = list()
+        devices = list()
+        data_files, data_classes = RecordingStore.find_csv_files(data_path=data_path, class_names=class_names)
+        if len(data_files) > 0:
+            samples, recording_lengths = RecordingLoader().load(data_files=data_files,
+                                                                num_features=3,  # x,y,z Accelerometer readings
+                                                                dtype=np.float32)
+            offsets = np.cumsum([0] + recording_lengths)
+            recordings.extend([samples[offsets[i]:offsets[i + 1]] for i in range(len(data_files))])
+            recording_classes.extend(data_classes)
+            devices.extend([''] * len(data_files))
+
+        for data_store_file in RecordingStore.find_store_files(data_path):
+            store = RecordingStore(data_store_file)
+            samples = store.samples(np.float32)
+            for r in store.recordings:
+                if r.class_name not in class_names:
+                    print("Warning, Skipping recording of un known type [{}] in [{}]".format(r.class_name,
+                                                                                             data_store_file))
+                    continue
+                recordings.append(samples[r.row_offset:r.row_offset + r.num_rows])
+                recording_classes.append(r.class_name)
+                devices.append(r.device)
+
+        if len(recordings) == 0:
+            raise ValueError("No recordings of known activity class found in [{}]".format(data_path))
+        RecordingStore.write(store_file=store_file,
+                             recordings=recordings,
+                             class_names=recording_classes,
+                             sample_interval=sample_interval,
+                             devices=devices,
+                             dtype=dtype)
+        return len(recordings)
@@ -0,0 +1,133 @@
+from typing import Dict, List, Optional
+import numpy as np
+from NumpyInferenceBackend import NumpyInferenceBackend
+from StreamingInferenceBackend import StreamingInferenceBackend
+
+
+class StreamingCNNInferenceBackend(NumpyInferenceBackend, StreamingInferenceBackend):
+    """
+    Run the exported CNN model on a stream of samples, computing only the new time step of each convolution
+    as each sample arrives.
+
+    With a valid convolution of unit stride over time, the output rows of a window that has moved on by one
+    sample are the previous rows plus one new row, so the output rows of each convolution are cached and each
+    new sample costs one row of each convolution. Only the layers after the convolutions (max pooling and the
+    dense head) are run over the whole window, from the cached rows of the last convolution, when a prediction
+    is made.
+
+    The rows of each layer are held in a ring buffer where each row is written twice, capacity rows apart, so
+    the latest rows are always a contiguous view. A row of a convolution over time only (kernel width 1, as in
+    the CNN model) is computed as a single matrix product.
+    """
+    _conv_layers: List[Dict]
+    _row_kernels: List[Optional[np.ndarray]]
+    _head_layers: List[Dict]
+    _rows: List[np.ndarray]
+    _capacity: List[int]
+    _next_row: List[int]
+    _num_rows: List[int]
+
+    def __init__(self,
+                 model_file: str):
+        """
+        :param model_file: The .npz file the CNN model was exported to, see NumpyInferenceBackend.export
+        """
+        super().__init__(model_file=model_file)
+        if len(self._input_shape) != 3:
+            raise ValueError("Expected input shape of (window, features, channels) but got [{}]"
+                             .format(self._input_shape))
+        # The convolutions (and any dropout between them, which does nothing at inference) are streamed.
+        num_streamed = 0
+        while num_streamed < len(self._layers) and self._layers[num_streamed]['type'] in ['Conv2D', 'Dropout']:
+            num_streamed += 1
+        self._conv_layers = [layer for layer in self._layers[:num_streamed] if layer['type'] == 'Conv2D']
+        self._head_layers = self._layers[num_streamed:]
+        if len(self._conv_layers) == 0:
+            raise ValueError("Streaming needs a model that starts with a convolution")
+
+        window_size, width, channels = self._input_shape
+        self._capacity = list()
+        self._rows = list()
+        self._row_kernels = list()
+        for layer in self._conv_layers:
+            kernel_height, kernel_width, in_channels, out_channels = layer['kernel'].shape
+            self._row_kernels.append(layer['kernel'].reshape(kernel_height * in_channels, out_channels)
+                                     if kernel_width == 1 else None)
+            # The input rows of a convolution are only kept for as long as the convolution needs them.
+            self._capacity.append(kernel_height)
+            self._rows.append(np.zeros((2 * kernel_height, width, channels), dtype=np.float32))
+            window_size, width, channels = window_size - kernel_height + 1, width - kernel_width + 1, out_channels
+        # All the output rows of the last convolution over the window are needed for the head.
+        self._capacity.append(window_size)
+        self._rows.append(np.zeros((2 * window_size, width, channels), dtype=np.float32))
+        self._next_row = [0] * len(self._rows)
+        self._num_rows = [0] * len(self._rows)
+        return
+
+    @property
+    def name(self) -> str:
+        return 'numpy-streaming'
+
+    @property
+    def window_size(self) -> int:
+        return self._input_shape[0]
+
+    def reset(self) -> None:
+        self._next_row = [0] * len(self._rows)
+        self._num_rows = [0] * len(self._rows)
+        return
+
+    def _write(self,
+               layer: int,
+               row: np.ndarray) -> None:
+        """
+        Add the latest row to the ring buffer of a layer, in both of its rows.
+        :param layer: The index of the ring buffer, 0 is the input
+        :param row: The row as (width, channels)
+        """
+        self._rows[layer][self._next_row[layer]::self._capacity[layer]] = row
+        self._next_row[layer] = (self._next_row[layer] + 1) % self._capacity[layer]
+        self._num_rows[layer] = min(self._num_rows[layer] + 1, self._capacity[layer])
+        return
+
+    def _latest(self,
+                layer: int) -> np.ndarray:
+        """
+        :param layer: The index of the ring buffer, 0 is the input
+        :return: View of the latest rows of the layer, oldest first, with a leading batch dimension of 1
+        """
+        return self._rows[layer][np.newaxis, self._next_row[layer]:self._next_row[layer] + self._capacity[layer]]
+
+    def _conv_row(self,
+                  i: int) -> np.ndarray:
+        """
+        Compute the latest output row of a convolution from its latest input rows.
+        :param i: The index of the convolution
+        :return: The row as (width, channels)
+        """
+        layer = self._conv_layers[i]
+        if self._row_kernels[i] is None:
+            return self._apply(layer, self._latest(i))[0, 0]
+        # (kernel height, width, in channels) -> (width, kernel height x in channels) to match the kernel matrix
+        patch = self._latest(i)[0].transpose(1, 0, 2).reshape(self._rows[i].shape[1], -1)
+        row = patch @ self._row_kernels[i]
+        if 'bias' in layer:
+            row += layer['bias']
+        return self._ACTIVATIONS[layer['activation']](row)
+
+    def push(self,
+             sample: np.ndarray) -> None:
+        self._write(0, sample.reshape(self._rows[0].shape[1:]))
+        for i in range(len(self._conv_layers)):
+            if self._num_rows[i] < self._capacity[i]:
+                break  # Not enough rows yet to compute a row of this convolution
+            self._write(i + 1, self._conv_row(i))
+        return
+
+    def predict_latest(self) -> np.ndarray:
+        if self._num_rows[-1] < self._capacity[-1]:
+            raise RuntimeError("[{}] samples must be pushed before predicting".format(self.window_size))
+        x = self._latest(len(self._rows) - 1)
+        for layer in self._head_layers:
+            x = self._apply(layer, x)
+        return x[0]
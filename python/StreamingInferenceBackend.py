@@ -0,0 +1,45 @@
+from abc import abstractmethod
+import numpy as np
+from InferenceBackend import InferenceBackend
+
+
+class StreamingInferenceBackend(InferenceBackend):
+    """
+    Predict the class probabilities of the window that ends at the latest sample of a stream of samples.
+
+    State is carried from sample to sample, so each new sample only costs the work that depends on it rather
+    than a forward pass over the whole window. Each stream of samples needs its own instance. Whole windows can
+    still be predicted as for any other backend.
+    """
+
+    @property
+    @abstractmethod
+    def window_size(self) -> int:
+        """
+        :return: The number of samples in the window the model predicts from
+        """
+        pass
+
+    @abstractmethod
+    def reset(self) -> None:
+        """
+        Forget all samples, ready for a new stream.
+        """
+        pass
+
+    @abstractmethod
+    def push(self,
+             sample: np.ndarray) -> None:
+        """
+        Add the latest sample of the stream.
+        :param sample: The features of the sample as (num features,)
+        """
+        pass
+
+    @abstractmethod
+    def predict_latest(self) -> np.ndarray:
+        """
+        Predict the window made up of the latest window size samples pushed.
+        :return: The probability of each class as (num classes,)
+        """
+        pass
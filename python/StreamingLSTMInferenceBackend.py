@@ -0,0 +1,94 @@
+from typing import Dict, List
+import numpy as np
+from NumpyInferenceBackend import NumpyInferenceBackend
+from StreamingInferenceBackend import StreamingInferenceBackend
+
+
+class StreamingLSTMInferenceBackend(NumpyInferenceBackend, StreamingInferenceBackend):
+    """
+    Run the exported LSTM model on a stream of samples, carrying the hidden and cell state from sample to
+    sample so each new sample costs one LSTM time step rather than a pass over the whole window.
+
+    The model is trained on whole windows, each run from zero state, so the carried state only matches the
+    state of the latest window until it has seen more samples than the window holds. After that it also holds
+    (fading) memory of samples from before the window, so the state is re-synchronised by running the latest
+    window from zero state every resync interval samples. A resync interval of 0 re-synchronises on every
+    sample, which is the same as predicting the whole window; larger intervals cost fewer time steps per sample
+    but let the predictions drift further from those of the whole window in between.
+
+    The latest window of samples is held in a ring buffer where each sample is written twice, window length
+    rows apart, so the window to re-synchronise from is always a contiguous view.
+    """
+    _lstm_layer: Dict
+    _head_layers: List[Dict]
+    _resync_interval: int
+    _samples: np.ndarray
+    _next_sample: int
+    _num_samples: int
+    _steps_since_resync: int
+    _h: np.ndarray
+    _c: np.ndarray
+
+    def __init__(self,
+                 model_file: str,
+                 resync_interval: int = 5):
+        """
+        :param model_file: The .npz file the LSTM model was exported to, see NumpyInferenceBackend.export
+        :param resync_interval: The most samples the state is carried past a full window before it is re-computed
+                                from the latest window alone, 0 to re-compute on every sample
+        """
+        super().__init__(model_file=model_file)
+        if resync_interval < 0:
+            raise ValueError("Resync interval must not be negative but was [{}]".format(resync_interval))
+        if len(self._input_shape) != 2:
+            raise ValueError("Expected input shape of (window, features) but got [{}]".format(self._input_shape))
+        if self._layers[0]['type'] != 'LSTM':
+            raise ValueError("Streaming needs a model that starts with an LSTM")
+        self._lstm_layer = self._layers[0]
+        self._head_layers = self._layers[1:]
+        self._resync_interval = resync_interval
+        self._samples = np.zeros(tuple((2 * self.window_size, self._input_shape[1])), dtype=np.float32)
+        self.reset()
+        return
+
+    @property
+    def name(self) -> str:
+        return 'numpy-streaming'
+
+    @property
+    def window_size(self) -> int:
+        return self._input_shape[0]
+
+    def reset(self) -> None:
+        units = self._lstm_layer['recurrent_kernel'].shape[0]
+        self._next_sample = 0
+        self._num_samples = 0
+        self._steps_since_resync = 0
+        self._h = np.zeros((1, units), dtype=np.float32)
+        self._c = np.zeros((1, units), dtype=np.float32)
+        return
+
+    def push(self,
+             sample: np.ndarray) -> None:
+        sample = sample.reshape(self._samples.shape[1:])
+        self._samples[self._next_sample::self.window_size] = sample
+        self._next_sample = (self._next_sample + 1) % self.window_size
+        self._num_samples = min(self._num_samples + 1, self.window_size + 1)
+        # Until the window is full the state from zero is exactly that of the window so far.
+        past_window = self._num_samples > self.window_size
+        if past_window and self._steps_since_resync >= self._resync_interval:
+            latest = self._samples[np.newaxis, self._next_sample:self._next_sample + self.window_size]
+            self._h, self._c = self._lstm(self._lstm_layer, latest)
+            self._steps_since_resync = 0
+        else:
+            self._h, self._c = self._lstm_step(self._lstm_layer, sample @ self._lstm_layer['kernel'], self._h, self._c)
+            self._steps_since_resync += 1 if past_window else 0
+        return
+
+    def predict_latest(self) -> np.ndarray:
+        if self._num_samples < self.window_size:
+            raise RuntimeError("[{}] samples must be pushed before predicting".format(self.window_size))
+        x = self._h
+        for layer in self._head_layers:
+            x = self._apply(layer, x)
+        return x[0]
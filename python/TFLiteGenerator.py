@@ -1,20 +1,28 @@
+from typing import Tuple, Iterator, List
 from os import remove
 from os.path import join, exists
+import numpy as np
 import tensorflow as tf
 
 
 class TFLiteGenerator:
     GUARD_PREF: str = 'ACTIVITY_PREDICTOR_'
-    OPTIMIZE: bool = False
 
     @staticmethod
     def generate_tflite_files(file_path: str,
-                              model_to_export: tf.keras.Model) -> None:
+                              model_to_export: tf.keras.Model,
+                              input_shape: Tuple = None,
+                              quantization: str = 'none',
+                              representative_data: np.ndarray = None) -> bytes:
         """
         Generate and save both the .h and .cpp file that are needed to import the model in exported form
         on the TF Lite interpreter running on the micro controller.
         :param file_path: An existing path where the files are to be generated.
         :param model_to_export: the built, complied and trained model to export in TF Lite form
+        :param input_shape: Optional fixed input shape (including batch) to convert with, see model_binary_form
+        :param quantization: The quantization to convert with, see model_binary_form
+        :param representative_data: The windows to calibrate int8 quantization with, see model_binary_form
+        :return: the exported model in tf lite binary form
         """
 
         # Model name will be used to be the cpp vra name and the file names so we need no spaces.
@@ -24,7 +32,10 @@ class TFLiteGenerator:
         cpp_file_name = model_name + '.cpp'
 
         # Convert teh model to binary form.
-        hex_data = TFLiteGenerator._model_binary_form(model=model_to_export)
+        hex_data = TFLiteGenerator.model_binary_form(model=model_to_export,
+                                                     input_shape=input_shape,
+                                                     quantization=quantization,
+                                                     representative_data=representative_data)
 
         # Generate .h and .cpp based on the generated binary form and the model name
         h_as_str = TFLiteGenerator._generate_h_file(model_name=model_name)
@@ -43,26 +54,63 @@ class TFLiteGenerator:
             f.write(file_as_str)
             f.close()
 
-        return
+        return hex_data
 
     @staticmethod
-    def _model_binary_form(model: tf.keras.Model):
+    def model_binary_form(model: tf.keras.Model,
+                          input_shape: Tuple = None,
+                          quantization: str = 'none',
+                          representative_data: np.ndarray = None):
         """
         Convert the given built, compiled and trained model to TF Lite binary form
+
+        The model can be post training quantized to make it smaller and faster on the micro controller
+        https://www.tensorflow.org/lite/performance/post_training_quantization
+            none    : float32 weights and compute
+            dynamic : int8 weights, float32 input, output and compute
+            float16 : float16 weights, float32 input, output and compute
+            int8    : int8 weights, compute, input and output, calibrated on the representative data
         :param model: The model to convert
+        :param input_shape: Optional fixed input shape, including the batch dimension, to convert the model
+                            with. Recurrent (LSTM) models need a fixed shape to be converted.
+        :param quantization: The quantization to convert with, one of none, dynamic, float16 or int8
+        :param representative_data: Windows, in the model input shape with a leading batch dimension, that are
+                                    typical of the data the model is run on, to calibrate the int8 ranges with.
         :return: the model in tf lite binary form
         """
-        conv = tf.lite.TFLiteConverter.from_keras_model(model)
-        if TFLiteGenerator.OPTIMIZE:
-            # It is possible to optimize the converted network for size. However, depending on the chosen
-            # network architecture that can require additional tuning to the optimization process. For
-            # the networks in this example and the space capabilities of the Nano 33 Sense optimization
-            # is not essential. See below for additional help on optimization.
-            # https://www.tensorflow.org/lite/microcontrollers/get_started_low_level#train_a_model
-            # https://www.tensorflow.org/lite/performance/post_training_quantization
-            conv.optimizations = [tf.lite.Optimize.OPTIMIZE_FOR_SIZE]  # reduces size of converted form.
+        if input_shape is None:
+            conv = tf.lite.TFLiteConverter.from_keras_model(model)
+        else:
+            function = tf.function(lambda x: model(x, training=False))
+            concrete_function = function.get_concrete_function(tf.TensorSpec(input_shape, model.inputs[0].dtype))
+            conv = tf.lite.TFLiteConverter.from_concrete_functions([concrete_function])
+        if quantization == 'dynamic':
+            conv.optimizations = [tf.lite.Optimize.DEFAULT]
+        elif quantization == 'float16':
+            conv.optimizations = [tf.lite.Optimize.DEFAULT]
+            conv.target_spec.supported_types = [tf.float16]
+        elif quantization == 'int8':
+            if representative_data is None or len(representative_data) == 0:
+                raise ValueError("Representative data is needed to calibrate int8 quantization")
+            conv.optimizations = [tf.lite.Optimize.DEFAULT]
+            conv.representative_dataset = lambda: TFLiteGenerator._representative_dataset(representative_data)
+            conv.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            conv.inference_input_type = tf.int8
+            conv.inference_output_type = tf.int8
+        elif quantization != 'none':
+            raise ValueError("[{}] is not a valid quantization".format(quantization))
         return conv.convert()
 
+    @staticmethod
+    def _representative_dataset(representative_data: np.ndarray) -> Iterator[List[np.ndarray]]:
+        """
+        Feed the representative windows to the converter one at a time, as the converter expects.
+        :param representative_data: The windows as (batch, *model input shape)
+        :return: Generator of single window model inputs
+        """
+        for i in range(len(representative_data)):
+            yield [representative_data[i:i + 1].astype(np.float32)]
+
     @staticmethod
     def _generate_h_file(model_name: str) -> str:
         """
@@ -0,0 +1,101 @@
+from typing import Callable, Tuple
+import numpy as np
+import tensorflow as tf
+from InferenceBackend import InferenceBackend
+
+
+class TFLiteInferenceBackend(InferenceBackend):
+    """
+    Run the exported TF Lite form of the model in the TF Lite interpreter, i.e. the same flatbuffer that is run
+    on the Arduino, so predictions on the host match those on the device.
+
+    The input and output tensors are allocated once and windows are written straight into the input tensor
+    of the interpreter. Batches are run as a single invocation, the tensors are only re-allocated when the
+    batch size changes. Models converted with a fixed batch size (e.g. LSTM) run a batch one window at a time.
+    Quantised (integer input and output) models are quantised and de-quantised here so windows are always
+    passed in and probabilities are always returned as float.
+    """
+    _interpreter: tf.lite.Interpreter
+    _input_index: int
+    _output_index: int
+    _window_shape: Tuple
+    _input_dtype: np.dtype
+    _input_quantization: Tuple[float, int]
+    _output_quantization: Tuple[float, int]
+    _batch_size: int
+    _fixed_batch: bool
+    _input: Callable
+    _output: Callable
+
+    def __init__(self,
+                 model_content: bytes,
+                 num_threads: int = None):
+        """
+        :param model_content: The TF Lite flatbuffer of the model
+        :param num_threads: The number of threads the interpreter runs with, None for the interpreter default
+        """
+        self._interpreter = tf.lite.Interpreter(model_content=model_content, num_threads=num_threads)
+        input_details = self._interpreter.get_input_details()[0]
+        output_details = self._interpreter.get_output_details()[0]
+        self._input_index = input_details['index']
+        self._output_index = output_details['index']
+        self._window_shape = tuple(input_details['shape'][1:])
+        self._input_dtype = np.dtype(input_details['dtype'])
+        self._input_quantization = input_details['quantization']
+        self._output_quantization = output_details['quantization']
+        self._fixed_batch = input_details.get('shape_signature', input_details['shape'])[0] != -1
+        self._batch_size = 0
+        self._input = None  # noqa
+        self._output = None  # noqa
+        self._allocate(1)
+        return
+
+    @property
+    def name(self) -> str:
+        return 'tflite'
+
+    def _allocate(self,
+                  batch_size: int) -> None:
+        """
+        Allocate the input and output tensors for the given batch size, if not already allocated for it.
+        :param batch_size: The number of windows in the batch
+        """
+        if batch_size != self._batch_size:
+            self._interpreter.resize_tensor_input(self._input_index, [batch_size, *self._window_shape])
+            self._interpreter.allocate_tensors()
+            self._batch_size = batch_size
+            # These return views on the tensors of the interpreter, they must not be held over an invoke.
+            self._input = self._interpreter.tensor(self._input_index)
+            self._output = self._interpreter.tensor(self._output_index)
+        return
+
+    def _invoke(self,
+                windows: np.ndarray) -> np.ndarray:
+        """
+        Write the windows into the input tensor, run the model and read the probabilities.
+        :param windows: The windows as (batch, *model input shape)
+        :return: The probability of each class as (batch, num classes)
+        """
+        self._allocate(len(windows))
+        windows = windows.reshape(tuple((-1, *self._window_shape)))
+        if np.issubdtype(self._input_dtype, np.integer):
+            scale, zero_point = self._input_quantization
+            limits = np.iinfo(self._input_dtype)
+            windows = np.clip(np.round(windows / scale + zero_point), limits.min, limits.max)
+        self._input()[...] = windows
+        self._interpreter.invoke()
+        probabilities = self._output()
+        if np.issubdtype(probabilities.dtype, np.integer):
+            scale, zero_point = self._output_quantization
+            return (probabilities.astype(np.float32) - zero_point) * scale
+        return probabilities.copy()
+
+    def predict_window(self,
+                       window: np.ndarray) -> np.ndarray:
+        return self._invoke(window)[0]
+
+    def predict_batch(self,
+                      windows: np.ndarray) -> np.ndarray:
+        if self._fixed_batch:
+            return np.concatenate([self._invoke(windows[i:i + 1]) for i in range(len(windows))])
+        return self._invoke(windows)
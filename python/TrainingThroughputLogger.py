@@ -0,0 +1,86 @@
+import json
+import time
+from typing import Dict
+import tensorflow as tf
+
+
+class TrainingThroughputLogger(tf.keras.callbacks.Callback):
+    """
+    Keras callback that records the wall time, throughput and input pipeline stall time of every training epoch.
+
+    Each epoch is written as a single JSON line to the log file so runs can be compared by machine. The stall
+    time is the time spent outside of the training steps themselves, i.e. the time from the start of the epoch
+    to the first step plus the gaps between steps. This is the time the training loop was waiting on the next
+    batch of input (plus a small fixed Keras overhead per step).
+    """
+    _log_file: str
+    _num_samples: int
+    _append: bool
+    _epoch_start: float
+    _batch_end: float
+    _stall_time: float
+    _num_steps: int
+
+    def __init__(self,
+                 log_file: str,
+                 num_samples: int,
+                 append: bool = False):
+        """
+        :param log_file: The file to append the per epoch JSON lines to
+        :param num_samples: The number of training samples in one epoch
+        :param append: If True add to the existing log, e.g. when resuming training, rather than start a new log
+        """
+        super().__init__()
+        self._log_file = log_file
+        self._num_samples = num_samples
+        self._append = append
+        self._epoch_start = 0.0
+        self._batch_end = 0.0
+        self._stall_time = 0.0
+        self._num_steps = 0
+        return
+
+    def on_train_begin(self,
+                       logs: Dict = None) -> None:
+        if not self._append:
+            open(self._log_file, 'w').close()  # Start a new log for every training run
+        return
+
+    def on_epoch_begin(self,
+                       epoch: int,
+                       logs: Dict = None) -> None:
+        self._epoch_start = time.perf_counter()
+        self._batch_end = self._epoch_start
+        self._stall_time = 0.0
+        self._num_steps = 0
+        return
+
+    def on_train_batch_begin(self,
+                             batch: int,
+                             logs: Dict = None) -> None:
+        self._stall_time += time.perf_counter() - self._batch_end
+        return
+
+    def on_train_batch_end(self,
+                           batch: int,
+                           logs: Dict = None) -> None:
+        self._batch_end = time.perf_counter()
+        self._num_steps += 1
+        return
+
+    def on_epoch_end(self,
+                     epoch: int,
+                     logs: Dict = None) -> None:
+        wall_time = time.perf_counter() - self._epoch_start  # Includes validation
+        train_time = self._batch_end - self._epoch_start
+        record = {'epoch': epoch + 1,
+                  'wall_time_s': wall_time,
+                  'train_time_s': train_time,
+                  'steps': self._num_steps,
+                  'samples_per_s': self._num_samples / train_time if train_time > 0 else 0.0,
+                  'input_stall_s': self._stall_time}
+        for k, v in (logs or {}).items():
+            record[k] = float(v)
+        with open(self._log_file, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        return
@@ -0,0 +1,130 @@
+from typing import Optional
+import numpy as np
+
+
+class WindowAugmenter:
+    """
+    Randomly augment whole batches of accelerometer look back windows as they are fed to training.
+
+    Each window in a batch gets its own random time warp, 3D rotation, per axis gain and offset and jitter
+    noise, so every epoch sees a different variation of the same recordings without any augmented copies
+    being stored. All of the augmentations are applied to the batch at once with array maths, so the cost
+    is a few small array operations per batch.
+
+    Windows are augmented as (batch, look back window size, features) with features being the x,y,z
+    accelerometer axes.
+    """
+    _rotation: float
+    _gain: float
+    _offset: float
+    _jitter: float
+    _time_warp: float
+    _rng: np.random.Generator
+
+    NUM_TIME_WARP_KNOTS = 4
+
+    def __init__(self,
+                 rotation_degrees: float = 0.0,
+                 gain: float = 0.0,
+                 offset: float = 0.0,
+                 jitter: float = 0.0,
+                 time_warp: float = 0.0,
+                 seed: int = None):
+        """
+        Each augmentation is off when its setting is 0.
+        :param rotation_degrees: The maximum angle to rotate each window by, about a random axis
+        :param gain: The maximum fraction each axis is scaled up or down by e.g. 0.1 for 0.9 to 1.1
+        :param offset: The maximum offset added to each axis, in the units of the data (g)
+        :param jitter: The standard deviation of the noise added to every reading, in the units of the data (g)
+        :param time_warp: The maximum fraction the speed of the window is locally sped up or slowed down by
+        :param seed: Optional seed for the random augmentations
+        """
+        self._rotation = float(np.deg2rad(rotation_degrees))
+        self._gain = float(gain)
+        self._offset = float(offset)
+        self._jitter = float(jitter)
+        self._time_warp = float(time_warp)
+        self._rng = np.random.default_rng(seed)
+        return
+
+    @staticmethod
+    def from_conf(augmentation_conf: dict,
+                  seed: int = None) -> Optional['WindowAugmenter']:
+        """
+        Create the augmenter from the augmentation section of a model config.
+        :param augmentation_conf: The augmentation settings of the model
+        :param seed: Optional seed for the random augmentations
+        :return: The augmenter, or None if augmentation is not enabled for the model
+        """
+        if not augmentation_conf.get('enabled', False):
+            return None
+        return WindowAugmenter(rotation_degrees=augmentation_conf.get('rotation_degrees', 0.0),
+                               gain=augmentation_conf.get('gain', 0.0),
+                               offset=augmentation_conf.get('offset', 0.0),
+                               jitter=augmentation_conf.get('jitter', 0.0),
+                               time_warp=augmentation_conf.get('time_warp', 0.0),
+                               seed=seed)
+
+    def augment(self,
+                x: np.ndarray) -> np.ndarray:
+        """
+        Augment a batch of windows.
+        :param x: The batch of windows as (batch, look back window size, features)
+        :return: The augmented batch, as a new array of the same shape and dtype
+        """
+        batch_size, window_size, num_features = x.shape
+        augmented = x.astype(np.float32)
+        if self._time_warp > 0 and window_size > 1:
+            augmented = self._warp_time(augmented)
+        if self._rotation > 0:
+            if num_features != 3:
+                raise ValueError("Rotation needs x,y,z features but windows have [{}] features".format(num_features))
+            augmented = augmented @ np.transpose(self._rotations(batch_size), (0, 2, 1))
+        if self._gain > 0:
+            augmented *= self._rng.uniform(1.0 - self._gain, 1.0 + self._gain, (batch_size, 1, num_features))
+        if self._offset > 0:
+            augmented += self._rng.uniform(-self._offset, self._offset, (batch_size, 1, num_features))
+        if self._jitter > 0:
+            augmented += self._jitter * self._rng.standard_normal(augmented.shape, dtype=np.float32)
+        return augmented.astype(x.dtype, copy=False)
+
+    def _rotations(self,
+                   batch_size: int) -> np.ndarray:
+        """
+        A random rotation matrix for each window, about a random axis by up to the maximum rotation angle.
+        :param batch_size: The number of rotations to create
+        :return: The rotation matrices as (batch, 3, 3)
+        """
+        axis = self._rng.normal(size=(batch_size, 3))
+        axis /= np.linalg.norm(axis, axis=-1, keepdims=True)
+        angle = self._rng.uniform(-self._rotation, self._rotation, (batch_size, 1, 1))
+        # Rodrigues' formula R = I + sin(a)K + (1 - cos(a))K^2, where K is the cross product matrix of the axis
+        k = np.zeros((batch_size, 3, 3))
+        k[:, 0, 1], k[:, 0, 2], k[:, 1, 2] = -axis[:, 2], axis[:, 1], -axis[:, 0]
+        k -= np.transpose(k, (0, 2, 1))
+        rotations = np.eye(3) + np.sin(angle) * k + (1.0 - np.cos(angle)) * (k @ k)
+        return rotations.astype(np.float32)
+
+    def _warp_time(self,
+                   x: np.ndarray) -> np.ndarray:
+        """
+        Re-sample each window along a smooth random time line that speeds up and slows down within the window
+        while still starting and ending at the same readings.
+        :param x: The batch of windows as (batch, look back window size, features)
+        :return: The time warped batch
+        """
+        batch_size, window_size, _ = x.shape
+        knots = self._rng.uniform(1.0 - self._time_warp, 1.0 + self._time_warp,
+                                  (batch_size, self.NUM_TIME_WARP_KNOTS))
+        # Interpolate the speed at each knot over the window and integrate it to get the warped time line.
+        position = np.linspace(0, self.NUM_TIME_WARP_KNOTS - 1, window_size)
+        k0 = np.minimum(position.astype(np.int64), self.NUM_TIME_WARP_KNOTS - 2)
+        speed = knots[:, k0] + (knots[:, k0 + 1] - knots[:, k0]) * (position - k0)
+        t = np.cumsum(speed, axis=-1) - speed[:, :1]
+        t *= (window_size - 1) / t[:, -1:]
+
+        t0 = np.minimum(t.astype(np.int64), window_size - 2)[..., np.newaxis]
+        fraction = (t[..., np.newaxis] - t0).astype(np.float32)
+        x0 = np.take_along_axis(x, t0, axis=1)
+        x1 = np.take_along_axis(x, t0 + 1, axis=1)
+        return x0 + (x1 - x0) * fraction
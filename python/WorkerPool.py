@@ -0,0 +1,109 @@
+import tempfile
+import multiprocessing
+from typing import Callable, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from os import environ, makedirs
+from os.path import join
+from shutil import rmtree
+from Conf import Conf
+from ExecutionProfile import ExecutionProfile
+from RecordingStore import RecordingStore
+
+
+class WorkerPool:
+    """
+    Run jobs that each train a model (e.g. the trials of a sweep or the folds of a cross validation) in parallel
+    worker processes, each with its TensorFlow threads pinned.
+
+    The training data (the same csv files and recording stores ActivityModel loads) is parsed once and merged
+    into a single recording store in a temporary work path that every job memory maps, so all the jobs share
+    the one copy of the data held in the OS page cache. If the data path already holds just a single recording
+    store then the jobs map that as is. Each job is given the data path, the work path (to write its checkpoints
+    under) and the threads it is pinned to. The work path is deleted once all the jobs are done.
+    """
+    _conf: Conf
+    _data_file_path: str
+    _num_workers: int
+    _threads_per_worker: int
+    _name: str
+
+    def __init__(self,
+                 conf: Conf,
+                 data_file_path: str,
+                 num_workers: int,
+                 threads_per_worker: int,
+                 name: str):
+        """
+        :param conf: The config with the classes and sample interval of the recordings
+        :param data_file_path: The path of the csv recordings and recording stores to train on
+        :param num_workers: The number of jobs to run in parallel
+        :param threads_per_worker: The number of threads each job is pinned to
+        :param name: The name of the pool, used to name the temporary work path
+        """
+        self._conf = conf
+        self._data_file_path = data_file_path
+        self._num_workers = num_workers
+        self._threads_per_worker = threads_per_worker
+        self._name = name
+        return
+
+    def _shared_data_path(self,
+                          work_path: str) -> str:
+        """
+        Merge the training data into a single recording store for the jobs to share, unless it is one already.
+        :param work_path: The temporary work path to write the merged store under
+        :return: The data path for the jobs to load the training data from
+        """
+        class_names = [cls['class_name'] for cls in self._conf.config['classes']]
+        data_files, _ = RecordingStore.find_csv_files(data_path=self._data_file_path, class_names=class_names)
+        if len(data_files) == 0 and len(RecordingStore.find_store_files(self._data_file_path)) == 1:
+            return self._data_file_path
+
+        data_path = join(work_path, 'data')
+        makedirs(data_path)
+        RecordingStore.merge_data_files(data_path=self._data_file_path,
+                                        store_file=join(data_path, 'corpus' + RecordingStore.FILE_EXTENSION),
+                                        class_names=class_names,
+                                        sample_interval=int(self._conf.config['ble_collector']['sample_interval']))
+        return data_path
+
+    @staticmethod
+    def execution_profile(conf: Conf,
+                          job: Dict) -> ExecutionProfile:
+        """
+        The execution profile of a job, to be used in the worker process before any TensorFlow work is done.
+        :param conf: The config with the execution settings
+        :param job: The job as passed to the worker
+        :return: The execution profile with the TensorFlow threads pinned to those of the job
+        """
+        return ExecutionProfile.from_conf(conf=conf, intra_op_threads=job['threads'], inter_op_threads=1)
+
+    def map(self,
+            worker: Callable[[Dict], Dict],
+            jobs: List[Dict]) -> List[Dict]:
+        """
+        Run every job in a worker process.
+        :param worker: The function to run each job, must be picklable e.g. a static method
+        :param jobs: The settings of each job, the data path, work path and threads are added to each
+        :return: The result of each job in the order of the jobs
+        """
+        work_path = tempfile.mkdtemp(prefix='activity-{}-'.format(self._name))
+        omp_num_threads = environ.get('OMP_NUM_THREADS')
+        try:
+            data_path = self._shared_data_path(work_path)
+            jobs = [dict(job, data_path=data_path, work_path=work_path, threads=self._threads_per_worker)
+                    for job in jobs]
+            # Bound the native thread pools (e.g. OpenMP) of each worker as well as the TensorFlow pools. The
+            # workers take a copy of the environment as they are spawned, which is before map returns, so the
+            # setting can be restored for this process once the jobs are done.
+            environ['OMP_NUM_THREADS'] = str(self._threads_per_worker)
+            with ProcessPoolExecutor(max_workers=self._num_workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = list(pool.map(worker, jobs))
+        finally:
+            if omp_num_threads is None:
+                environ.pop('OMP_NUM_THREADS', None)
+            else:
+                environ['OMP_NUM_THREADS'] = omp_num_threads
+            rmtree(work_path, ignore_errors=True)
+        return results
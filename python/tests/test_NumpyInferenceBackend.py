@@ -0,0 +1,64 @@
+import sys
+import tempfile
+import unittest
+from os.path import abspath, dirname, join
+import numpy as np
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from ActivityModel import ActivityModel  # noqa: E402
+from Conf import Conf  # noqa: E402
+from NumpyInferenceBackend import NumpyInferenceBackend  # noqa: E402
+
+
+class TestNumpyInferenceBackend(unittest.TestCase):
+    """
+    Check the numpy forward pass of each model type gives the same class probabilities as Keras.
+
+    The models are given random weights (biases included), rather than trained, so the check needs no
+    training data or checkpoints and covers every weight of every layer.
+    """
+    NUM_WINDOWS = 64
+    TOLERANCE = ActivityModel.NUMPY_PARITY_TOLERANCE
+
+    def _assert_parity(self,
+                       model_type: str) -> None:
+        """
+        Export a model with random weights and compare numpy to Keras on random windows.
+        :param model_type: The model type, one of ModelType.model_options
+        """
+        python_path = dirname(dirname(abspath(__file__)))
+        rng = np.random.default_rng(seed=1)
+        with tempfile.TemporaryDirectory() as checkpoint_path:
+            activity_model = ActivityModel(conf=Conf(join(python_path, 'conf.json')),
+                                           data_file_path=join(python_path, 'data'),
+                                           checkpoint_filepath=checkpoint_path,
+                                           export_filepath='',
+                                           model_type=ActivityModel.ModelType.str2modeltype(model_type),
+                                           plot_training=False)
+            model, shape = activity_model.create_model(activity_model.ModelType.str2modeltype(model_type))
+            model.set_weights([rng.normal(scale=0.5, size=w.shape).astype(np.float32) for w in model.get_weights()])
+            windows = rng.normal(size=tuple((self.NUM_WINDOWS, *shape))).astype(np.float32)
+
+            model_file = join(checkpoint_path, 'activity-model-{}.npz'.format(model_type))
+            NumpyInferenceBackend.export(model=model, model_file=model_file)
+            backend = NumpyInferenceBackend(model_file=model_file)
+
+            keras_probabilities = np.asarray(model.predict_on_batch(windows), dtype=np.float32)
+            np.testing.assert_allclose(backend.predict_batch(windows), keras_probabilities, atol=self.TOLERANCE)
+            np.testing.assert_allclose(backend.predict_window(windows[:1]), keras_probabilities[0],
+                                       atol=self.TOLERANCE)
+        return
+
+    def test_cnn_parity(self):
+        self._assert_parity('cnn')
+
+    def test_lstm_parity(self):
+        self._assert_parity('lstm')
+
+    def test_simple_parity(self):
+        self._assert_parity('simple')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import sys
+import tempfile
+import unittest
+from typing import Dict
+from os import environ
+from os.path import abspath, dirname, join
+import numpy as np
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from Conf import Conf  # noqa: E402
+from RecordingStore import RecordingStore  # noqa: E402
+from WorkerPool import WorkerPool  # noqa: E402
+
+
+def _read_shared_data(job: Dict) -> Dict:
+    """
+    A worker that reports the recordings it is given to train on.
+    :param job: The job as passed to the worker
+    :return: The data path, along with the class and number of rows of every recording in it and the OpenMP threads
+    """
+    recordings = list()
+    for store_file in RecordingStore.find_store_files(job['data_path']):
+        recordings.extend([tuple((r.class_name, r.num_rows)) for r in RecordingStore(store_file).recordings])
+    return {'data_path': job['data_path'], 'recordings': recordings, 'omp_num_threads': environ['OMP_NUM_THREADS']}
+
+
+class TestWorkerPool(unittest.TestCase):
+    """
+    Check the jobs of a worker pool share the same recordings that ActivityModel would load from the data path,
+    when that path holds recording stores (.rec) rather than csv files.
+    """
+    SAMPLE_INTERVAL = 200
+
+    @staticmethod
+    def _conf() -> Conf:
+        return Conf(join(dirname(dirname(abspath(__file__))), 'conf.json'))
+
+    def _write_store(self,
+                     store_file: str,
+                     recordings: Dict[str, int]) -> None:
+        """
+        :param store_file: The recording store to write
+        :param recordings: The number of rows of the recording of each class to write
+        """
+        rng = np.random.default_rng(seed=1)
+        RecordingStore.write(store_file=store_file,
+                             recordings=[rng.normal(size=(num_rows, 3)) for num_rows in recordings.values()],
+                             class_names=list(recordings.keys()),
+                             sample_interval=self.SAMPLE_INTERVAL)
+        return
+
+    def test_single_store_is_used_as_is(self):
+        with tempfile.TemporaryDirectory() as data_path:
+            self._write_store(join(data_path, 'corpus' + RecordingStore.FILE_EXTENSION),
+                              {'circle': 30, 'stationary': 40})
+            pool = WorkerPool(conf=self._conf(), data_file_path=data_path, num_workers=2, threads_per_worker=1,
+                              name='test')
+            results = pool.map(_read_shared_data, [{'job': i} for i in range(2)])
+        for result in results:
+            self.assertEqual(data_path, result['data_path'])
+            self.assertEqual([('circle', 30), ('stationary', 40)], result['recordings'])
+        return
+
+    def test_stores_are_merged(self):
+        with tempfile.TemporaryDirectory() as data_path:
+            self._write_store(join(data_path, 'a' + RecordingStore.FILE_EXTENSION), {'circle': 30, 'unknown': 10})
+            self._write_store(join(data_path, 'b' + RecordingStore.FILE_EXTENSION), {'up-down': 50})
+            pool = WorkerPool(conf=self._conf(), data_file_path=data_path, num_workers=2, threads_per_worker=1,
+                              name='test')
+            results = pool.map(_read_shared_data, [{'job': i} for i in range(2)])
+        for result in results:
+            self.assertNotEqual(data_path, result['data_path'])
+            self.assertEqual([('circle', 30), ('up-down', 50)], result['recordings'])
+        return
+
+    def test_omp_threads_only_set_in_workers(self):
+        omp_num_threads = environ.get('OMP_NUM_THREADS')
+        environ['OMP_NUM_THREADS'] = '7'
+        try:
+            with tempfile.TemporaryDirectory() as data_path:
+                self._write_store(join(data_path, 'corpus' + RecordingStore.FILE_EXTENSION), {'circle': 30})
+                pool = WorkerPool(conf=self._conf(), data_file_path=data_path, num_workers=2, threads_per_worker=3,
+                                  name='test')
+                results = pool.map(_read_shared_data, [{'job': i} for i in range(2)])
+            self.assertEqual(['3', '3'], [result['omp_num_threads'] for result in results])
+            self.assertEqual('7', environ['OMP_NUM_THREADS'])
+        finally:
+            if omp_num_threads is None:
+                environ.pop('OMP_NUM_THREADS', None)
+            else:
+                environ['OMP_NUM_THREADS'] = omp_num_threads
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()